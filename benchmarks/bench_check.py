@@ -0,0 +1,61 @@
+"""Time `integator check` end to end, as a git hook runs it, against its latency budget.
+
+python -m benchmarks.bench_check --budget-ms 50
+
+The budget is for the fast path with the latest commit noted, from starting the interpreter to
+exiting, less the time the interpreter takes to start, e.g. ~15ms, or more with many .pth files in
+site-packages. Exits with an error if the median is above --budget-ms. The full command, which
+loads typer and pydantic, is timed for comparison.
+"""
+
+import argparse
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_repo import RepoSpec, build_repo
+from benchmarks.timing import measure
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--note-steps", type=int, default=RepoSpec.note_steps)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = pathlib.Path(tmp)
+        build_repo(repo, RepoSpec(commits=20, note_steps=args.note_steps))
+
+        def python(*args: str):
+            def func():
+                subprocess.run([sys.executable, *args], cwd=repo, check=True)
+
+            return func
+
+        startup = measure("python -c pass", python("-c", "pass"), args.repeat)
+        fast = measure(
+            "check", python("-m", "integator", "check", "--quiet"), args.repeat
+        )
+        full = measure(
+            "check (full command)",
+            python("-m", "integator.cli", "check", "--quiet"),
+            args.repeat,
+        )
+
+    print(f"{'':<32}{'median':>14}{'mean':>14}")
+    for timing in (startup, fast, full):
+        print(timing)
+
+    latency_ms = fast.median_ms - startup.median_ms
+    print(f"check after startup: {latency_ms:.1f}ms (budget {args.budget_ms}ms)")
+    if latency_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
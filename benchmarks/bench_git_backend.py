@@ -0,0 +1,53 @@
+"""Compare the shell-per-call git backend with the `git cat-file` coprocess backend.
+
+python -m benchmarks.bench_git_backend --commits 500 --repeat 50
+"""
+
+import argparse
+import functools
+import os
+import pathlib
+import tempfile
+from typing import Callable
+
+from benchmarks.synthetic_repo import add_notes, create_repo, status_note
+from benchmarks.timing import measure
+from integator.git_backend import CatFileBackend, GitBackend, ShellBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = pathlib.Path(tmp)
+        hashes = create_repo(repo, args.commits)
+        add_notes(repo, hashes[-20:], status_note(3))
+        os.chdir(repo)
+
+        backends: dict[str, GitBackend] = {
+            "shell": ShellBackend(),
+            "cat-file": CatFileBackend(repo),
+        }
+        latest = [commit.hash for commit in ShellBackend().log(20)]
+
+        queries: dict[str, Callable[[GitBackend], object]] = {
+            "log(8)": lambda b: b.log(8),
+            "log(20)": lambda b: b.log(20),
+            "rev_parse": lambda b: b.rev_parse("HEAD"),
+            "notes(20)": lambda b: b.notes(latest),
+        }
+
+        print(f"{'query':<16}" + "".join(f"{name:>12}" for name in backends))
+        for query, func in queries.items():
+            durations = [
+                measure(query, functools.partial(func, b), args.repeat).mean_ms
+                for b in backends.values()
+            ]
+            print(f"{query:<16}" + "".join(f"{d:>10.2f}ms" for d in durations))
+
+
+if __name__ == "__main__":
+    main()
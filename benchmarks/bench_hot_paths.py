@@ -0,0 +1,205 @@
+"""Time the hot paths of integator on a synthetic repository, and write the results as JSON.
+
+python -m benchmarks.bench_hot_paths --commits 500 --output results.json
+python -m benchmarks.bench_hot_paths --baseline results.json
+
+With --baseline, exits with an error if a median is more than --tolerance times the baseline's.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime as dt
+import importlib.metadata
+import io
+import json
+import os
+import pathlib
+import platform
+import sys
+import tempfile
+from dataclasses import asdict
+
+from textual.app import App, ComposeResult
+
+from benchmarks.synthetic_repo import RepoSpec, build_repo, git
+from benchmarks.timing import Timing, measure, measure_async
+from integator import git as integator_git
+from integator import step_status_repo
+from integator.commands.argument_parsing import get_settings
+from integator.commit import Commit, parse_commit_str
+from integator.git import Git
+from integator.git_backend import LOG_FORMAT_STR, configure_backend
+from integator.log import print_frame
+from integator.settings import RootSettings
+from integator.shell import Shell
+from integator.step_status_repo import StepStatusRepo
+from integator.tui.commit_list import CommitList
+from integator.watch_impl import watch_impl
+
+
+class _CommitListApp(App[None]):
+    def __init__(self, settings: RootSettings) -> None:
+        super().__init__()
+        self.settings = settings
+
+    def compose(self) -> ComposeResult:
+        # Updates are timed explicitly, so the timer shouldn't fire during the benchmark
+        yield CommitList(self.settings, poll_seconds=3600)
+
+
+def _sync_timings(repo: pathlib.Path, hashes: list[str], repeat: int) -> list[Timing]:
+    settings = get_settings(None)
+    git_ = Git(source_dir=repo)
+    latest = hashes[-20:]
+    line = git(repo, "log", "-1", f"--pretty=format:{LOG_FORMAT_STR}")
+    statuses = StepStatusRepo.get(hashes[-1])
+
+    def print_quietly():
+        with contextlib.redirect_stdout(io.StringIO()):
+            print_frame(settings, git_, debug=True)
+
+    return [
+        measure("get_settings", lambda: get_settings(None), repeat),
+        measure("parse_commit_str", lambda: parse_commit_str(line), repeat, 1000),
+        measure("Commit.from_str", lambda: Commit.from_str(line), repeat, 1000),
+        measure("GitLog.get(8)", lambda: git_.log.get(8), repeat),
+        measure("GitLog.get(20)", lambda: git_.log.get(20), repeat),
+        measure("StepStatusRepo.get", lambda: StepStatusRepo.get(hashes[-1]), repeat),
+        measure(
+            "StepStatusRepo.get(uncached)",
+            lambda: StepStatusRepo.get(hashes[-1]),
+            repeat,
+            setup=step_status_repo._cache.clear,  # pyright: ignore[reportPrivateUsage]
+        ),
+        measure(
+            "StepStatusRepo.get_many(20)",
+            lambda: StepStatusRepo.get_many(latest),
+            repeat,
+            setup=step_status_repo._cache.clear,  # pyright: ignore[reportPrivateUsage]
+        ),
+        measure(
+            "StepStatusRepo.update",
+            lambda: StepStatusRepo.update(hashes[-1], statuses),
+            repeat,
+        ),
+        measure("log_impl frame", print_quietly, repeat),
+        measure(
+            "Git.change_counts(200)",
+            lambda: git_.change_counts(hashes[-200:]),
+            repeat,
+            setup=integator_git._change_counts.clear,  # pyright: ignore[reportPrivateUsage]
+        ),
+    ]
+
+
+async def _async_timings(repo: pathlib.Path, repeat: int) -> list[Timing]:
+    settings = get_settings(None)
+    timings = [
+        await measure_async(
+            "watch_impl",
+            lambda: watch_impl(
+                Shell(),
+                root_git=Git(source_dir=repo),
+                status_repo=StepStatusRepo(),
+                quiet=True,
+                settings=settings,
+            ),
+            repeat,
+        )
+    ]
+
+    app = _CommitListApp(settings)
+    async with app.run_test():
+        commit_list = app.query_one(CommitList)
+        # Only measure the refreshes we start
+        commit_list.timer.stop()
+        timings.append(
+            await measure_async(
+                "CommitList._update",
+                lambda: commit_list._update().wait(),  # pyright: ignore[reportPrivateUsage]
+                repeat,
+            )
+        )
+    return timings
+
+
+def _compare(
+    timings: list[Timing], baseline_path: pathlib.Path, tolerance: float
+) -> bool:
+    """Print each median relative to the baseline. Returns whether all are within tolerance."""
+    baseline = {
+        result["name"]: result["median_ms"]
+        for result in json.loads(baseline_path.read_text())["results"]
+    }
+
+    ok = True
+    for timing in timings:
+        if timing.name not in baseline:
+            continue
+        ratio = timing.median_ms / baseline[timing.name]
+        regressed = ratio > tolerance
+        ok = ok and not regressed
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{timing.name:<32}{ratio:>11.2f}x{marker}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--commits", type=int, default=RepoSpec.commits)
+    parser.add_argument("--noted-commits", type=int, default=RepoSpec.noted_commits)
+    parser.add_argument("--note-steps", type=int, default=RepoSpec.note_steps)
+    parser.add_argument("--log-kilobytes", type=int, default=RepoSpec.log_bytes // 1024)
+    parser.add_argument(
+        "--json-notes", action="store_true", help="Write notes like earlier versions"
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--git-backend", choices=["shell", "cat-file"], default="shell")
+    parser.add_argument("--output", type=pathlib.Path)
+    parser.add_argument("--baseline", type=pathlib.Path)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+
+    spec = RepoSpec(
+        commits=args.commits,
+        noted_commits=args.noted_commits,
+        note_steps=args.note_steps,
+        log_bytes=args.log_kilobytes * 1024,
+        json_notes=args.json_notes,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = pathlib.Path(tmp)
+        hashes = build_repo(repo, spec)
+        os.chdir(repo)
+        configure_backend(args.git_backend)
+
+        timings = _sync_timings(repo, hashes, args.repeat)
+        timings += asyncio.run(_async_timings(repo, args.repeat))
+
+    print(f"{'':<32}{'median':>14}{'mean':>14}")
+    for timing in timings:
+        print(timing)
+
+    results = {
+        "integator": importlib.metadata.version("integator"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": dt.datetime.now().isoformat(),
+        "git_backend": args.git_backend,
+        "repo": asdict(spec),
+        "repeat": args.repeat,
+        "results": [timing.to_dict() for timing in timings],
+    }
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline and not _compare(timings, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure how long a command spends importing modules, with python -X importtime.
+
+python -m benchmarks.bench_import_time --budget-ms 50
+python -m benchmarks.bench_import_time --command "tui --help"
+
+Counts the imports after the interpreter has started, i.e. from importing integator on, and exits
+with an error if the median over --repeat runs is above --budget-ms.
+"""
+
+import argparse
+import pathlib
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_repo import RepoSpec, build_repo
+
+# "import time: <self us> | <cumulative us> | <indentation><module>"
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(command: list[str], cwd: pathlib.Path) -> dict[str, int]:
+    """The cumulative import time in microseconds of each top-level import of the command."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "integator", *command],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    times: dict[str, int] = {}
+    started = False
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None or len(match[3]) != 1:
+            continue
+        started = started or match[4] == "integator"
+        if started:
+            times[match[4]] = times.get(match[4], 0) + int(match[2])
+    if not started:
+        raise RuntimeError(f"integator was not imported:\n{result.stderr}")
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--command", default="check")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=100)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = pathlib.Path(tmp)
+        build_repo(repo, RepoSpec(commits=5, noted_commits=5, log_bytes=1024))
+        command = shlex.split(args.command)
+        runs = [import_times(command, repo) for _ in range(args.repeat)]
+
+    totals_ms = [sum(times.values()) / 1000 for times in runs]
+    median_ms = statistics.median(totals_ms)
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    print(f"Slowest imports of `integator {args.command}`")
+    for module, us in slowest[: args.top]:
+        print(f"{module:<48}{us / 1000:>10.1f}ms")
+    print(f"{'median total':<48}{median_ms:>10.1f}ms (budget {args.budget_ms}ms)")
+
+    if median_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare the size and decoding time of JSON notes with compact notes.
+
+python -m benchmarks.bench_note_encoding --steps 5
+"""
+
+import argparse
+import functools
+import pathlib
+
+from benchmarks.synthetic_repo import status_note
+from benchmarks.timing import measure
+from integator import status_encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    root = pathlib.Path("/home/user/repo")
+    logs = [
+        root / ".logs" / f"241208170704-a1b2-Step-{i}.log" for i in range(args.steps)
+    ]
+    json_note = status_note(args.steps, logs)
+    compact_note = status_note(args.steps, logs, root=root)
+
+    notes = {"json": json_note, "compact": compact_note}
+    print(f"Note with {args.steps} steps")
+    print(f"{'encoding':<12}{'bytes':>10}{'decode':>14}")
+    for name, note in notes.items():
+        decode = functools.partial(status_encoding.decode, note, root)
+        timing = measure(name, decode, args.repeat, 1000)
+        print(f"{name:<12}{len(note.encode()):>10}{timing.mean_ms * 1000:>12.2f}us")
+
+
+if __name__ == "__main__":
+    main()
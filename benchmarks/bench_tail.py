@@ -0,0 +1,49 @@
+"""Compare reading the tail of a large log with tail_lines against splitting the whole file.
+
+python -m benchmarks.bench_tail --megabytes 300
+"""
+
+import argparse
+import pathlib
+import tempfile
+from typing import Callable
+
+from benchmarks.synthetic_repo import write_log
+from benchmarks.timing import measure
+from integator.tail import tail_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=int, default=300)
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = pathlib.Path(tmp) / "step.log"
+        write_log(log, args.megabytes * 2**20)
+
+        def uncached(use_mmap: bool) -> Callable[[], object]:
+            def func():
+                # Touch the file, so the cache is invalidated
+                with log.open("ab") as f:
+                    f.write(b"x")
+                tail_lines(log, args.lines, use_mmap)
+
+            return func
+
+        timings = {
+            "read_text().split": lambda: log.read_text().split("\n")[-args.lines :],
+            "tail_lines": uncached(use_mmap=False),
+            "tail_lines(mmap)": uncached(use_mmap=True),
+            "tail_lines(cached)": lambda: tail_lines(log, args.lines),
+        }
+
+        print(f"Tail of {args.lines} lines from a {args.megabytes} MB log")
+        for name, func in timings.items():
+            print(f"{name:<20}{measure(name, func, args.repeat).mean_ms:>12.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
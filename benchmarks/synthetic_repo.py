@@ -0,0 +1,146 @@
+"""Throwaway git repositories for benchmarking."""
+
+import datetime as dt
+import os
+import pathlib
+import subprocess
+from dataclasses import dataclass
+
+from integator import status_encoding
+from integator.settings import FILE_NAME, IntegatorSettings, RootSettings, StepSpec
+from integator.step_status import ExecutionState, Span, Statuses, StepStatus, Task
+
+_GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Integator Benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@integator.invalid",
+    "GIT_COMMITTER_NAME": "Integator Benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@integator.invalid",
+}
+
+
+def git(repo: pathlib.Path, *args: str, input: bytes | None = None) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo,
+        input=input,
+        check=True,
+        capture_output=True,
+        env={**os.environ, **_GIT_ENV},
+    ).stdout.decode()
+
+
+def create_repo(path: pathlib.Path, n_commits: int) -> list[str]:
+    """Create a repository with n_commits linear commits. Returns their hashes, oldest first."""
+    path.mkdir(parents=True, exist_ok=True)
+    git(path, "init", "-q")
+
+    # fast-import creates all commits in a single process, which is much faster than `git commit`.
+    stream: list[str] = []
+    for i in range(n_commits):
+        content = f"{i}\n"
+        message = f"Commit {i}\n"
+        stream += [
+            "commit refs/heads/main",
+            f"mark :{i + 1}",
+            f"committer Integator Benchmark <benchmark@integator.invalid> {1_700_000_000 + i * 60} +0000",
+            f"data {len(message)}",
+            message,
+            f"M 100644 inline file_{i % 100}.txt",
+            f"data {len(content)}",
+            content,
+        ]
+    git(path, "fast-import", "--quiet", input="\n".join(stream).encode())
+    git(path, "symbolic-ref", "HEAD", "refs/heads/main")
+    git(path, "checkout", "-q", "-f", "main")
+
+    return git(path, "rev-list", "--reverse", "main").split()
+
+
+def add_notes(path: pathlib.Path, hashes: list[str], note: str) -> None:
+    """Add the same note to each of the hashes."""
+    for hash in hashes:
+        git(path, "notes", "add", "-f", "-m", note, hash)
+
+
+def status_note(
+    n_steps: int,
+    logs: list[pathlib.Path] | None = None,
+    state: ExecutionState = ExecutionState.SUCCESS,
+    root: pathlib.Path | None = None,
+) -> str:
+    """A serialised note with n_steps steps in the given state, pointing at logs if given.
+
+    In the compact encoding if root is given, otherwise in the JSON of earlier versions.
+    """
+    now = dt.datetime.now()
+    statuses = Statuses(
+        values=[
+            StepStatus(
+                step=Task(name=f"Step {i}", cmd="true"),
+                state=state,
+                span=Span(start=now, end=now),
+                log=logs[i] if logs else pathlib.Path(f".logs/{i}.log"),
+            )
+            for i in range(n_steps)
+        ]
+    )
+    if root is None:
+        return statuses.model_dump_json()
+    return status_encoding.encode(statuses, root)
+
+
+def write_log(path: pathlib.Path, n_bytes: int) -> None:
+    """Write a log of about n_bytes, made of lines like a test runner's."""
+    line = b"tests/test_module.py::test_something[param] PASSED                    [ 42%]\n"
+    block = line * max(2**20 // len(line), 1)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        for _ in range(n_bytes // len(block)):
+            f.write(block)
+        f.write(line * ((n_bytes % len(block)) // len(line)))
+
+
+@dataclass
+class RepoSpec:
+    commits: int = 200
+    # The latest noted_commits have a note with note_steps steps.
+    noted_commits: int = 20
+    note_steps: int = 3
+    # Size of the log of each step
+    log_bytes: int = 64 * 1024
+    # Write notes like earlier versions did
+    json_notes: bool = False
+
+
+def build_repo(path: pathlib.Path, spec: RepoSpec) -> list[str]:
+    """A repository with notes and logs, and an integator.toml for its steps.
+
+    The latest commit succeeded, and the one before it failed, so every view has something to show.
+    Returns the hashes, oldest first.
+    """
+    hashes = create_repo(path, spec.commits)
+    logs = [path / ".logs" / f"step-{i}.log" for i in range(spec.note_steps)]
+    for log in logs:
+        write_log(log, spec.log_bytes)
+
+    noted = hashes[-spec.noted_commits :] if spec.noted_commits else []
+    root = None if spec.json_notes else path.resolve()
+    add_notes(path, noted[:-2], status_note(spec.note_steps, logs, root=root))
+    add_notes(
+        path,
+        noted[-2:-1],
+        status_note(spec.note_steps, logs, ExecutionState.FAILURE, root),
+    )
+    add_notes(path, noted[-1:], status_note(spec.note_steps, logs, root=root))
+
+    settings = RootSettings(
+        integator=IntegatorSettings(
+            steps=[
+                StepSpec(name=f"Step {i}", cmd="true") for i in range(spec.note_steps)
+            ],
+            root_worktree_dir=path,
+        )
+    )
+    settings.write_toml(path / FILE_NAME)
+    (path / ".git" / "info" / "exclude").write_text(f"{FILE_NAME}\n.logs\n")
+    return hashes
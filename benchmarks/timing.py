@@ -0,0 +1,75 @@
+"""Timing helpers shared by the benchmarks."""
+
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+
+@dataclass
+class Timing:
+    name: str
+    # Duration of each sample, per call, in milliseconds
+    samples_ms: list[float] = field(default_factory=list[float])
+
+    @property
+    def mean_ms(self) -> float:
+        return statistics.mean(self.samples_ms)
+
+    @property
+    def median_ms(self) -> float:
+        return statistics.median(self.samples_ms)
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "name": self.name,
+            "mean_ms": self.mean_ms,
+            "median_ms": self.median_ms,
+            "min_ms": min(self.samples_ms),
+            "max_ms": max(self.samples_ms),
+            "samples": len(self.samples_ms),
+        }
+
+    def __str__(self) -> str:
+        return f"{self.name:<32}{self.median_ms:>12.3f}ms{self.mean_ms:>12.3f}ms"
+
+
+def measure(
+    name: str,
+    func: Callable[[], object],
+    repeat: int,
+    number: int = 1,
+    setup: Callable[[], object] | None = None,
+) -> Timing:
+    """Time repeat samples of calling func number times, after one warm-up call, e.g. to start coprocesses.
+
+    setup is called before each sample, outside the timing.
+    """
+    func()
+    timing = Timing(name)
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timing.samples_ms.append((time.perf_counter() - start) / number * 1000)
+    return timing
+
+
+async def measure_async(
+    name: str,
+    func: Callable[[], Awaitable[object]],
+    repeat: int,
+    setup: Callable[[], object] | None = None,
+) -> Timing:
+    """Like measure, for coroutines."""
+    await func()
+    timing = Timing(name)
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        await func()
+        timing.samples_ms.append((time.perf_counter() - start) * 1000)
+    return timing
@@ -0,0 +1,26 @@
+import contextlib
+import fcntl
+import os
+import pathlib
+import socket
+from typing import Generator
+
+
+def write_atomically(path: pathlib.Path, text: str) -> None:
+    """Write to a temporary file and rename it, so readers never see a partial file.
+
+    The temporary file is named after the host and process, since the directory may be shared.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+@contextlib.contextmanager
+def locked(path: pathlib.Path) -> Generator[None, None, None]:
+    """Hold an exclusive lock on path, across threads and processes, e.g. to read, modify and write it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with (path.parent / f"{path.name}.lock").open("wb") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
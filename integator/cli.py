@@ -0,0 +1,42 @@
+import logging
+from typing import ClassVar
+
+import typer
+
+from integator.commands.lazy_group import LazyGroup
+
+logger = logging.getLogger(__name__)
+
+
+class Commands(LazyGroup):
+    # Commands are imported when used, so e.g. `check` in a git hook doesn't import the TUI
+    lazy_commands: ClassVar[dict[str, tuple[str, str]]] = {
+        "check": ("integator.commands.check", "check_app"),
+        "c": ("integator.commands.check", "check_app"),
+        "init": ("integator.commands.init", "init_app"),
+        "i": ("integator.commands.init", "init_app"),
+        "log": ("integator.commands.log", "log_app"),
+        "l": ("integator.commands.log", "log_app"),
+        "run": ("integator.commands.run", "run_app"),
+        "r": ("integator.commands.run", "run_app"),
+        "tui": ("integator.commands.tui", "tui_app"),
+        "t": ("integator.commands.tui", "tui_app"),
+        "watch": ("integator.commands.watch", "watch_app"),
+        "w": ("integator.commands.watch", "watch_app"),
+        "worktrees": ("integator.commands.worktrees", "worktrees_app"),
+    }
+
+
+app = typer.Typer(cls=Commands)
+
+
+@app.callback()
+def main():
+    pass
+
+
+# feat: A `clear` command, which removes all step states for a given commit. By default, removes for the latest commit.
+
+
+if __name__ == "__main__":
+    app()
@@ -21,7 +21,7 @@ def status(pairs: list[tuple[Commit, Statuses]], step_names: list[str]) -> list[
 
 
 def status_row(pair: tuple[Commit, Statuses], step_names: list[str]) -> list[str]:
-    return [pair[1].get(cmd).state.__str__() for cmd in step_names]
+    return [pair[1].state(cmd).__str__() for cmd in step_names]
 
 
 def age(pair: tuple[Commit, Statuses]) -> str:
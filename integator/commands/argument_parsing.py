@@ -4,7 +4,15 @@ import typer
 
 from integator.commit import Commit
 from integator.git import Git
-from integator.settings import RootSettings, StepSpec
+from integator.git_backend import configure_backend
+from integator.metrics import configure_metrics
+from integator.settings import (
+    RootSettings,
+    SettingsProvider,
+    StepSpec,
+    settings_provider,
+    template_path,
+)
 
 
 def commit_match_or_latest(hash: str | None, git: Git) -> Commit:
@@ -25,12 +33,23 @@ def step_match_or_all(step: str | None, settings: RootSettings) -> list[StepSpec
     return step_specs
 
 
-def get_settings(template_name: str | None) -> RootSettings:
+def get_settings_provider(template_name: str | None) -> SettingsProvider:
     match template_name:
         case None:
-            return RootSettings.from_toml(pathlib.Path("integator.toml"))
+            return settings_provider(pathlib.Path("integator.toml"))
         case str():
-            return RootSettings.from_template(template_name)
+            return settings_provider(template_path(template_name))
+
+
+def get_settings(template_name: str | None) -> RootSettings:
+    """The current settings. Only parses the file again if it has changed since the last call."""
+    settings = get_settings_provider(template_name).get()
+
+    configure_backend(settings.integator.git_backend)
+    configure_metrics(
+        settings.integator.metrics_jsonl, settings.integator.metrics_prometheus
+    )
+    return settings
 
 
 template_defaults = typer.Option(
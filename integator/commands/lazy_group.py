@@ -0,0 +1,36 @@
+import importlib
+from typing import TYPE_CHECKING, ClassVar
+
+import typer
+from typer.core import TyperGroup
+from typer.main import get_group
+
+if TYPE_CHECKING:
+    # Recent versions of typer vendor click
+    from typer._click import Command, Context
+
+
+class LazyGroup(TyperGroup):
+    """A group which imports a command's module when the command is used, rather than up front.
+
+    Subclasses map each command name to the module and attribute of the Typer app defining it.
+    Apps added without a name contribute their commands, apps with a name become a subgroup.
+    """
+
+    lazy_commands: ClassVar[dict[str, tuple[str, str]]] = {}
+
+    def list_commands(self, ctx: "Context") -> list[str]:
+        return [*super().list_commands(ctx), *self.lazy_commands]
+
+    def get_command(self, ctx: "Context", cmd_name: str) -> "Command | None":
+        if cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+
+        module, attr = self.lazy_commands[cmd_name]
+        sub_app: typer.Typer = getattr(importlib.import_module(module), attr)
+        group = get_group(sub_app)
+        if cmd_name in group.commands:
+            return group.commands[cmd_name]
+
+        group.name = cmd_name
+        return group
@@ -12,4 +12,4 @@ def log(debug: bool = False, quiet: bool = False):
     # feat: I want the log to be super-simple, a one-time-run thing you can call to get the current status, e.g. in CI.
     # refactor: remove the log_impl layer
     init_log(debug, quiet)
-    log_impl(debug)
+    log_impl(debug, template_name=None)
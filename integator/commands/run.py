@@ -1,8 +1,10 @@
+import asyncio
 import logging
 import pathlib
 
 import typer
 
+from integator import metrics
 from integator.commands.argument_parsing import (
     commit_match_or_latest,
     get_settings,
@@ -12,10 +14,13 @@ from integator.commands.argument_parsing import (
     template_defaults,
 )
 from integator.git import Git, RootWorktree
-from integator.sys_logs import init_log
+from integator.result_cache import result_cache
 from integator.run_step import run_step
-from integator.shell import ExitCode, RunResult
+from integator.shell import ExitCode
+from integator.step_scheduler import run_steps
+from integator.step_status import ExecutionState
 from integator.step_status_repo import StepStatusRepo
+from integator.sys_logs import init_log
 
 logger = logging.getLogger(__name__)
 
@@ -44,30 +49,52 @@ def run(
     # To avoid repeat work, we can run `check` first.
     StepStatusRepo.clear(commit, steps)
 
-    results: list[RunResult] = []
-    for step_spec in steps:
-        # Also updates the statuses.
-        result = run_step(
-            step=step_spec,
-            commit=commit,
-            root_worktree=RootWorktree(git=Git(settings.integator.root_worktree_dir)),
-            status_repo=StepStatusRepo(),
-            output_dir=pathlib.Path(".logs"),
-            quiet=quiet,
+    # Steps that aren't being run, but are needed by those that are, must have succeeded already.
+    existing = StepStatusRepo().get(commit.hash)
+    satisfied = {
+        name
+        for name in settings.step_names()
+        if existing.state(name) == ExecutionState.SUCCESS
+    }
+
+    cache = result_cache(
+        settings.integator.result_cache, settings.integator.result_cache_backend
+    )
+
+    # Also updates the statuses.
+    results = asyncio.run(
+        run_steps(
+            steps,
+            lambda step_spec, cancel: run_step(
+                step=step_spec,
+                commit=commit,
+                root_worktree=RootWorktree(
+                    git=Git(settings.integator.root_worktree_dir),
+                    pool_size=settings.integator.worktree_pool_size,
+                    disk_budget_mb=settings.integator.worktree_disk_budget_mb,
+                ),
+                status_repo=StepStatusRepo(),
+                output_dir=pathlib.Path(".logs"),
+                quiet=quiet,
+                cancel=cancel,
+                result_cache=cache,
+            ),
+            max_parallel=settings.integator.max_parallel,
+            fail_fast=settings.integator.fail_fast,
+            satisfied=satisfied,
         )
+    )
+
+    for name, result in results.items():
         match result.exit:
             # Logs are output during run_step, so no need to print the logs
             case ExitCode.OK:
-                logger.info(f"Step {step_spec.name} succeeded")
+                logger.info(f"Step {name} succeeded")
             case ExitCode.ERROR:
-                logger.error(f"Step {step_spec.name} failed")
-                if settings.integator.fail_fast:
-                    logger.error("Fail fast enabled. Exiting.")
-                    break
-
-        results.append(result)
+                logger.error(f"Step {name} failed")
 
     statuses = StepStatusRepo().get(commit.hash)
+    metrics.export()
 
     if statuses.all_succeeded({step.name for step in steps}):
         logger.info("All steps succeeded")
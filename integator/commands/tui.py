@@ -1,12 +1,18 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import partial
-from multiprocessing import Process
-from typing import NoReturn
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Callable
 
 import typer
 
-from integator.commands.argument_parsing import get_settings, template_defaults
+from integator.commands.argument_parsing import (
+    get_settings,
+    get_settings_provider,
+    template_defaults,
+)
 from integator.commands.watch import watch
+from integator.status_events import configure_events
 from integator.sys_logs import init_log
 
 tui_app = typer.Typer()
@@ -14,19 +20,35 @@ tui_app = typer.Typer()
 
 @dataclass
 class WatchDaemon:
-    callable: partial[NoReturn]
-    process: Process
+    # Runs in the daemon process, and publishes status events to the connection it is passed
+    callable: Callable[[Connection], None]
+    process: Process = field(init=False)
+    # Status events the daemon publishes. A new pipe for each daemon process, which reaches EOF when it exits.
+    events: Connection = field(init=False)
 
     def __post_init__(self):
+        self.start()
+
+    def start(self):
+        self.events, publisher = Pipe(duplex=False)
+        self.process = Process(target=self.callable, args=(publisher,), daemon=True)
         self.process.start()
+        # Only the daemon writes, so reading sees EOF once it exits, e.g. if it crashes
+        publisher.close()
 
     def restart(self):
         if self.process.is_alive():
             self.process.terminate()
             self.process.join()
+        self.events.close()
+        self.start()
 
-        self.process = Process(target=self.callable, daemon=True)
-        self.process.start()
+
+def _publish_and_watch(
+    events: Connection, template_name: str | None, debug: bool, quiet: bool
+):
+    configure_events(events)
+    watch(template_name=template_name, debug=debug, quiet=quiet)
 
 
 @tui_app.command("t")
@@ -39,12 +61,16 @@ def tui(
     init_log(debug, quiet)
     from integator.tui.main import IntegatorTUI
 
-    watch_target = partial(watch, template_name=template_name, debug=debug, quiet=quiet)
+    watch_target = partial(
+        _publish_and_watch,
+        template_name=template_name,
+        debug=debug,
+        quiet=quiet,
+    )
 
     app = IntegatorTUI(
         settings=get_settings(template_name),
-        watch_daemon=WatchDaemon(
-            callable=watch_target, process=Process(target=watch_target, daemon=True)
-        ),
+        watch_daemon=WatchDaemon(callable=watch_target),
+        settings_provider=get_settings_provider(template_name),
     )
     app.run()
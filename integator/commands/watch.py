@@ -1,11 +1,22 @@
+import asyncio
 import logging
-import time
+import signal
+from types import FrameType
+from typing import NoReturn
 
 import typer
 
-from integator.commands.argument_parsing import get_settings, template_defaults
+from integator import metrics
+from integator.commands.argument_parsing import (
+    get_settings,
+    get_settings_provider,
+    template_defaults,
+)
 from integator.git import Git
-from integator.shell import Shell
+from integator.ref_watcher import RefWatcher
+from integator.shell import Shell, terminate_running_commands
+from integator.status_events import EventKind, StatusEvent, publish
+from integator.step_scheduler import BackgroundSteps
 from integator.step_status_repo import StepStatusRepo
 from integator.sys_logs import init_log
 from integator.watch_impl import CommandRan, watch_impl
@@ -27,25 +38,106 @@ def watch(
     # feat: Do I want to remove the watch command completely? Or how does this work? What role does it still play?
     # If I want to keep it, do I want it to be able to watch only a specific step?
     init_log(debug, quiet)
-    settings = get_settings(template_name)
+    # E.g. when the TUI restarts its watch daemon. Steps run in their own process groups, so would otherwise
+    # keep running.
+    signal.signal(signal.SIGTERM, _terminate)
+
+    asyncio.run(_watch(template_name, quiet))
+
+
+def _terminate(signum: int, frame: FrameType | None) -> NoReturn:
+    logger.info("Terminated, stopping running steps")
+    terminate_running_commands()
+    raise SystemExit(128 + signum)
 
+
+async def _watch(template_name: str | None, quiet: bool) -> NoReturn:
+    """Runs steps, updates their statuses, and waits for new commits, all in one event loop.
+
+    Settings are reloaded when the settings file changes, which also wakes the loop up.
+    """
+    settings = get_settings(template_name)
     shell = Shell()
+    ref_watcher = RefWatcher(
+        settings.integator.root_worktree_dir,
+        files=[get_settings_provider(template_name).path],
+    )
+    # Without filesystem events, fall back to polling every second.
+    watching = ref_watcher.start()
+    head: str | None = None
+    # Steps for superseded commits that are left to finish while newer commits are worked on
+    background = BackgroundSteps(max_commits=settings.integator.worktree_pool_size - 1)
+
     while True:
         logger.debug("--- Init'ing ---")
+        settings = get_settings(template_name)
+        poll_seconds = settings.integator.watch_poll_seconds if watching else 1
         git = Git(source_dir=settings.integator.root_worktree_dir)
+        background.max_commits = settings.integator.worktree_pool_size - 1
+
+        latest = await git.log.async_latest()
+        if latest.hash != head:
+            head = latest.hash
+            publish(StatusEvent(kind=EventKind.NEW_COMMIT, hash=head))
 
         logger.debug("Running")
         logger.info(
             f"Integator {settings.version()}: Watching {settings.integator.root_worktree_dir} for new commits"
         )
-        status = watch_impl(
-            shell,
-            root_git=git,
-            status_repo=StepStatusRepo(),
-            quiet=quiet,
-            settings=settings,
+        superseded = asyncio.Event()
+        refs_changed = asyncio.Event()
+        detect = asyncio.ensure_future(
+            _detect_new_head(
+                git, ref_watcher, latest.hash, poll_seconds, superseded, refs_changed
+            )
         )
+        try:
+            status = await watch_impl(
+                shell,
+                root_git=git,
+                status_repo=StepStatusRepo(),
+                quiet=quiet,
+                settings=settings,
+                superseded=superseded,
+                background=background,
+            )
+        finally:
+            detect.cancel()
+
+        metrics.export()
+
+        if superseded.is_set() or refs_changed.is_set():
+            # E.g. a new commit, which is worked on right away. The detector has already consumed the change, so
+            # waiting would miss it.
+            continue
 
         logger.debug("--- Sleeping ---")
-        if status == CommandRan.NO:
-            time.sleep(1)
+        match status:
+            case CommandRan.YES:
+                pass
+            case CommandRan.DEFERRED:
+                await ref_watcher.async_wait(timeout=1)
+            case CommandRan.NO:
+                await ref_watcher.async_wait(timeout=poll_seconds)
+
+
+async def _detect_new_head(
+    git: Git,
+    ref_watcher: RefWatcher,
+    head: str,
+    poll_seconds: float,
+    superseded: asyncio.Event,
+    refs_changed: asyncio.Event,
+) -> None:
+    """Set superseded once HEAD moves away from head, so steps for the old commit can be cancelled.
+
+    Sets refs_changed on any change it sees.
+    """
+    while True:
+        if await ref_watcher.async_wait(timeout=poll_seconds):
+            refs_changed.set()
+        latest = await git.log.async_latest()
+        if latest.hash != head:
+            logger.info(f"New commit {latest.hash}, superseding {head}")
+            superseded.set()
+            return
@@ -0,0 +1,65 @@
+import logging
+import pathlib
+import shutil
+import tempfile
+
+import typer
+
+from integator.commands.argument_parsing import get_settings, template_defaults
+from integator.git import Git, RootWorktree
+from integator.shell import Shell
+from integator.sys_logs import init_log
+
+worktrees_app = typer.Typer(help="Manage the worktrees that steps run in.")
+
+logger = logging.getLogger(__name__)
+
+
+def _registered_worktrees(source_dir: pathlib.Path) -> list[pathlib.Path]:
+    lines = Shell().run_quietly(f"git -C '{source_dir}' worktree list --porcelain")
+    return [
+        pathlib.Path(line.removeprefix("worktree ")).resolve()
+        for line in lines
+        if line.startswith("worktree ")
+    ]
+
+
+@worktrees_app.command()
+def prune(
+    include_pool: bool = typer.Option(
+        False, "--all", help="Also remove the pooled worktrees, which are reused"
+    ),
+    template_name: str | None = template_defaults,
+    debug: bool = False,
+    quiet: bool = False,
+):
+    """Removes the temporary worktrees that each commit used to get, e.g. /tmp/integator-<hash>."""
+    init_log(debug, quiet)
+    settings = get_settings(template_name)
+    source_dir = settings.integator.root_worktree_dir
+    pool_dir = RootWorktree(Git(source_dir)).pool_dir().resolve()
+    temp_dir = pathlib.Path(tempfile.gettempdir()).resolve()
+
+    stale = [
+        path
+        for path in _registered_worktrees(source_dir)
+        if (path.parent == temp_dir and path.name.startswith("integator-"))
+        or (include_pool and path.parent == pool_dir)
+    ]
+
+    for path in stale:
+        logger.info(f"Removing worktree {path}")
+        try:
+            Shell().run_quietly(
+                f"git -C '{source_dir}' worktree remove --force '{path}'"
+            )
+        except RuntimeError as e:
+            logger.warning(f"git could not remove {path}, deleting it: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+
+    if include_pool:
+        shutil.rmtree(pool_dir, ignore_errors=True)
+
+    # Forget worktrees whose directories were already deleted, e.g. by clearing /tmp
+    Shell().run_quietly(f"git -C '{source_dir}' worktree prune")
+    print(f"Removed {len(stale)} worktrees")
@@ -8,4 +8,6 @@ class Emojis(Enum):
     IN_PROGRESS = "⏳"
     SKIPPED = "⏭️"
     FAIL = "❌"
+    CANCELLED = "🚫"
+    TIMED_OUT = "⌛"
     RED = "🔴"
@@ -0,0 +1,125 @@
+"""`integator check` without typer, pydantic or more than one git call, since git hooks run it often.
+
+Handles checking the latest commit or --hash, for all steps or --step, with the settings in
+integator.toml. For anything else, e.g. a template, --help, settings it can't read or a
+root_worktree_dir other than the current directory, it returns None and the full command runs
+instead, which also reports any errors.
+
+Its latency budget is 50ms, after the interpreter has started. benchmarks/bench_check.py checks it.
+"""
+
+import json
+import os
+import subprocess
+import tomllib
+
+# Not imported from step_status, shell and status_encoding, since they import pydantic and asyncio.
+# test_fast_check checks they match.
+SUCCESS = 4
+ERROR_EXIT_CODE = 1
+NOTE_VERSION = 2
+
+
+def _parse_args(argv: list[str]) -> tuple[dict[str, str], set[str]] | None:
+    """The options and flags of a check command, e.g. ({"hash": "abc"}, {"quiet"})."""
+    if not argv or argv[0] not in ("check", "c"):
+        return None
+
+    options: dict[str, str] = {}
+    flags: set[str] = set()
+    rest = argv[1:]
+    while rest:
+        option, *value = rest.pop(0).split("=", 1)
+        if option in ("--debug", "--quiet") and not value:
+            flags.add(option[2:])
+        elif option in ("--hash", "--step") and (value or rest):
+            options[option[2:]] = value[0] if value else rest.pop(0)
+        else:
+            return None
+    return options, flags
+
+
+def _step_names(settings_path: str, step: str | None) -> list[str] | None:
+    try:
+        with open(settings_path, "rb") as f:
+            settings = tomllib.load(f)["integator"]
+        names = [spec["name"] for spec in settings["steps"]]
+        # The full command looks up commits in root_worktree_dir
+        root = settings.get("root_worktree_dir")
+        if root is not None and not os.path.samefile(root, "."):
+            return None
+    except (OSError, tomllib.TOMLDecodeError, KeyError, TypeError):
+        return None
+
+    if step is not None:
+        return [step] if step in names else None
+    return names
+
+
+def _states(note: str) -> dict[str, int] | None:
+    """The state of each step in a note, like Statuses.state, without validating the note."""
+    if not note:
+        return {}
+
+    try:
+        data = json.loads(note)
+        if note.startswith('{"v":'):
+            if data["v"] != NOTE_VERSION:
+                return None
+            pairs = [(row[0], row[2]) for row in data["s"]]
+        else:
+            pairs = [(s["step"]["name"], s["state"]) for s in data["values"]]
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+    states: dict[str, int] = {}
+    for name, state in pairs:
+        states.setdefault(name, state)
+    return states
+
+
+def fast_check(argv: list[str]) -> int | None:
+    """The exit code of `integator check` with argv, or None if the full command is needed."""
+    args = _parse_args(argv)
+    if args is None:
+        return None
+    options, flags = args
+
+    step_names = _step_names("integator.toml", options.get("step"))
+    if step_names is None:
+        return None
+
+    # The commit and its note in one call
+    result = subprocess.run(
+        ["git", "log", "-1", "--format=%h%x00%N", options.get("hash", "HEAD"), "--"],
+        capture_output=True,
+        text=True,
+        # E.g. outside a repository or before the first commit, which the full command reports
+        check=False,
+    )
+    if result.returncode != 0 or "\0" not in result.stdout:
+        return None
+    short_hash, note = result.stdout.split("\0", 1)
+
+    states = _states(note.strip())
+    if states is None:
+        return None
+
+    not_succeeded = [name for name in step_names if states.get(name) != SUCCESS]
+    if "quiet" in flags and not not_succeeded:
+        # Nothing to log, so don't spend time importing logging
+        return 0
+
+    import logging
+
+    from integator.sys_logs import init_log
+
+    init_log("debug" in flags, "quiet" in flags)
+    log = logging.getLogger(__name__)
+    log.info(f"Checking statuses for commit {short_hash}")
+    if not_succeeded:
+        log.error(f"Steps have not succeeded: {not_succeeded}")
+        return ERROR_EXIT_CODE
+
+    log.info(f"{set(step_names)} succeeded")
+    return 0
@@ -1,47 +1,153 @@
 import functools
+import hashlib
 import logging
 import pathlib
 import re
+import tempfile
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from typing import AsyncContextManager, Sequence
 
 from integator.git_log import GitLog
 from integator.shell import Shell
+from integator.worktree_pool import worktree_pool
 
 log = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(frozen=True)
 class ChangeCount:
     files: int
     insertions: int
     deletions: int
 
+    def __str__(self) -> str:
+        return f"+{self.insertions} -{self.deletions}"
 
-@functools.cache
-def _get_change_count(source_dir: pathlib.Path, hash: str) -> ChangeCount:
-    maybeResult = Shell().run_quietly(f"git -C {source_dir} show --shortstat {hash}")
-    if not maybeResult:
-        raise RuntimeError("No commit found")
-
-    patterns = {
-        "files": r"(\d+) fil.+",
-        "insertions": r"^.+(\d+) ins.+",
-        "deletions": r"^.+(\d+) del.+",
+
+# E.g. " 3 files changed, 12 insertions(+), 1 deletion(-)". Parts with a zero count are left out.
+_SHORTSTAT_PATTERNS = {
+    "files": re.compile(r"(\d+) files? changed"),
+    "insertions": re.compile(r"(\d+) insertions?\(\+\)"),
+    "deletions": re.compile(r"(\d+) deletions?\(-\)"),
+}
+
+
+def parse_shortstat(line: str) -> ChangeCount:
+    values = {
+        name: int(match.group(1)) if (match := pattern.search(line)) else 0
+        for name, pattern in _SHORTSTAT_PATTERNS.items()
     }
+    return ChangeCount(values["files"], values["insertions"], values["deletions"])
+
+
+# Keyed on full commit hashes, which are immutable, so entries never go stale. Bounded, since
+# the log and TUI can page through any number of commits.
+_CHANGE_COUNTS_MAX_ENTRIES = 4096
+_change_counts: OrderedDict[tuple[pathlib.Path, str], ChangeCount] = OrderedDict()
+_change_counts_lock = threading.Lock()
+
+
+def _get_change_counts(
+    source_dir: pathlib.Path, revs: Sequence[str]
+) -> dict[str, ChangeCount]:
+    unique = list(dict.fromkeys(revs))
+    # Any rev, even one that looks like a hash, can be a branch or tag that moves. Resolving
+    # them is cheap compared to computing the diffs.
+    full_hashes = dict(zip(unique, _resolve_hashes(source_dir, unique)))
+    results: dict[str, ChangeCount] = {}
+    with _change_counts_lock:
+        for hash in full_hashes.values():
+            cached = _change_counts.get((source_dir, hash))
+            if cached is not None:
+                _change_counts.move_to_end((source_dir, hash))
+                results[hash] = cached
+
+    missing = list(dict.fromkeys(h for h in full_hashes.values() if h not in results))
+    if missing:
+        fetched = _fetch_change_counts(source_dir, missing)
+        with _change_counts_lock:
+            for hash, counts in fetched.items():
+                _change_counts[(source_dir, hash)] = counts
+            while len(_change_counts) > _CHANGE_COUNTS_MAX_ENTRIES:
+                _change_counts.popitem(last=False)
+        results |= fetched
+
+    return {rev: results[full_hashes[rev]] for rev in revs}
+
+
+def _resolve_hashes(source_dir: pathlib.Path, revs: list[str]) -> list[str]:
+    hashes = Shell().run_quietly(f"git -C {source_dir} rev-parse {' '.join(revs)}")
+    if len(hashes) != len(revs):
+        raise RuntimeError(f"Expected {len(revs)} hashes from git, got {len(hashes)}")
+    return hashes
+
+
+def _fetch_change_counts(
+    source_dir: pathlib.Path, hashes: list[str]
+) -> dict[str, ChangeCount]:
+    """The change counts of all commits, keyed on their full hash, with a single git invocation."""
+    # Commits are printed in the order given, each followed by its shortstat, if it changed anything.
+    lines = Shell().run_quietly(
+        f"git -C {source_dir} log --no-walk=unsorted --shortstat --format=tformat:C%x20%H {' '.join(hashes)}"
+    )
+    counts: dict[str, ChangeCount] = {}
+    hash: str | None = None
+    for line in lines:
+        if line.startswith("C "):
+            hash = line.removeprefix("C ")
+            counts[hash] = ChangeCount(0, 0, 0)
+        elif line.strip() and hash is not None:
+            counts[hash] = parse_shortstat(line)
+
+    if counts.keys() != set(hashes):
+        raise RuntimeError(
+            f"Expected {len(hashes)} commits from git, got {len(counts)}"
+        )
+    return counts
 
-    values: dict[str, int] = {}
-    for pattern_name, regex in patterns.items():
-        match = re.search(regex, maybeResult[-1])
-        if match is None:
-            values[pattern_name] = 0
-        else:
-            values[pattern_name] = int(match.group(1))
-
-    return ChangeCount(
-        values["files"],
-        values["insertions"],
-        values["deletions"],
+
+@functools.cache
+def _rev_parse_path(cwd: pathlib.Path, option: str) -> pathlib.Path:
+    values = Shell().run_quietly(
+        f"git -C {cwd} rev-parse --path-format=absolute {option}"
     )
+    if not values:
+        raise RuntimeError("No git directory found")
+    return pathlib.Path(values[0])
+
+
+def git_common_dir(cwd: pathlib.Path | None = None) -> pathlib.Path:
+    """The git directory shared by all worktrees of the repository, e.g. for refs."""
+    return _rev_parse_path(cwd or pathlib.Path.cwd(), "--git-common-dir")
+
+
+def git_dir(cwd: pathlib.Path | None = None) -> pathlib.Path:
+    """The git directory of the worktree, e.g. for HEAD."""
+    return _rev_parse_path(cwd or pathlib.Path.cwd(), "--git-dir")
+
+
+def git_toplevel(cwd: pathlib.Path | None = None) -> pathlib.Path:
+    """The root directory of the worktree."""
+    return _rev_parse_path(cwd or pathlib.Path.cwd(), "--show-toplevel")
+
+
+def read_ref(ref: str) -> str | None:
+    """Read the value of a ref straight from the git directory, without spawning git."""
+    common_dir = git_common_dir()
+
+    loose = common_dir / ref
+    if loose.exists():
+        return loose.read_text().strip()
+
+    packed = common_dir / "packed-refs"
+    if packed.exists():
+        for line in packed.read_text().splitlines():
+            if line.endswith(f" {ref}"):
+                return line.split(" ")[0]
+
+    return None
 
 
 @dataclass
@@ -52,7 +158,11 @@ class Git:
     log: GitLog = field(default_factory=GitLog)
 
     def change_count(self, hash: str) -> ChangeCount:
-        return _get_change_count(self.source_dir, hash)
+        return self.change_counts([hash])[hash]
+
+    def change_counts(self, hashes: Sequence[str]) -> dict[str, ChangeCount]:
+        """The change counts of the commits, with at most a single git invocation."""
+        return _get_change_counts(self.source_dir, hashes)
 
     def diff_against(self, reference: str) -> list[str]:
         result = Shell().run_quietly(f"git diff origin/{reference}")
@@ -67,6 +177,7 @@ class Git:
         Shell().run_quietly(f"git push origin {latest_commit}:{source_branch}")
 
     def _latest_commit(self) -> str:
+        # Not through the backend, which resolves revisions in the cwd rather than in source_dir.
         values = Shell().run_quietly(f"git -C {self.source_dir} rev-parse HEAD")
         if not values:
             raise RuntimeError("No commit found")
@@ -93,11 +204,24 @@ class RootWorktree:
     # refactor: Might this be a redundant abstraction? Not sure yet.
     # The git representation for the location of the source files. E.g. used for monitoring, finding commits etc.
     git: Git
-
-    def init(self, path: pathlib.Path, hash: str):
-        if path.exists():
-            log.debug("Worktree already exists, continuing")
-        else:
-            log.info(f"Creating worktree at {path}")
-            Shell().run_quietly(f"git worktree add -f -d '{path}' {hash}")
-        return path
+    pool_size: int = 2
+    disk_budget_mb: int | None = None
+
+    def pool_dir(self) -> pathlib.Path:
+        # One pool per repository, so repositories don't move each other's worktrees.
+        repo_id = hashlib.sha1(str(git_common_dir(self.git.source_dir)).encode())
+        return (
+            pathlib.Path(tempfile.gettempdir())
+            / f"integator-pool-{repo_id.hexdigest()[:8]}"
+        )
+
+    def checkout(self, hash: str) -> AsyncContextManager[pathlib.Path]:
+        """A worktree with hash checked out, reused from the pool, for the duration of the context."""
+        return worktree_pool(
+            source_dir=self.git.source_dir,
+            root=self.pool_dir(),
+            size=self.pool_size,
+            disk_budget_bytes=self.disk_budget_mb * 2**20
+            if self.disk_budget_mb is not None
+            else None,
+        ).checkout(hash)
@@ -0,0 +1,326 @@
+import asyncio
+import datetime as dt
+import heapq
+import itertools
+import logging
+import pathlib
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from typing import IO, Literal, Protocol
+
+from integator.commit import Commit
+from integator.metrics import count
+from integator.shell import Shell
+
+log = logging.getLogger(__name__)
+
+NOTES_REF = "refs/notes/commits"
+LOG_FORMAT_STR = "C|%h| T|%aI| A|%aN| N|%N%-C()|%-C()"
+NOTES_FORMAT_STR = "C|%H| N|%N%-C()|%-C()"
+
+BackendName = Literal["shell", "cat-file"]
+
+
+class GitBackend(Protocol):
+    """Read-only git queries, used for commit metadata and step status notes."""
+
+    def log(self, n: int, rev: str = "HEAD") -> list[Commit]:
+        """The latest n commits reachable from rev, newest first."""
+        ...
+
+    def rev_parse(self, rev: str) -> str:
+        """The full hash of rev."""
+        ...
+
+    def notes(self, revs: list[str]) -> dict[str, str]:
+        """The raw note of each of the (unique) revs, or an empty string if it has none."""
+        ...
+
+    async def async_log(self, n: int, rev: str = "HEAD") -> list[Commit]:
+        """Like log, without blocking the event loop."""
+        ...
+
+    async def async_notes(self, revs: list[str]) -> dict[str, str]:
+        """Like notes, without blocking the event loop."""
+        ...
+
+
+class ShellBackend(GitBackend):
+    """Spawns a new git process for every query."""
+
+    def log(self, n: int, rev: str = "HEAD") -> list[Commit]:
+        return _parse_log(Shell().run_quietly(_log_command(n, rev)))
+
+    async def async_log(self, n: int, rev: str = "HEAD") -> list[Commit]:
+        return _parse_log(await Shell().async_run_quietly(_log_command(n, rev)))
+
+    def rev_parse(self, rev: str) -> str:
+        values = Shell().run_quietly(f"git rev-parse {rev}")
+        if not values:
+            raise RuntimeError(f"Could not resolve {rev}")
+        return values[0]
+
+    def notes(self, revs: list[str]) -> dict[str, str]:
+        return _parse_notes(revs, Shell().run_quietly(_notes_command(revs)))
+
+    async def async_notes(self, revs: list[str]) -> dict[str, str]:
+        return _parse_notes(revs, await Shell().async_run_quietly(_notes_command(revs)))
+
+
+def _log_command(n: int, rev: str) -> str:
+    return f'git log -n {n} --pretty=format:"{LOG_FORMAT_STR}" {rev}'
+
+
+def _parse_log(values: list[str]) -> list[Commit]:
+    if not values:
+        raise RuntimeError("No values returned from git log")
+
+    return [Commit.from_str(value) for value in values]
+
+
+def _notes_command(revs: list[str]) -> str:
+    # The full hash of each rev, then each commit's note. Several revs can point to the same commit, which git
+    # log only outputs once, so notes are paired with revs by full hash.
+    joined = " ".join(revs)
+    return f'git rev-parse {joined} && git log --no-walk=unsorted {joined} --pretty=format:"{NOTES_FORMAT_STR}"'
+
+
+def _parse_notes(revs: list[str], lines: list[str]) -> dict[str, str]:
+    full_hashes, entries = lines[: len(revs)], lines[len(revs) :]
+    by_full_hash = dict(_parse_notes_line(line) for line in entries)
+    return {rev: by_full_hash[full_hash] for rev, full_hash in zip(revs, full_hashes)}
+
+
+def _parse_notes_line(line: str) -> tuple[str, str]:
+    if not line.startswith("C|") or not line.endswith("|") or "| N|" not in line:
+        raise RuntimeError(f"Could not parse notes from git log: {line}")
+
+    full_hash, notes = line[2:-1].split("| N|", 1)
+    return full_hash, notes
+
+
+@dataclass
+class CatFileObject:
+    oid: str
+    type: str
+    content: bytes
+
+
+class CatFileProcess:
+    """A long-lived `git cat-file` coprocess.
+
+    Each request is an object name on a line of stdin. Each response is a header line of
+    "<oid> <type> <size>" (or "<name> missing"), followed by the object's content in --batch mode.
+    If the coprocess has died, it is restarted and the request is retried once.
+    """
+
+    def __init__(self, mode: Literal["--batch", "--batch-check"], cwd: pathlib.Path):
+        self.mode = mode
+        self.cwd = cwd
+        self._process: subprocess.Popen[bytes] | None = None
+        self._lock = threading.Lock()
+
+    def request(self, name: str) -> CatFileObject | None:
+        if "\n" in name:
+            raise ValueError(f"Object names cannot contain newlines: {name!r}")
+
+        with self._lock:
+            try:
+                return self._request(name)
+            except (BrokenPipeError, ConnectionError, EOFError) as e:
+                log.warning(f"git cat-file {self.mode} died ({e}), restarting")
+                self._close()
+                return self._request(name)
+
+    def _request(self, name: str) -> CatFileObject | None:
+        stdin, stdout = self._pipes()
+        stdin.write(f"{name}\n".encode())
+        stdin.flush()
+
+        header = stdout.readline()
+        if not header:
+            raise EOFError("git cat-file closed its output")
+
+        fields = header.decode().split()
+        if len(fields) != 3:
+            # "<name> missing" or "<name> ambiguous"
+            return None
+
+        oid, type, size = fields
+        if self.mode == "--batch-check":
+            return CatFileObject(oid=oid, type=type, content=b"")
+
+        content = stdout.read(int(size) + 1)  # The content is followed by a newline
+        if len(content) != int(size) + 1:
+            raise EOFError("git cat-file closed its output")
+        return CatFileObject(oid=oid, type=type, content=content[:-1])
+
+    def _pipes(self) -> tuple[IO[bytes], IO[bytes]]:
+        if self._process is None or self._process.poll() is not None:
+            log.debug(f"Starting git cat-file {self.mode} in {self.cwd}")
+            count("subprocesses")
+            self._process = subprocess.Popen(
+                ["git", "cat-file", self.mode],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                cwd=self.cwd,
+            )
+        return self._process.stdin, self._process.stdout  # type: ignore
+
+    def _close(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+@dataclass
+class _ParsedCommit:
+    commit: Commit
+    parents: list[str]
+    commit_time: int
+
+
+def _parse_signature(value: str) -> tuple[str, dt.datetime, int]:
+    # "Jane Doe <jane@example.com> 1733677624 +0100"
+    name = value[: value.rindex("<")].strip()
+    timestamp, offset = value[value.rindex(">") + 1 :].split()
+    sign = -1 if offset[0] == "-" else 1
+    tz = dt.timezone(
+        sign * dt.timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+    )
+    # Matches the author-local, naive timestamps parsed from `git log` output.
+    local = dt.datetime.fromtimestamp(int(timestamp), tz=tz).replace(tzinfo=None)
+    return name, local, int(timestamp)
+
+
+@dataclass
+class CatFileBackend(GitBackend):
+    """Serves queries over long-lived `git cat-file` coprocesses, so only spawns git once."""
+
+    cwd: pathlib.Path = field(default_factory=pathlib.Path.cwd)
+    _abbrev: int | None = field(default=None, init=False)
+
+    def __post_init__(self):
+        self._check = CatFileProcess("--batch-check", self.cwd)
+        self._batch = CatFileProcess("--batch", self.cwd)
+
+    def log(self, n: int, rev: str = "HEAD") -> list[Commit]:
+        # Walks the history newest-first by commit time, like `git log` does by default.
+        # Ties are broken by insertion order, as git does.
+        order = itertools.count()
+        start = self.rev_parse(rev)
+        queue = [(0, next(order), self._commit(start))]
+        seen = {start}
+        entries: list[Commit] = []
+
+        while queue and len(entries) < n:
+            _, _, parsed = heapq.heappop(queue)
+            entries.append(parsed.commit)
+
+            for parent in parsed.parents:
+                if parent in seen:
+                    continue
+                seen.add(parent)
+                parent_commit = self._commit(parent)
+                heapq.heappush(
+                    queue, (-parent_commit.commit_time, next(order), parent_commit)
+                )
+
+        return entries
+
+    def rev_parse(self, rev: str) -> str:
+        obj = self._check.request(rev)
+        if obj is None:
+            raise RuntimeError(f"Could not resolve {rev}")
+        return obj.oid
+
+    def notes(self, revs: list[str]) -> dict[str, str]:
+        return {rev: self._note(self.rev_parse(rev)) for rev in revs}
+
+    # Each request is a write and a read on a pipe to a running process, which is quick, but blocking.
+    async def async_log(self, n: int, rev: str = "HEAD") -> list[Commit]:
+        return await asyncio.to_thread(self.log, n, rev)
+
+    async def async_notes(self, revs: list[str]) -> dict[str, str]:
+        return await asyncio.to_thread(self.notes, revs)
+
+    def _note(self, full_hash: str) -> str:
+        # Notes are stored at paths like "ab/cdef..." once there are many of them.
+        for path in (
+            full_hash,
+            f"{full_hash[:2]}/{full_hash[2:]}",
+            f"{full_hash[:2]}/{full_hash[2:4]}/{full_hash[4:]}",
+        ):
+            obj = self._batch.request(f"{NOTES_REF}:{path}")
+            if obj is not None:
+                return obj.content.decode().strip()
+        return ""
+
+    def _commit(self, full_hash: str) -> _ParsedCommit:
+        obj = self._batch.request(full_hash)
+        if obj is None or obj.type != "commit":
+            raise RuntimeError(f"No commit found for {full_hash}")
+
+        headers = obj.content.decode(errors="replace").split("\n\n", 1)[0]
+        parents: list[str] = []
+        author, timestamp, commit_time = "", dt.datetime.now(), 0
+        for line in headers.split("\n"):
+            key, _, value = line.partition(" ")
+            match key:
+                case "parent":
+                    parents.append(value)
+                case "author":
+                    author, timestamp, _ = _parse_signature(value)
+                case "committer":
+                    _, _, commit_time = _parse_signature(value)
+                case _:
+                    pass
+
+        return _ParsedCommit(
+            commit=Commit(
+                hash=full_hash[: self._abbrev_length()],
+                timestamp=timestamp,
+                author=author,
+            ),
+            parents=parents,
+            commit_time=commit_time,
+        )
+
+    def _abbrev_length(self) -> int:
+        # Use the same abbreviation length as the rest of git, so hashes match those from `git log`.
+        if self._abbrev is None:
+            values = Shell().run_quietly(f"git -C {self.cwd} rev-parse --short HEAD")
+            self._abbrev = len(values[0]) if values else 7
+        return self._abbrev
+
+    def close(self) -> None:
+        self._check.close()
+        self._batch.close()
+
+
+_backend: GitBackend = ShellBackend()
+_backend_name: BackendName = "shell"
+
+
+def configure_backend(name: BackendName) -> None:
+    global _backend, _backend_name
+    if name == _backend_name:
+        return
+
+    log.debug(f"Using the {name} git backend")
+    match name:
+        case "shell":
+            _backend = ShellBackend()
+        case "cat-file":
+            _backend = CatFileBackend()
+    _backend_name = name
+
+
+def backend() -> GitBackend:
+    return _backend
@@ -0,0 +1,63 @@
+import datetime as dt
+import pathlib
+
+import pydantic
+
+from integator.atomic_file import locked, write_atomically
+from integator.basemodel import BaseModel
+from integator.git import git_common_dir
+from integator.step_status import ExecutionState, Statuses
+
+
+class LastSuccess(BaseModel):
+    hash: str
+    start: dt.datetime
+
+
+class _Entries(BaseModel):
+    steps: dict[str, LastSuccess] = pydantic.Field(default_factory=dict)
+
+
+class LastSuccessIndex:
+    """The latest success of each step, so whether a step is stale can be decided without git.
+
+    Kept up to date by StepStatusRepo.update, for successes on any commit.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+    @classmethod
+    def for_repo(cls) -> "LastSuccessIndex":
+        return cls(git_common_dir() / "integator" / "last-success.json")
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _read(self) -> _Entries:
+        try:
+            return _Entries.model_validate_json(self.path.read_text())
+        except (OSError, ValueError):
+            return _Entries()
+
+    def get(self, step: str) -> LastSuccess | None:
+        return self._read().steps.get(step)
+
+    def record(self, hash: str, statuses: Statuses) -> None:
+        """Record the successes in statuses that are later than the ones in the index."""
+        # Watch, run and the TUI record successes from separate processes
+        with locked(self.path):
+            entries = self._read()
+            changed = not self.exists()
+            for status in statuses.values:
+                if status.state != ExecutionState.SUCCESS:
+                    continue
+                current = entries.steps.get(status.step.name)
+                if current is None or status.span.start > current.start:
+                    entries.steps[status.step.name] = LastSuccess(
+                        hash=hash, start=status.span.start
+                    )
+                    changed = True
+
+            if changed:
+                write_atomically(self.path, entries.model_dump_json())
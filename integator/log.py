@@ -13,9 +13,11 @@ from integator.commands.argument_parsing import get_settings, template_defaults
 from integator.commit import Commit
 from integator.emojis import Emojis
 from integator.git import Git
+from integator.settings import RootSettings
 from integator.shell import Shell
 from integator.step_status import ExecutionState, Statuses
 from integator.step_status_repo import StepStatusRepo
+from integator.tail import tail_lines
 
 log = logging.getLogger(__name__)
 
@@ -32,15 +34,7 @@ def _last_status_commit(
 
         if latest_failure.log is not None:
             log_line = f"{latest_failure.log}"
-            log_lines = latest_failure.log.read_text().split("\n")
-
-            n_lines = 10
-            lines_in_log = len(log_lines)
-            excerpted_lines = (
-                log_lines[-n_lines:]
-                if lines_in_log >= n_lines
-                else log_lines[-lines_in_log:]
-            )
+            excerpted_lines = tail_lines(latest_failure.log, 10)
 
             excerpt = "\n\t".join(excerpted_lines)
 
@@ -147,37 +141,54 @@ def log_impl(debug: bool, template_name: str | None = template_defaults):
 
     while True:
         settings = get_settings(template_name)
-        commits = git.log.get(8)
-        if not debug:
-            Shell().clear()
-
-        pairs = [(entry, StepStatusRepo().get(entry.hash)) for entry in commits]
-
-        print(f"Integator {settings.version()}")
-        _print_ready_status(_ready_for_changes(pairs, set(settings.step_names())))
-        _print_table2(
-            [
-                Column("Hash", "", lambda pairs: [r[0].hash[0:5] for r in pairs]),
-                Column(
-                    "Statuses",
-                    "".join([n[0:2] for n in settings.step_names()]),
-                    lambda pairs: status(pairs, settings.step_names()),
-                ),
-                Column(
-                    label="Age",
-                    title="",
-                    func=lambda pairs: [age(p) for p in pairs],
-                ),
-                Column(
-                    label="Duration",
-                    title="🕒",
-                    func=lambda pairs: [duration(p) for p in pairs],
-                ),
-            ],
-            pairs,
-        )
-        # _print_table(settings.step_names(), pairs, git, settings.integator)
-        now = f"\n{datetime.datetime.now().strftime('%H:%M:%S')}"
-        print(f"{now} | {_last_status_commit(pairs, set(settings.step_names()))}")
-
+        print_frame(settings, git, debug)
         time.sleep(0.3)
+
+
+def _churn_columns(settings: RootSettings, git: Git) -> list[Column]:
+    if not settings.integator.show_churn:
+        return []
+
+    def churn(pairs: list[tuple[Commit, Statuses]]) -> list[str]:
+        counts = git.change_counts([pair[0].hash for pair in pairs])
+        return [str(counts[pair[0].hash]) for pair in pairs]
+
+    return [Column(label="Churn", title="±", func=churn)]
+
+
+def print_frame(settings: RootSettings, git: Git, debug: bool):
+    """Print the status of the latest commits once."""
+    commits = git.log.get(8)
+    if not debug:
+        Shell().clear()
+
+    statuses = StepStatusRepo().get_many([entry.hash for entry in commits])
+    pairs = [(entry, statuses[entry.hash]) for entry in commits]
+
+    print(f"Integator {settings.version()}")
+    _print_ready_status(_ready_for_changes(pairs, set(settings.step_names())))
+    _print_table2(
+        [
+            Column("Hash", "", lambda pairs: [r[0].hash[0:5] for r in pairs]),
+            Column(
+                "Statuses",
+                "".join([n[0:2] for n in settings.step_names()]),
+                lambda pairs: status(pairs, settings.step_names()),
+            ),
+            Column(
+                label="Age",
+                title="",
+                func=lambda pairs: [age(p) for p in pairs],
+            ),
+            Column(
+                label="Duration",
+                title="🕒",
+                func=lambda pairs: [duration(p) for p in pairs],
+            ),
+            *_churn_columns(settings, git),
+        ],
+        pairs,
+    )
+    # _print_table(settings.step_names(), pairs, git, settings.integator)
+    now = f"\n{datetime.datetime.now().strftime('%H:%M:%S')}"
+    print(f"{now} | {_last_status_commit(pairs, set(settings.step_names()))}")
@@ -0,0 +1,190 @@
+import contextlib
+import contextvars
+import datetime as dt
+import functools
+import inspect
+import json
+import logging
+import pathlib
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Generator, ParamSpec, TypeVar, cast
+
+from integator.atomic_file import write_atomically
+
+log = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class _Span:
+    name: str
+    labels: Labels
+    start: float
+    counters: Counter[str] = field(default_factory=Counter[str])
+
+
+@dataclass
+class _Totals:
+    calls: int = 0
+    seconds: float = 0
+    counters: Counter[str] = field(default_factory=Counter[str])
+
+
+# The open spans of the current task or thread, innermost last. Copied into asyncio tasks and threads started with
+# asyncio.to_thread, so concurrent steps each get their own.
+_active: contextvars.ContextVar[tuple[_Span, ...]] = contextvars.ContextVar(
+    "integator_spans", default=()
+)
+_lock = threading.Lock()
+_totals: defaultdict[tuple[str, Labels], _Totals] = defaultdict(_Totals)
+_counters: Counter[str] = Counter()
+_jsonl_path: pathlib.Path | None = None
+_prometheus_path: pathlib.Path | None = None
+
+
+def configure_metrics(
+    jsonl: pathlib.Path | None, prometheus: pathlib.Path | None
+) -> None:
+    """Where to write span events as they finish, and where export() writes the aggregated metrics."""
+    global _jsonl_path, _prometheus_path
+    _jsonl_path = jsonl
+    _prometheus_path = prometheus
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add value to the counter, in total and for each of the open spans."""
+    with _lock:
+        _counters[name] += value
+        for span in _active.get():
+            span.counters[name] += value
+
+
+@contextlib.contextmanager
+def span(name: str, **labels: str) -> Generator[None, None, None]:
+    """Time the block. Counters incremented within it are attributed to it, and to its parents."""
+    current = _Span(name, tuple(sorted(labels.items())), time.perf_counter())
+    token = _active.set((*_active.get(), current))
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - current.start
+        _active.reset(token)
+        _record(current, duration)
+
+
+def timed(name: str) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """Decorate a function, or coroutine function, to run in a span."""
+
+    def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        if inspect.iscoroutinefunction(func):
+            coroutine_func = cast(Callable[P, Awaitable[Any]], func)
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                with span(name):
+                    return await coroutine_func(*args, **kwargs)
+
+            return cast(Callable[P, T], async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _record(current: _Span, duration: float) -> None:
+    with _lock:
+        totals = _totals[(current.name, current.labels)]
+        totals.calls += 1
+        totals.seconds += duration
+        totals.counters.update(current.counters)
+
+    if _jsonl_path is not None:
+        event = {
+            "span": current.name,
+            "labels": dict(current.labels),
+            "end": dt.datetime.now().isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "counters": dict(current.counters),
+            "parents": [parent.name for parent in _active.get()],
+        }
+        try:
+            # Appends of a single line are atomic, so several processes can write to the same file.
+            with _jsonl_path.open("a") as f:
+                f.write(json.dumps(event) + "\n")
+        except OSError as e:
+            log.warning(f"Could not write metrics to {_jsonl_path}: {e}")
+
+
+def _format_labels(labels: Labels) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+def prometheus_text() -> str:
+    """The metrics so far, in the Prometheus text exposition format."""
+    with _lock:
+        totals = {
+            key: (value.calls, value.seconds, Counter(value.counters))
+            for key, value in _totals.items()
+        }
+        counters = Counter(_counters)
+
+    lines = [
+        "# HELP integator_span_calls_total Number of times each span finished.",
+        "# TYPE integator_span_calls_total counter",
+        *(
+            f"integator_span_calls_total{{{_format_labels((('span', name), *labels))}}} {calls}"
+            for (name, labels), (calls, _, _) in sorted(totals.items())
+        ),
+        "# HELP integator_span_seconds_total Time spent in each span.",
+        "# TYPE integator_span_seconds_total counter",
+        *(
+            f"integator_span_seconds_total{{{_format_labels((('span', name), *labels))}}} {seconds:.6f}"
+            for (name, labels), (_, seconds, _) in sorted(totals.items())
+        ),
+    ]
+
+    for counter in sorted(counters):
+        metric = f"integator_{counter}_total"
+        span_metric = f"integator_span_{counter}_total"
+        description = counter.replace("_", " ")
+        lines += [
+            f"# HELP {metric} Total {description}.",
+            f"# TYPE {metric} counter",
+            f"{metric} {counters[counter]}",
+            f"# HELP {span_metric} Total {description} within each span, including nested spans.",
+            f"# TYPE {span_metric} counter",
+            *(
+                f"{span_metric}{{{_format_labels((('span', name), *labels))}}} {span_counters[counter]}"
+                for (name, labels), (_, _, span_counters) in sorted(totals.items())
+                if counter in span_counters
+            ),
+        ]
+
+    return "\n".join(lines) + "\n"
+
+
+def export() -> None:
+    """Write the metrics so far to the configured Prometheus textfile, if any."""
+    if _prometheus_path is None:
+        return
+
+    # The textfile collector may read at any time
+    try:
+        write_atomically(_prometheus_path, prometheus_text())
+    except OSError as e:
+        log.warning(f"Could not write metrics to {_prometheus_path}: {e}")
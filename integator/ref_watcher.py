@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+import logging
+import pathlib
+import threading
+from typing import Callable
+
+from watchdog.events import (
+    EVENT_TYPE_CLOSED_NO_WRITE,
+    EVENT_TYPE_OPENED,
+    FileSystemEvent,
+    FileSystemEventHandler,
+)
+from watchdog.observers import Observer
+
+from integator.git import git_common_dir, git_dir
+
+log = logging.getLogger(__name__)
+
+
+class _RefChangeHandler(FileSystemEventHandler):
+    def __init__(
+        self,
+        git_dir: pathlib.Path,
+        common_dir: pathlib.Path,
+        files: list[pathlib.Path],
+        on_change: Callable[[], None],
+    ) -> None:
+        self.files = {git_dir / "HEAD", common_dir / "packed-refs", *files}
+        self.refs_dir = common_dir / "refs"
+        self.on_change = on_change
+
+    def _is_relevant(self, raw_path: bytes | str) -> bool:
+        if not raw_path:
+            return False
+
+        path = pathlib.Path(
+            raw_path.decode() if isinstance(raw_path, bytes) else raw_path
+        )
+        # git writes refs to a lock file, then renames it. The rename is the event we want.
+        if path.suffix == ".lock":
+            return False
+
+        return path in self.files or path.is_relative_to(self.refs_dir)
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        # git reading a ref opens it too, which would wake us up after every git call.
+        if event.event_type in (EVENT_TYPE_OPENED, EVENT_TYPE_CLOSED_NO_WRITE):
+            return
+        if self._is_relevant(event.src_path) or self._is_relevant(event.dest_path):
+            log.debug(f"Refs changed: {event}")
+            self.on_change()
+
+
+class RefWatcher:
+    """Wakes up waiters when HEAD, a branch, packed-refs or the notes change, or one of files."""
+
+    def __init__(
+        self, source_dir: pathlib.Path, files: list[pathlib.Path] | None = None
+    ) -> None:
+        self.git_dir = git_dir(source_dir)
+        self.common_dir = git_common_dir(source_dir)
+        self.files = [file.absolute() for file in files or []]
+        self._changed = threading.Event()
+        # Waiters in event loops, which are woken up from the observer's thread.
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = (
+            set()
+        )
+        self._lock = threading.Lock()
+        self._observer = Observer()
+
+    def _on_change(self) -> None:
+        self._changed.set()
+        with self._lock:
+            for loop, changed in self._async_waiters:
+                loop.call_soon_threadsafe(changed.set)
+
+    def start(self) -> bool:
+        """Start watching. Returns False if filesystem events are not available."""
+        handler = _RefChangeHandler(
+            self.git_dir, self.common_dir, self.files, self._on_change
+        )
+        try:
+            # Only watch the files we care about, since e.g. .git/objects can be huge.
+            self._observer.schedule(handler, str(self.common_dir), recursive=False)
+            if self.git_dir != self.common_dir:
+                self._observer.schedule(handler, str(self.git_dir), recursive=False)
+            self._observer.schedule(
+                handler, str(self.common_dir / "refs"), recursive=True
+            )
+            for directory in {file.parent for file in self.files}:
+                self._observer.schedule(handler, str(directory), recursive=False)
+            self._observer.start()
+        except OSError as e:
+            # E.g. when running out of inotify watches
+            log.warning(f"Could not watch {self.common_dir} for changes: {e}")
+            return False
+
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the refs change, or the timeout passes. Returns whether they changed."""
+        changed = self._changed.wait(timeout)
+        self._changed.clear()
+        return changed
+
+    async def async_wait(self, timeout: float) -> bool:
+        """Like wait, without blocking the event loop."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._async_waiters.add(waiter)
+        try:
+            if not self._changed.is_set():
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+        finally:
+            with self._lock:
+                self._async_waiters.discard(waiter)
+
+        changed = self._changed.is_set()
+        self._changed.clear()
+        return changed
+
+    def stop(self) -> None:
+        if self._observer.is_alive():
+            self._observer.stop()
+            self._observer.join()
@@ -0,0 +1,122 @@
+import logging
+import pathlib
+import shlex
+import socket
+from typing import Protocol
+
+from integator.atomic_file import write_atomically
+from integator.basemodel import BaseModel
+from integator.settings import ResultCacheBackend
+from integator.shell import Shell
+from integator.step_status import Span
+
+log = logging.getLogger(__name__)
+
+RESULTS_REF = "refs/integator/results"
+
+
+class CachedResult(BaseModel):
+    """A step's success, shared with other machines."""
+
+    # The commit the step succeeded on, which need not exist locally
+    hash: str
+    span: Span
+    machine: str
+
+    @classmethod
+    def here(cls, hash: str, span: Span) -> "CachedResult":
+        return cls(hash=hash, span=span, machine=socket.gethostname())
+
+
+class ResultCache(Protocol):
+    """Successes keyed by content_key, so a step verified on one machine needn't run on another.
+
+    The cache is best effort: if it can't be reached, steps run as if it were empty.
+    """
+
+    def lookup(self, key: str) -> CachedResult | None: ...
+
+    def publish(self, key: str, result: CachedResult) -> None: ...
+
+
+class DirectoryCache(ResultCache):
+    """A directory of results, e.g. on a shared filesystem."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+    def _file(self, key: str) -> pathlib.Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def lookup(self, key: str) -> CachedResult | None:
+        try:
+            return CachedResult.model_validate_json(self._file(key).read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read cached result {key}: {e}")
+            return None
+
+    def publish(self, key: str, result: CachedResult) -> None:
+        try:
+            write_atomically(self._file(key), result.model_dump_json())
+        except OSError as e:
+            log.warning(f"Could not publish result {key}: {e}")
+
+
+class GitRemoteCache(ResultCache):
+    """Results stored as blobs under refs/integator/results/ on a git remote.
+
+    Each result is fetched on lookup and pushed on publish, so only the results that are needed
+    are transferred.
+    """
+
+    def __init__(self, remote: str) -> None:
+        self.remote = remote
+
+    def lookup(self, key: str) -> CachedResult | None:
+        ref = f"{RESULTS_REF}/{key}"
+        try:
+            Shell().run_quietly(
+                f"git fetch --quiet --no-tags {shlex.quote(self.remote)} +{ref}:{ref}"
+            )
+        except RuntimeError as e:
+            if "couldn't find remote ref" in str(e):
+                log.debug(f"No cached result {key} in {self.remote}")
+            else:
+                log.warning(
+                    f"Could not fetch cached result {key} from {self.remote}: {e}"
+                )
+            return None
+
+        try:
+            blob = Shell().run_quietly(f"git cat-file blob {ref}")
+            return CachedResult.model_validate_json("\n".join(blob))
+        except (RuntimeError, ValueError) as e:
+            log.warning(f"Could not read cached result {key}: {e}")
+            return None
+
+    def publish(self, key: str, result: CachedResult) -> None:
+        ref = f"{RESULTS_REF}/{key}"
+        try:
+            blob = Shell().run_quietly(
+                f"printf %s {shlex.quote(result.model_dump_json())} | git hash-object -w --stdin"
+            )[0]
+            Shell().run_quietly(f"git update-ref {ref} {blob}")
+            Shell().run_quietly(
+                f"git push --quiet {shlex.quote(self.remote)} +{ref}:{ref}"
+            )
+        except RuntimeError as e:
+            log.warning(f"Could not publish result {key} to {self.remote}: {e}")
+
+
+def result_cache(
+    location: str | None, backend: ResultCacheBackend
+) -> ResultCache | None:
+    if location is None:
+        return None
+    match backend:
+        case "directory":
+            return DirectoryCache(pathlib.Path(location))
+        case "git":
+            return GitRemoteCache(location)
@@ -1,59 +1,119 @@
+import asyncio
 import datetime
 import logging
-import tempfile
 from pathlib import Path
 
+from integator import step_index
 from integator.commit import Commit
 from integator.git import RootWorktree
+from integator.metrics import span, timed
+from integator.result_cache import ResultCache
 from integator.settings import StepSpec
 from integator.shell import RunResult, Shell, Stream
-from integator.step_status import ExecutionState, Span
+from integator.step_index import StepIndex
+from integator.step_status import (
+    ExecutionState,
+    ShardStatus,
+    Span,
+    StepStatus,
+    Task,
+)
 from integator.step_status_repo import StepStatusRepo
 
 
-def run_step(
+@timed("run_step")
+async def run_step(
     step: StepSpec,
     commit: Commit,
     root_worktree: RootWorktree,
     status_repo: StepStatusRepo,
     output_dir: Path,
     quiet: bool,
+    cancel: asyncio.Event | None = None,
+    result_cache: ResultCache | None = None,
 ) -> RunResult:
     # refactor: this is a lot of intermingled state, but unsure if it gives problems or if I should just let it be.
     log = logging.getLogger(f"{__name__}.{step.name}")
-    log_file = (
-        output_dir
-        / f"{datetime.datetime.now().strftime('%y%m%d%H%M%S')}-{commit.hash[0:4]}-{step.name.replace(' ', '-')}.log"
+    log_name = f"{datetime.datetime.now().strftime('%y%m%d%H%M%S')}-{commit.hash[0:4]}-{step.name.replace(' ', '-')}"
+    cmds = step.shard_cmds()
+    log_files = (
+        [output_dir / f"{log_name}.log"]
+        if len(cmds) == 1
+        else [output_dir / f"{log_name}-{index}.log" for index in range(len(cmds))]
     )
-    log_file.parent.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
-    statuses = status_repo.get(commit.hash)
     start_time = datetime.datetime.now()
+    shards = [
+        ShardStatus(
+            state=ExecutionState.IN_PROGRESS,
+            span=Span(start=start_time, end=None),
+            log=log_file,
+        )
+        for log_file in log_files
+    ]
+
+    def status() -> StepStatus:
+        task = Task(name=step.name, cmd=step.cmd)
+        if len(shards) == 1:
+            return StepStatus(
+                step=task, state=shards[0].state, span=shards[0].span, log=shards[0].log
+            )
+        return StepStatus.from_shards(task, list(shards))
 
     # refactor: we could move "starting" and "finishing" a step into the status repo
-    statuses.get(step.name).state = ExecutionState.IN_PROGRESS
-    statuses.get(step.name).span = Span(start=start_time, end=None)
-    statuses.get(step.name).log = log_file
-    status_repo.update(commit.hash, statuses)
+    # Other steps may run concurrently, so only update the status of this step.
+    await status_repo.async_update_step(commit.hash, status())
+
+    async def run_shard(index: int, worktree: Path) -> RunResult:
+        with span("step_command", step=step.name):
+            result = await Shell().async_run(
+                cmds[index],
+                output_file=log_files[index],
+                cwd=worktree,
+                stream=Stream.NO if quiet else Stream.YES,
+                cancel=cancel,
+                timeout_seconds=step.timeout_seconds,
+                inactivity_timeout_seconds=step.inactivity_timeout_seconds,
+            )
 
-    step_dir = Path(tempfile.gettempdir()) / f"integator-{commit.hash}"
-    worktree = root_worktree.init(step_dir, commit.hash)
+        cancelled = cancel is not None and cancel.is_set() and result.failed()
+        if result.timed_out:
+            log.warning(f"{step.name} timed out")
+        shards[index] = ShardStatus(
+            state=ExecutionState.CANCELLED
+            if cancelled
+            else ExecutionState.TIMED_OUT
+            if result.timed_out
+            else ExecutionState.from_exit_code(result.exit),
+            span=Span(start=start_time, end=datetime.datetime.now()),
+            log=log_files[index],
+        )
+        if len(shards) > 1:
+            # So shards that finish early show up before the whole step does
+            await status_repo.async_update_step(commit.hash, status())
+        return result
 
     # p1: make sure the cwd is the component dir in a monorepo
     # Not sure exactly how this works. Seems initialising the root worktree gives us the same path as we use on input, which is not technically correct.
     # Rather, it should return the dir of the root worktree, so we can append the component dir.
+    async with root_worktree.checkout(commit.hash) as worktree:
+        log.info(f"Running {step.name} in {worktree}")
+        # Shards share the worktree, like steps for the same commit do
+        results = await asyncio.gather(
+            *(run_shard(index, worktree) for index in range(len(cmds)))
+        )
+    result = next((result for result in results if result.failed()), results[-1])
 
-    log.info(f"Running {step.name} in {worktree}")
-    result = Shell().run(
-        step.cmd,
-        output_file=log_file,
-        cwd=worktree,
-        stream=Stream.NO if quiet else Stream.YES,
-    )
+    final = status()
+    if result.succeeded():
+        # So commits with the same content can reuse the result
+        await asyncio.to_thread(StepIndex.for_repo().record, step, commit.hash)
+        if result_cache is not None:
+            await asyncio.to_thread(
+                step_index.publish, result_cache, step, commit.hash, final.span
+            )
 
-    statuses.get(step.name).state = ExecutionState.from_exit_code(result.exit)
-    statuses.get(step.name).span = Span(start=start_time, end=datetime.datetime.now())
-    statuses.get(step.name).log = log_file
-    status_repo.update(commit.hash, statuses)
+    await status_repo.async_update_step(commit.hash, final)
 
     return result
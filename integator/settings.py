@@ -1,18 +1,23 @@
+import functools
 import importlib
 import importlib.metadata
 import json
 import logging
 import pathlib
-from typing import Tuple, Type
+import threading
+from typing import Callable, Literal, Tuple, Type
 
 import pydantic_settings
 import toml
-from pydantic import DirectoryPath, Field, field_validator
+from pydantic import DirectoryPath, Field, field_validator, model_validator
 
 from integator.basemodel import BaseModel
+from integator.git_backend import BackendName
 
 FILE_NAME = "integator.toml"
 
+ResultCacheBackend = Literal["directory", "git"]
+
 log = logging.getLogger(__name__)
 
 
@@ -54,6 +59,41 @@ class StepSpec(BaseModel):
     # feat: as an example, there is also "approving" a commit in GitHub actions.
 
     max_staleness_seconds: int = 0
+    # Names of steps that must succeed before this step runs. Steps that don't need each other can run in parallel.
+    needs: list[str] = Field(default_factory=list)
+    # Globs of the files the step depends on, e.g. ["src/*", "pyproject.toml"]. A commit where these files are
+    # unchanged from one the step succeeded on reuses that result. Defaults to the whole tree.
+    inputs: list[str] = Field(default_factory=list)
+    # Runs the step as this many processes in parallel, e.g. `pytest --shard-id={shard_index} --num-shards={shard_count}`.
+    # {shard_index} counts from 0, and must be in cmd if there is more than one shard. The step succeeds if all its
+    # shards do.
+    shards: int = Field(default=1, ge=1)
+    # The step, with all the processes it started, is killed if it runs longer than timeout_seconds, or goes
+    # inactivity_timeout_seconds without writing any output, e.g. when a test hangs. It is then marked as timed out.
+    timeout_seconds: float | None = Field(default=None, gt=0)
+    inactivity_timeout_seconds: float | None = Field(default=None, gt=0)
+    # When a new commit arrives while `watch` runs the step on an older one, the step is cancelled, so the new commit
+    # is worked on right away. Set to false to let the step finish in the background instead, e.g. if it is slow and
+    # its result reusable. It still counts toward max_parallel, and is cancelled if steps for newer commits need its
+    # worktree from the pool.
+    cancel_when_superseded: bool = Field(default=True)
+
+    @model_validator(mode="after")
+    def validate_shards(self) -> "StepSpec":
+        if self.shards > 1 and "{shard_index}" not in self.cmd:
+            raise ValueError(
+                f"Step {self.name} has {self.shards} shards, but its cmd has no {{shard_index}} to tell them apart"
+            )
+        return self
+
+    def shard_cmds(self) -> list[str]:
+        """The command of each shard, with the placeholders filled in."""
+        return [
+            self.cmd.replace("{shard_index}", str(index)).replace(
+                "{shard_count}", str(self.shards)
+            )
+            for index in range(self.shards)
+        ]
 
 
 def default_command() -> list[StepSpec]:
@@ -82,6 +122,27 @@ class IntegatorSettings(BaseModel):
     fail_fast: bool = Field(default=True)
     push_on_success: bool = Field(default=False)
     root_worktree_dir: DirectoryPath = Field(default=pathlib.Path.cwd())
+    # "cat-file" serves git queries over long-lived `git cat-file` processes instead of spawning git for each.
+    git_backend: BackendName = Field(default="shell")
+    # `watch` wakes up on changes to the git refs. This is how often it checks anyway, in case an event was missed.
+    watch_poll_seconds: int = Field(default=60)
+    # How many steps can run at the same time.
+    max_parallel: int = Field(default=1, ge=1)
+    # Steps run in a pool of worktrees, which are reused between commits.
+    worktree_pool_size: int = Field(default=2, ge=1)
+    # When the pooled worktrees use more disk than this, the least recently used are removed.
+    worktree_disk_budget_mb: int | None = Field(default=None)
+    # Timing spans, e.g. of git calls and steps, are appended here as JSON lines.
+    metrics_jsonl: pathlib.Path | None = Field(default=None)
+    # Totals of the spans and counters are written here in the Prometheus text format, e.g. for node-exporter's
+    # textfile collector.
+    metrics_prometheus: pathlib.Path | None = Field(default=None)
+    # Show the lines each commit inserted and deleted in `log` and the TUI.
+    show_churn: bool = Field(default=False)
+    # Successes are shared here, keyed by each step's command and the content it ran on, so a step that succeeded
+    # on another machine needn't run again. A directory, or with result_cache_backend = "git", a git remote.
+    result_cache: str | None = Field(default=None)
+    result_cache_backend: ResultCacheBackend = Field(default="directory")
 
     @classmethod
     @field_validator("source_dir")
@@ -91,6 +152,31 @@ class IntegatorSettings(BaseModel):
         v.mkdir(parents=True, exist_ok=True)
         return v
 
+    @model_validator(mode="after")
+    def validate_needs(self) -> "IntegatorSettings":
+        names = {step.name for step in self.steps}
+        for step in self.steps:
+            unknown = set(step.needs) - names
+            if unknown:
+                raise ValueError(f"Step {step.name} needs unknown steps: {unknown}")
+
+        needs = {step.name: step.needs for step in self.steps}
+        visited: set[str] = set()
+
+        def visit(name: str, path: list[str]):
+            if name in path:
+                cycle = " -> ".join([*path[path.index(name) :], name])
+                raise ValueError(f"Steps have circular needs: {cycle}")
+            if name in visited:
+                return
+            for need in needs[name]:
+                visit(need, [*path, name])
+            visited.add(name)
+
+        for name in needs:
+            visit(name, [])
+        return self
+
     @property
     def log_dir(self) -> pathlib.Path:
         return self.root_worktree_dir / ".logs"
@@ -111,22 +197,7 @@ class RootSettings(BaseModel):
 
     @classmethod
     def from_template(cls, template_name: str) -> "RootSettings":
-        app_templates_dir = pathlib.Path.home() / ".config" / "integator" / "templates"
-        app_templates_dir.mkdir(exist_ok=True, parents=True)
-
-        files = list(app_templates_dir.glob("*.toml"))
-        matching_config = [f for f in files if template_name.lower() in f.name.lower()]
-
-        if not matching_config:
-            raise ValueError(
-                f"No configuration in {app_templates_dir} matches {template_name}. Available: {files}"
-            )
-
-        if len(matching_config) > 1:
-            raise ValueError(f"Two matching configs, {matching_config}")
-
-        # There should never be more than one matching config
-        return RootSettings.from_toml(matching_config[0])
+        return RootSettings.from_toml(template_path(template_name))
 
     # feat: Log some info when init'ing here
 
@@ -147,6 +218,100 @@ class RootSettings(BaseModel):
         return importlib.metadata.version("integator")
 
 
+def template_path(template_name: str) -> pathlib.Path:
+    app_templates_dir = pathlib.Path.home() / ".config" / "integator" / "templates"
+    app_templates_dir.mkdir(exist_ok=True, parents=True)
+
+    files = list(app_templates_dir.glob("*.toml"))
+    matching_config = [f for f in files if template_name.lower() in f.name.lower()]
+
+    if not matching_config:
+        raise ValueError(
+            f"No configuration in {app_templates_dir} matches {template_name}. Available: {files}"
+        )
+
+    if len(matching_config) > 1:
+        raise ValueError(f"Two matching configs, {matching_config}")
+
+    # There should never be more than one matching config
+    return matching_config[0]
+
+
+class SettingsProvider:
+    """The settings in a file, parsed again only when its modification time or size changes.
+
+    Long-running loops call get() on each iteration, which only stats the file. Subscribers are
+    called with the new settings when they change. If the changed file is invalid or missing, e.g.
+    while an editor saves it, the previous settings are kept.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._settings: RootSettings | None = None
+        self._signature: tuple[int, int] | None = None
+        self._subscribers: list[Callable[[RootSettings], None]] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> RootSettings:
+        try:
+            stat = self.path.stat()
+        except OSError as e:
+            with self._lock:
+                if self._settings is None:
+                    raise
+                log.warning(
+                    f"Keeping previous settings, could not read {self.path}: {e}"
+                )
+                return self._settings
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._settings is not None and signature == self._signature:
+                return self._settings
+
+            try:
+                settings = RootSettings.from_toml(self.path)
+            except OSError as e:
+                if self._settings is None:
+                    raise
+                # Not remembering the signature, so the file is read again on the next call
+                log.warning(
+                    f"Keeping previous settings, could not read {self.path}: {e}"
+                )
+                return self._settings
+            except (ValueError, toml.TomlDecodeError) as e:
+                if self._settings is None:
+                    raise
+                log.warning(f"Ignoring invalid changes to {self.path}: {e}")
+                self._signature = signature
+                return self._settings
+
+            changed = self._settings is not None and settings != self._settings
+            self._settings = settings
+            self._signature = signature
+            subscribers = list(self._subscribers)
+
+        if changed:
+            log.info(f"Reloaded settings from {self.path}")
+            for subscriber in subscribers:
+                subscriber(settings)
+        return settings
+
+    def subscribe(self, callback: Callable[[RootSettings], None]) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+
+@functools.cache
+def _provider(path: pathlib.Path) -> SettingsProvider:
+    return SettingsProvider(path)
+
+
+def settings_provider(path: pathlib.Path) -> SettingsProvider:
+    """The provider for the settings file, shared by the whole process."""
+    return _provider(path.absolute())
+
+
 def find_settings_file() -> pathlib.Path | None:
     paths = list(pathlib.Path.cwd().parents) + [pathlib.Path.cwd()]
 
@@ -1,8 +1,17 @@
+import asyncio
+import contextlib
 import enum
+import os
+import signal
 import subprocess
 import sys
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
+from typing import IO
+
+from integator.metrics import count, span
 
 
 class ExitCode(enum.Enum):
@@ -22,6 +31,8 @@ class ExitCode(enum.Enum):
 class RunResult:
     exit: ExitCode
     output: str | None
+    # The command was killed by a timeout
+    timed_out: bool = False
 
     def succeeded(self) -> bool:
         return self.exit == ExitCode.OK
@@ -35,80 +46,295 @@ class Stream(enum.Enum):
     NO = False
 
 
+# The process groups of the commands that are running, so they can be terminated along with integator.
+_running: set[int] = set()
+_running_lock = threading.Lock()
+
+
+def terminate_running_commands(grace_seconds: float = 1) -> None:
+    """Terminate all running commands and their subprocesses, killing those that don't exit in time.
+
+    Blocks, so it can be called from a signal handler, e.g. when integator itself is terminated.
+    """
+    with _running_lock:
+        groups = set(_running)
+
+    for group in groups:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(group, signal.SIGTERM)
+
+    deadline = time.monotonic() + grace_seconds
+    while groups and time.monotonic() < deadline:
+        time.sleep(0.05)
+        groups = {group for group in groups if _group_exists(group)}
+
+    for group in groups:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(group, signal.SIGKILL)
+
+
+def _group_exists(group: int) -> bool:
+    try:
+        os.killpg(group, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+async def _async_kill_process_group(
+    process: asyncio.subprocess.Process, grace_seconds: float = 5
+):
+    """Terminate the process and all its subprocesses, killing them if they don't exit in time."""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), grace_seconds)
+        except TimeoutError:
+            pass
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class OutputTail:
+    """Keeps only the last max_bytes of a stream of output, so memory use doesn't grow with it."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._buffer = bytearray()
+
+    def append(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        # Trim in bulk, rather than on every chunk. Keeps one byte extra, to tell whether the tail starts on a new line.
+        if len(self._buffer) > 2 * self.max_bytes:
+            del self._buffer[: -(self.max_bytes + 1)]
+
+    def text(self) -> str:
+        start = max(len(self._buffer) - self.max_bytes, 0)
+        tail = self._buffer[start:]
+        if start > 0 and self._buffer[start - 1] != ord("\n") and b"\n" in tail:
+            # Start at a line boundary, rather than halfway through a line
+            tail = tail[tail.index(b"\n") + 1 :]
+        return tail.decode(errors="replace")
+
+
+def _write_to_terminal(chunk: bytes) -> None:
+    buffer: IO[bytes] | None = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        # E.g. when stdout has been replaced by a text-only stream
+        sys.stdout.write(chunk.decode(errors="replace"))
+    else:
+        buffer.write(chunk)
+    sys.stdout.flush()
+
+
+def _command_label(command: str) -> str:
+    """The program, and git's subcommand, e.g. "git log". Leaves out arguments, which vary between calls."""
+    words = command.split()
+    if not words or words[0] != "git":
+        return words[0] if words else ""
+
+    rest = iter(words[1:])
+    for word in rest:
+        if word in ("-C", "-c"):
+            next(rest, None)
+        elif not word.startswith("-"):
+            return f"git {word}"
+    return "git"
+
+
+DEFAULT_TAIL_BYTES = 64 * 1024
+_CHUNK_BYTES = 64 * 1024
+# How often a command's log is flushed while it runs, at most
+_FLUSH_SECONDS = 0.1
+
+
 class Shell:
     def clear(self) -> None:
         print("\033c", end="")
 
-    def _append_text(self, text: str, file: Path) -> None:
-        with file.open("a") as f:
-            f.write(text)
-
     def run(
         self,
         command: str,
         output_file: Path | None = None,
         stream: Stream = Stream.YES,
         cwd: Path | None = None,
+        cancel: threading.Event | None = None,
+        tail_bytes: int = DEFAULT_TAIL_BYTES,
+        timeout_seconds: float | None = None,
+        inactivity_timeout_seconds: float | None = None,
+    ) -> RunResult:
+        """Blocking version of async_run, for callers outside an event loop."""
+        return asyncio.run(
+            self.async_run(
+                command,
+                output_file,
+                stream,
+                cwd,
+                cancel,
+                tail_bytes,
+                timeout_seconds,
+                inactivity_timeout_seconds,
+            )
+        )
+
+    async def async_run(
+        self,
+        command: str,
+        output_file: Path | None = None,
+        stream: Stream = Stream.YES,
+        cwd: Path | None = None,
+        cancel: asyncio.Event | threading.Event | None = None,
+        tail_bytes: int = DEFAULT_TAIL_BYTES,
+        timeout_seconds: float | None = None,
+        inactivity_timeout_seconds: float | None = None,
     ) -> RunResult:
         """
         Runs a shell script and streams the output to a file, optionally displaying in terminal.
 
+        Output is read in large chunks as it becomes available, without blocking the event loop,
+        so several commands can run and stream at once. Only the last tail_bytes are kept in
+        memory for RunResult.output; the full output is in output_file.
+
         Args:
-            script_path: Path to the shell script to execute
+            command: The shell command to execute
             output_file: Path where the output should be saved
-            stream_to_terminal: If True, also display output in terminal
-            shell: If True, run command through shell
+            stream: If YES, also display output in terminal
+            cwd: The directory to run the command in
+            cancel: If set while running, the command and all its subprocesses are terminated
+            tail_bytes: How much of the end of the output to keep for RunResult.output
+            timeout_seconds: If the command runs longer, it and its subprocesses are terminated
+            inactivity_timeout_seconds: Like timeout_seconds, for how long the command goes without output
 
         Returns:
-            Tuple containing (return_code, error_message)
+            The exit code, the end of the output, and whether the command timed out
         """
+        process = None
+        log = None
+        read: asyncio.Future[bytes] | None = None
         try:
-            process = subprocess.Popen(
+            count("subprocesses")
+            process = await asyncio.create_subprocess_shell(
                 command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
                 cwd=cwd,
-                shell=True,
+                # Own process group, so the command can be terminated along with its subprocesses.
+                start_new_session=True,
             )
-            lines = [""]
+            with _running_lock:
+                _running.add(process.pid)
+            stdout: asyncio.StreamReader = process.stdout  # type: ignore
+
+            tail = OutputTail(tail_bytes)
             if output_file:
-                output_file.write_text(f"Running {command}\n in {cwd}\n")
+                # One buffered handle for the whole run, rather than opening the file for each line.
+                log = output_file.open("wb", buffering=1024 * 1024)
+                log.write(f"Running {command}\n in {cwd}\n".encode())
 
+            read = asyncio.ensure_future(stdout.read(_CHUNK_BYTES))
+            started = flushed = last_output = time.monotonic()
+            timeout: str | None = None
             while True:
-                output = process.stdout.readline()  # type: ignore
-                if output == "" and process.poll() is not None:
+                # Wakes up regularly to check for cancellation, which may come from another thread, and timeouts.
+                done, _ = await asyncio.wait({read}, timeout=0.1)
+                if cancel is not None and cancel.is_set():
+                    await _async_kill_process_group(process)
+                    cancel = None  # Read what remains of the output
+
+                now = time.monotonic()
+                if timeout is None:
+                    if timeout_seconds is not None and now - started >= timeout_seconds:
+                        timeout = f"Timed out after {timeout_seconds}s"
+                    elif (
+                        inactivity_timeout_seconds is not None
+                        and now - last_output >= inactivity_timeout_seconds
+                    ):
+                        timeout = f"Timed out after {inactivity_timeout_seconds}s without output"
+                    if timeout is not None:
+                        await _async_kill_process_group(process)
+
+                # So the log can be followed while the command runs
+                if log and time.monotonic() - flushed >= _FLUSH_SECONDS:
+                    log.flush()
+                    flushed = time.monotonic()
+
+                if not done:
+                    continue
+
+                chunk = read.result()
+                if not chunk:
                     break
+                read = asyncio.ensure_future(stdout.read(_CHUNK_BYTES))
+                last_output = time.monotonic()
 
-                if output:
-                    lines.append(output)  # type: ignore
+                tail.append(chunk)
+                count("output_bytes", len(chunk))
 
-                    # Optionally write to terminal
-                    if stream == Stream.YES:
-                        sys.stdout.write(output)
-                        sys.stdout.flush()
+                # Optionally write to terminal
+                if stream == Stream.YES:
+                    _write_to_terminal(chunk)
 
-                    if output_file:
-                        self._append_text(output, output_file)
+                if log:
+                    log.write(chunk)
 
             # Get return code
-            return_int = process.poll()
+            return_int = await process.wait()
             return_code = ExitCode.from_int(return_int)
 
-            if output_file:
-                self._append_text(
-                    f"int: {return_int}. Code: {return_code}", output_file
-                )
+            if log:
+                if timeout is not None:
+                    log.write(f"\n{timeout}\n".encode())
+                log.write(f"int: {return_int}. Code: {return_code}".encode())
 
             return RunResult(
-                exit=return_code,
-                output="".join(lines),  # type: ignore
+                # Even if the command happened to exit successfully as it was killed
+                exit=return_code if timeout is None else ExitCode.ERROR,
+                output=tail.text(),
+                timed_out=timeout is not None,
             )
         except Exception as e:
             return RunResult(
                 exit=ExitCode.ERROR,
                 output=str(e),
             )
+        finally:
+            if read is not None:
+                read.cancel()
+            if log:
+                log.close()
+            # E.g. when the task is cancelled, since the command is not in our process group it would otherwise keep running.
+            if process is not None and process.returncode is None:
+                await _async_kill_process_group(process)
+            if process is not None:
+                with _running_lock:
+                    _running.discard(process.pid)
+
+    async def async_run_quietly(self, command: str) -> list[str]:
+        """Like run_quietly, without blocking the event loop."""
+        with span("shell", command=_command_label(command)):
+            count("subprocesses")
+            process = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+            output, _ = await process.communicate()
+            count("output_bytes", len(output))
+
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"""{command} execution failed.
+    Exit code: {process.returncode}
+    Output: {output.decode("utf-8").strip()}"""
+            )
+
+        result = output.decode("utf-8").strip().split("\n")
+        if result == [""]:
+            return []
+        return result
 
     def run_interactively(self, command: str) -> None:
         try:
@@ -127,12 +353,13 @@ class Shell:
 
     def run_quietly(self, command: str) -> list[str]:
         try:
-            result = (
-                subprocess.check_output(command, shell=True, stderr=subprocess.STDOUT)
-                .decode("utf-8")
-                .strip()
-                .split("\n")
-            )
+            with span("shell", command=_command_label(command)):
+                count("subprocesses")
+                output = subprocess.check_output(
+                    command, shell=True, stderr=subprocess.STDOUT
+                )
+                count("output_bytes", len(output))
+            result = output.decode("utf-8").strip().split("\n")
             if result == [""]:
                 return []
             return result
@@ -0,0 +1,86 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+from integator.step_status import Statuses
+
+# Only abbreviated or full commit hashes are cached. Symbolic revisions, like HEAD, can
+# point to a new commit without the notes changing.
+_HASH_RE = re.compile(r"[0-9a-f]{4,40}")
+
+
+class StatusCache:
+    """In-process LRU cache of statuses, keyed on commit hash.
+
+    Entries are only valid for the value of the notes ref they were read at. Call `sync`
+    with the current value of the ref before reading from the cache.
+    """
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Statuses] = OrderedDict()
+        self._ref: str | None = None
+        self._lock = threading.Lock()
+
+    def sync(
+        self,
+        ref: str | None,
+        changed_since: Callable[[str, str], Iterable[str] | None],
+    ) -> None:
+        """Drop entries whose notes changed since the last sync.
+
+        `changed_since(old, new)` returns the full hashes of the commits whose notes
+        changed between the two values of the notes ref, or None if that is unknown.
+        """
+        with self._lock:
+            if ref == self._ref:
+                return
+
+            changed = (
+                changed_since(self._ref, ref)
+                if self._ref is not None and ref is not None
+                else None
+            )
+            self._ref = ref
+
+            if changed is None:
+                self._entries.clear()
+                return
+
+            changed = list(changed)
+            for key in list(self._entries):
+                if any(full_hash.startswith(key) for full_hash in changed):
+                    del self._entries[key]
+
+    def get_many(self, hashes: Iterable[str]) -> dict[str, Statuses]:
+        with self._lock:
+            hits: dict[str, Statuses] = {}
+            for hash in hashes:
+                if hash not in self._entries:
+                    continue
+                self._entries.move_to_end(hash)
+                # Callers mutate the statuses they get, so never hand out the cached instance.
+                hits[hash] = self._entries[hash].model_copy(deep=True)
+            return hits
+
+    def put_many(self, statuses: dict[str, Statuses], ref: str | None) -> None:
+        """Store statuses that were read while the notes ref had the value `ref`."""
+        with self._lock:
+            if ref != self._ref:
+                # The notes moved while the statuses were read, so they might already be outdated.
+                return
+
+            for hash, value in statuses.items():
+                if not _HASH_RE.fullmatch(hash):
+                    continue
+                self._entries[hash] = value.model_copy(deep=True)
+                self._entries.move_to_end(hash)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._ref = None
@@ -0,0 +1,181 @@
+import datetime as dt
+import functools
+import json
+import logging
+import pathlib
+from typing import Any, TypeVar
+
+import pydantic
+
+from integator.step_status import (
+    ExecutionState,
+    ShardStatus,
+    Span,
+    Statuses,
+    StepStatus,
+    Task,
+)
+
+log = logging.getLogger(__name__)
+
+# Notes written before versioning are the JSON of Statuses, i.e. version 1.
+NOTE_VERSION = 2
+
+# Each step is a row of [name, cmd, state, start, duration, log, reused_from, shards], where start is in milliseconds
+# after the note's base time "t", and duration in milliseconds. Trailing nulls are left out. Shards are rows of
+# [state, start, duration, log], for steps that have them.
+# E.g. {"v":2,"t":1733677624000,"s":[["Test","pytest",4,0,5120,".logs/2412-a1b2-Test.log"]]}
+
+
+def _epoch_ms(timestamp: dt.datetime) -> int:
+    # Timestamps are naive and local, like dt.datetime.now()
+    return round(timestamp.timestamp() * 1000)
+
+
+def _from_epoch_ms(epoch_ms: int) -> dt.datetime:
+    return dt.datetime.fromtimestamp(epoch_ms / 1000)
+
+
+def _relative_log(log: pathlib.Path | None, root: pathlib.Path) -> str | None:
+    if log is None:
+        return None
+    absolute = log.absolute()
+    return (
+        str(absolute.relative_to(root))
+        if absolute.is_relative_to(root)
+        else str(absolute)
+    )
+
+
+def encode(statuses: Statuses, root: pathlib.Path) -> str:
+    """A compact note for statuses. Log paths within root are stored relative to it."""
+    if not statuses.values:
+        return json.dumps({"v": NOTE_VERSION, "s": []}, separators=(",", ":"))
+
+    base = min(_epoch_ms(status.span.start) for status in statuses.values)
+
+    def timing(span: Span) -> list[int | None]:
+        start = _epoch_ms(span.start)
+        return [
+            start - base,
+            _epoch_ms(span.end) - start if span.end else None,
+        ]
+
+    rows: list[list[Any]] = []
+    for status in statuses.values:
+        row: list[Any] = [
+            status.step.name,
+            status.step.cmd,
+            status.state.value,
+            *timing(status.span),
+            _relative_log(status.log, root),
+            status.reused_from,
+            [
+                [
+                    shard.state.value,
+                    *timing(shard.span),
+                    _relative_log(shard.log, root),
+                ]
+                for shard in status.shards
+            ]
+            or None,
+        ]
+        while row[-1] is None:
+            row.pop()
+        rows.append(row)
+
+    return json.dumps(
+        {"v": NOTE_VERSION, "t": base, "s": rows},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
+def decode(note: str, root: pathlib.Path) -> Statuses:
+    """Statuses from a note in any version. Raises ValueError if it can't be parsed.
+
+    Compact notes are trusted, since integator wrote them, so are decoded without pydantic's validation.
+    """
+    if not note.startswith('{"v":'):
+        # Version 1
+        return Statuses.model_validate_json(note)
+
+    data = json.loads(note)
+    if data["v"] != NOTE_VERSION:
+        raise ValueError(f"Unsupported note version {data['v']}, upgrade integator")
+
+    base_ms = data.get("t", 0)
+    # Offsets are added to the base time, instead of converting every timestamp from the epoch. Across a change of
+    # the UTC offset, e.g. to daylight saving time, they are off by the change.
+    base = _from_epoch_ms(base_ms)
+
+    def span(start: int, duration: int | None) -> Span:
+        start_time = base + _MILLISECOND * start if start else base
+        return _construct(
+            Span,
+            start=start_time,
+            end=start_time + _MILLISECOND * duration if duration is not None else None,
+        )
+
+    values: list[StepStatus] = []
+    for row in data["s"]:
+        name, cmd, state, start = row[:4]
+        duration, log, reused_from, shards = [*row[4:], None, None, None, None][:4]
+        shard_rows: list[list[Any]] = shards or []
+        values.append(
+            _construct(
+                StepStatus,
+                step=_task(name, cmd),
+                state=_STATES[state],
+                span=span(start, duration),
+                log=_log_path(root, log) if log is not None else None,
+                reused_from=reused_from,
+                shards=[
+                    _construct(
+                        ShardStatus,
+                        state=_STATES[shard[0]],
+                        span=span(shard[1], shard[2]),
+                        log=_log_path(root, shard[3]) if shard[3] is not None else None,
+                    )
+                    for shard in shard_rows
+                ],
+            )
+        )
+    return _construct(Statuses, values=values)
+
+
+_STATES = {state.value: state for state in ExecutionState}
+_MILLISECOND = dt.timedelta(milliseconds=1)
+_setattr = object.__setattr__
+
+M = TypeVar("M", bound=pydantic.BaseModel)
+
+
+@functools.lru_cache(maxsize=1024)
+def _task(name: str, cmd: str) -> Task:
+    # The same steps are in every note, so share them between notes. Nothing modifies a Task.
+    return Task(name=name, cmd=cmd)
+
+
+@functools.lru_cache(maxsize=4096)
+def _log_path(root: pathlib.Path, log: str) -> pathlib.Path:
+    # A note is decoded again each time one of its steps changes, with the same logs for the other steps. Paths
+    # are immutable, and parsing them is a large part of decoding.
+    return root / log
+
+
+def _construct(cls: type[M], **values: Any) -> M:
+    """Like cls.model_construct, but faster, since it skips defaults. Every field must be given."""
+    model = cls.__new__(cls)
+    _setattr(model, "__dict__", values)
+    _setattr(model, "__pydantic_fields_set__", set(values))
+    _setattr(model, "__pydantic_extra__", None)
+    private = cls.__private_attributes__
+    _setattr(
+        model,
+        "__pydantic_private__",
+        {name: attr.get_default() for name, attr in private.items()}
+        if private
+        else None,
+    )
+    return model
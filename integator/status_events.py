@@ -0,0 +1,81 @@
+import enum
+import logging
+import os
+import select
+import threading
+from multiprocessing.connection import Connection
+
+from integator.basemodel import BaseModel
+from integator.metrics import count
+from integator.step_status import ExecutionState
+
+log = logging.getLogger(__name__)
+
+
+class EventKind(enum.Enum):
+    NEW_COMMIT = enum.auto()
+    STEP_STARTED = enum.auto()
+    STEP_FINISHED = enum.auto()
+
+
+class StatusEvent(BaseModel):
+    kind: EventKind
+    hash: str
+    step: str | None = None
+    state: ExecutionState | None = None
+
+
+# Where the process publishes events, e.g. the write end of a pipe to the TUI. Set by configure_events.
+_connection: Connection | None = None
+# Steps finish concurrently, and messages to a connection must not interleave.
+_lock = threading.Lock()
+
+
+# Writes to a pipe up to this size are atomic, so a message is either written whole or not at all. The
+# connection prefixes each message with its 4 byte length.
+_MAX_MESSAGE_BYTES = select.PIPE_BUF - 4
+
+
+def configure_events(connection: Connection | None) -> None:
+    """Publish status events to connection. With None, events are dropped.
+
+    Writes don't block, so a reader that falls behind can't hold up the steps. Events that don't
+    fit in the pipe are dropped, and the reader has to poll for them instead.
+    """
+    global _connection
+    if connection is not None:
+        os.set_blocking(connection.fileno(), False)
+    with _lock:
+        _connection = connection
+
+
+def publish(event: StatusEvent) -> None:
+    global _connection
+    with _lock:
+        if _connection is None:
+            return
+        # JSON rather than pickles, so the reader doesn't have to be Python
+        message = event.model_dump_json().encode()
+        if len(message) > _MAX_MESSAGE_BYTES:
+            log.debug(f"Dropping status event of {len(message)} bytes: {event}")
+            count("status_events_dropped")
+            return
+        try:
+            _connection.send_bytes(message)
+        except BlockingIOError:
+            # The reader isn't keeping up
+            count("status_events_dropped")
+        except OSError as e:
+            log.warning(f"Could not publish status events, stopping: {e}")
+            _connection = None
+
+
+def receive(connection: Connection) -> list[StatusEvent] | None:
+    """The events waiting on connection, without blocking. None once the publisher has closed it."""
+    events: list[StatusEvent] = []
+    try:
+        while connection.poll():
+            events.append(StatusEvent.model_validate_json(connection.recv_bytes()))
+    except (EOFError, OSError):
+        return None
+    return events
@@ -0,0 +1,123 @@
+import fnmatch
+import functools
+import hashlib
+import json
+import logging
+import pathlib
+
+from integator.atomic_file import locked, write_atomically
+from integator.git import git_common_dir
+from integator.result_cache import CachedResult, ResultCache
+from integator.settings import StepSpec
+from integator.shell import Shell
+from integator.step_status import ExecutionState, Span, StepStatus, Task
+from integator.step_status_repo import StepStatusRepo
+
+log = logging.getLogger(__name__)
+
+# Oldest entries are dropped beyond this, so the index doesn't grow without bound.
+_MAX_ENTRIES = 10_000
+
+# Commits are immutable, so the hashes never go stale. Bounded, since `watch` sees new commits
+# for as long as it runs.
+_MAX_CACHED_HASHES = 4096
+
+
+@functools.lru_cache(maxsize=_MAX_CACHED_HASHES)
+def _tree_hash(hash: str) -> str:
+    values = Shell().run_quietly(f"git rev-parse {hash}^{{tree}}")
+    if not values:
+        raise RuntimeError(f"No tree found for {hash}")
+    return values[0]
+
+
+@functools.lru_cache(maxsize=_MAX_CACHED_HASHES)
+def _inputs_hash(hash: str, inputs: tuple[str, ...]) -> str:
+    # "<mode> <type> <oid>\t<path>" for each file in the commit
+    entries = Shell().run_quietly(f"git ls-tree -r --full-tree {hash}")
+    matching = [
+        entry
+        for entry in entries
+        if any(fnmatch.fnmatch(entry.split("\t", 1)[1], glob) for glob in inputs)
+    ]
+    return hashlib.sha1("\n".join(matching).encode()).hexdigest()
+
+
+def content_key(step: StepSpec, hash: str) -> str:
+    """A key for everything the step's result depends on at the commit.
+
+    That is the step's command, and either the commit's tree or, if the step has inputs, the
+    files matching them. Commits are immutable, so keys are cached per commit.
+    """
+    content = (
+        _inputs_hash(hash, tuple(step.inputs)) if step.inputs else _tree_hash(hash)
+    )
+    return hashlib.sha1(f"{step.name}\0{step.cmd}\0{content}".encode()).hexdigest()
+
+
+class StepIndex:
+    """Which commit each successful step ran on, keyed by the step's content key.
+
+    A commit with the same content as one a step already succeeded on, e.g. after a rebase or
+    an amend that only changed the message, can reuse that result instead of running the step.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+
+    @classmethod
+    def for_repo(cls) -> "StepIndex":
+        return cls(git_common_dir() / "integator" / "verified-steps.json")
+
+    def _read(self) -> dict[str, str]:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, step: StepSpec, hash: str) -> str | None:
+        """The hash of a commit the step succeeded on, with the same content as hash."""
+        return self._read().get(content_key(step, hash))
+
+    def record(self, step: StepSpec, hash: str) -> None:
+        key = content_key(step, hash)
+        with locked(self.path):
+            entries = self._read()
+            entries.pop(key, None)
+            entries[key] = hash
+            while len(entries) > _MAX_ENTRIES:
+                del entries[next(iter(entries))]
+            write_atomically(self.path, json.dumps(entries))
+
+    def reusable(self, step: StepSpec, hash: str) -> StepStatus | None:
+        """A copy of the step's successful status from a commit with the same content."""
+        original_hash = self.lookup(step, hash)
+        if original_hash is None or original_hash == hash:
+            return None
+
+        original = StepStatusRepo.get(original_hash).lookup(step.name)
+        if original is None or original.state != ExecutionState.SUCCESS:
+            # The original has been re-run or cleared since
+            return None
+
+        return original.model_copy(update={"reused_from": original_hash}, deep=True)
+
+
+def cached(cache: ResultCache, step: StepSpec, hash: str) -> StepStatus | None:
+    """The step's success on a commit with the same content as hash, e.g. on another machine."""
+    result = cache.lookup(content_key(step, hash))
+    if result is None:
+        return None
+
+    return StepStatus(
+        step=Task(name=step.name, cmd=step.cmd),
+        state=ExecutionState.SUCCESS,
+        span=result.span,
+        # The log is on the machine that ran the step
+        log=None,
+        reused_from=result.hash,
+    )
+
+
+def publish(cache: ResultCache, step: StepSpec, hash: str, span: Span) -> None:
+    cache.publish(content_key(step, hash), CachedResult.here(hash, span))
@@ -0,0 +1,175 @@
+import asyncio
+import functools
+import logging
+from collections.abc import Iterable, Set
+from typing import Any, Awaitable, Callable
+
+from integator.settings import StepSpec
+from integator.shell import RunResult
+
+log = logging.getLogger(__name__)
+
+
+class BackgroundSteps:
+    """Steps for superseded commits, left to finish while newer commits are worked on.
+
+    They count toward max_parallel. Each commit's steps share a worktree from the pool, so to keep
+    one for the latest commit, at most max_commits commits have steps in the background. Leaving
+    steps for another commit cancels those of the oldest one.
+    """
+
+    def __init__(self, max_commits: int) -> None:
+        self.max_commits = max_commits
+        # Oldest first, with the commit, step name and cancel event of each
+        self._steps: dict[asyncio.Task[RunResult], tuple[str, str, asyncio.Event]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tasks())
+
+    def tasks(self) -> set[asyncio.Task[RunResult]]:
+        return {task for task in self._steps if not task.done()}
+
+    def running(self, hash: str, step: str) -> bool:
+        """Whether the step is still running for the commit, so it must not be started again."""
+        return any(
+            (commit, name) == (hash, step)
+            for task, (commit, name, _) in self._steps.items()
+            if not task.done()
+        )
+
+    def add(
+        self,
+        hash: str,
+        step: StepSpec,
+        task: asyncio.Task[RunResult],
+        cancel: asyncio.Event,
+    ) -> None:
+        self._steps[task] = (hash, step.name, cancel)
+        task.add_done_callback(functools.partial(self._done, step))
+
+        commits = list(
+            dict.fromkeys(
+                commit
+                for commit, _, cancel in self._steps.values()
+                if not cancel.is_set()
+            )
+        )
+        for oldest in commits[: max(0, len(commits) - self.max_commits)]:
+            for commit, name, cancel in self._steps.values():
+                if commit == oldest and not cancel.is_set():
+                    log.info(
+                        f"Cancelling {name} on {commit}, to make room in the worktree pool"
+                    )
+                    cancel.set()
+
+    def _done(self, step: StepSpec, task: asyncio.Task[RunResult]) -> None:
+        del self._steps[task]
+        if not task.cancelled() and task.exception() is not None:
+            log.error(
+                f"{step.name} failed in the background", exc_info=task.exception()
+            )
+
+
+async def run_steps(
+    steps: list[StepSpec],
+    run: Callable[[StepSpec, asyncio.Event], Awaitable[RunResult]],
+    max_parallel: int,
+    fail_fast: bool,
+    satisfied: Set[str] = frozenset(),
+    superseded: asyncio.Event | None = None,
+    background: BackgroundSteps | None = None,
+    commit: str = "",
+) -> dict[str, RunResult]:
+    """Run each step once all the steps it needs have succeeded, at most max_parallel at a time.
+
+    All steps run as tasks in the same event loop, which wait for their commands' processes.
+    Needs that are not among the steps must be in `satisfied`, otherwise the step does not run.
+    Each step is passed an event, which is set to cancel it. With fail_fast, the first failure
+    cancels the running steps, and no new steps are started. Once `superseded` is set, e.g.
+    because there is a newer commit, no new steps are started either, and the running steps are
+    cancelled unless they should finish anyway. Those are added to `background` for `commit` and
+    left to run, so the caller can move on. Without `background`, they are waited for. Steps in
+    `background` count toward max_parallel, so steps wait for room once it is full.
+    """
+    cancels = {step.name: asyncio.Event() for step in steps}
+    stopped = False
+    pending = {step.name: step for step in steps}
+    succeeded = set(satisfied)
+    results: dict[str, RunResult] = {}
+    running: dict[asyncio.Task[RunResult], StepSpec] = {}
+    superseding = (
+        asyncio.ensure_future(superseded.wait()) if superseded is not None else None
+    )
+
+    def cancel(steps: Iterable[StepSpec]) -> None:
+        for step in steps:
+            cancels[step.name].set()
+
+    try:
+        while True:
+            if not stopped:
+                ready = [
+                    step
+                    for step in pending.values()
+                    if succeeded.issuperset(step.needs)
+                ]
+                room = max_parallel - len(running) - len(background or ())
+                for step in ready[:room]:
+                    log.debug(f"Starting {step.name}")
+                    del pending[step.name]
+                    running[asyncio.ensure_future(run(step, cancels[step.name]))] = step
+                # Waiting for steps in the background to make room
+                blocked = len(ready) > room
+            else:
+                blocked = False
+
+            if not running and not blocked:
+                break
+
+            waiting: set[asyncio.Future[Any]] = set(running)
+            if blocked and background is not None:
+                waiting |= background.tasks()
+            if superseding is not None:
+                waiting.add(superseding)
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if superseding is not None and superseding in done:
+                log.info("Superseded, cancelling running steps")
+                stopped = True
+                cancel(step for step in running.values() if step.cancel_when_superseded)
+                superseding = None
+                if background is not None:
+                    for task, step in list(running.items()):
+                        if not step.cancel_when_superseded and task not in done:
+                            log.info(f"Leaving {step.name} to finish in the background")
+                            del running[task]
+                            background.add(commit, step, task, cancels[step.name])
+
+            for task in [task for task in running if task in done]:
+                step = running.pop(task)
+                try:
+                    result = task.result()
+                except BaseException:
+                    # Let the other steps stop their commands before giving up
+                    cancel(running.values())
+                    await asyncio.gather(*running, return_exceptions=True)
+                    raise
+
+                results[step.name] = result
+                if result.succeeded():
+                    succeeded.add(step.name)
+                elif fail_fast and not stopped:
+                    log.error(f"{step.name} failed. Fail fast enabled, cancelling.")
+                    stopped = True
+                    cancel(running.values())
+    finally:
+        if superseding is not None:
+            superseding.cancel()
+
+    for step in pending.values():
+        if stopped:
+            log.info(f"Skipping {step.name}, since a step failed or it was superseded")
+        else:
+            log.info(f"Skipping {step.name}, since not all of {step.needs} succeeded")
+
+    return results
@@ -1,15 +1,14 @@
 import datetime as dt
 import pathlib
 from enum import Enum, auto
-from functools import reduce
 from typing import Set
 
-import humanize
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from integator.basemodel import BaseModel
 from integator.emojis import Emojis
 from integator.shell import ExitCode
+from integator.tail import tail_lines
 
 
 class ExecutionState(Enum):
@@ -17,6 +16,9 @@ class ExecutionState(Enum):
     IN_PROGRESS = auto()
     FAILURE = auto()
     SUCCESS = auto()
+    CANCELLED = auto()
+    # Killed for running longer than the step's timeout, or for not writing output for too long
+    TIMED_OUT = auto()
 
     def __str__(self):
         match self:
@@ -28,6 +30,13 @@ class ExecutionState(Enum):
                 return Emojis.FAIL.value
             case self.SUCCESS:
                 return Emojis.OK.value
+            case self.CANCELLED:
+                return Emojis.CANCELLED.value
+            case self.TIMED_OUT:
+                return Emojis.TIMED_OUT.value
+
+    def failed(self) -> bool:
+        return self in (ExecutionState.FAILURE, ExecutionState.TIMED_OUT)
 
     @classmethod
     def from_exit_code(cls, exit_code: ExitCode) -> "ExecutionState":
@@ -54,14 +63,60 @@ class Span(BaseModel):
         return self.end - self.start
 
     def __str__(self):
+        # Imported here, since only displaying statuses needs it
+        import humanize
+
         return f"{humanize.naturaldelta(self.duration())}"
 
 
+class ShardStatus(BaseModel):
+    state: ExecutionState
+    span: Span
+    log: pathlib.Path | None
+
+
 class StepStatus(BaseModel):
     step: Task
     state: ExecutionState
     span: Span
     log: pathlib.Path | None
+    # The hash of the commit this result was copied from, if the step didn't run on this commit.
+    reused_from: str | None = None
+    # For a step with shards, the status of each. The step's state, span and log combine them.
+    shards: list[ShardStatus] = Field(default_factory=list)  # type: ignore
+
+    @classmethod
+    def from_shards(cls, step: Task, shards: list[ShardStatus]) -> "StepStatus":
+        """The step is in progress while any shard is, and otherwise failed if any shard did.
+
+        Its log is that of the first shard in that state, e.g. the one to look at for a failure.
+        """
+        states = {shard.state for shard in shards}
+        state = next(
+            (
+                state
+                for state in (
+                    ExecutionState.IN_PROGRESS,
+                    ExecutionState.FAILURE,
+                    ExecutionState.TIMED_OUT,
+                    ExecutionState.CANCELLED,
+                    ExecutionState.UNKNOWN,
+                )
+                if state in states
+            ),
+            ExecutionState.SUCCESS,
+        )
+        ends = [shard.span.end for shard in shards]
+        return cls(
+            step=step,
+            state=state,
+            span=Span(
+                start=min(shard.span.start for shard in shards),
+                end=None if None in ends else max(end for end in ends if end),
+            ),
+            log=next(shard.log for shard in shards if shard.state == state),
+            shards=shards,
+        )
 
     @classmethod
     def unknown(cls, step: Task) -> "StepStatus":
@@ -85,16 +140,14 @@ class StepStatus(BaseModel):
         if self.log is None:
             return ""
 
-        log_lines = self.log.read_text().split("\n")
-        lines_in_log = len(log_lines)
-
-        excess_lines = lines_in_log >= n_lines
-        excerpted_lines = log_lines[-n_lines:] if excess_lines else log_lines
-        return "\n".join(excerpted_lines)
+        return "\n".join(tail_lines(self.log, n_lines))
 
 
 class Statuses(BaseModel):
+    # The wire format is a list, but lookups by name go through an index of positions in it. Modify the
+    # statuses with the methods below, so the index stays in sync.
     values: list[StepStatus] = Field(default_factory=list)  # type: ignore
+    _index: dict[str, int] | None = PrivateAttr(default=None)
 
     def __str__(self):
         return f"[{''.join(str(status.state) for status in self.values)}]"
@@ -103,37 +156,58 @@ class Statuses(BaseModel):
     def from_str(cls: type["Statuses"], line: str) -> "Statuses":
         return cls.model_validate_json(line)
 
+    def __eq__(self, other: object) -> bool:
+        # The index is a cache, so isn't compared
+        return isinstance(other, Statuses) and self.values == other.values
+
+    def _positions(self) -> dict[str, int]:
+        if self._index is None:
+            index: dict[str, int] = {}
+            for idx, status in enumerate(self.values):
+                index.setdefault(status.step.name, idx)
+            self._index = index
+        return self._index
+
     def names(self) -> set[str]:
-        return {status.step.name for status in self.values}
+        return set(self._positions())
 
     def remove(self, name: str):
         self.values = [status for status in self.values if status.step.name != name]
+        self._index = None
 
     def replace(self, new: StepStatus):
-        self.values = [
-            status for status in self.values if status.step.name != new.step.name
-        ]
-        self.add(new)
+        # Keep the position of the existing status, so the order of steps is stable.
+        idx = self._positions().get(new.step.name)
+        if idx is None:
+            self.add(new)
+        else:
+            self.values[idx] = new
 
-    def get(self, name: str) -> StepStatus:
-        matching = [step for step in self.values if step.step.name == name]
+    def lookup(self, name: str) -> StepStatus | None:
+        idx = self._positions().get(name)
+        return None if idx is None else self.values[idx]
+
+    def state(self, name: str) -> ExecutionState:
+        status = self.lookup(name)
+        return ExecutionState.UNKNOWN if status is None else status.state
 
-        if len(matching) == 0:
-            new_status = StepStatus(
+    def get(self, name: str) -> StepStatus:
+        """The status of the step, or an unknown status if it hasn't run. Use lookup or state to avoid the allocation."""
+        status = self.lookup(name)
+        if status is None:
+            return StepStatus(
                 step=Task(name=name, cmd=str("UNKNOWN")),
                 state=ExecutionState.UNKNOWN,
                 span=Span(start=dt.datetime.now(), end=dt.datetime.now()),
                 log=None,
             )
-            self.add(new_status)
-            return new_status
-
-        return matching[0]
+        return status
 
     def duration(self) -> dt.timedelta:
-        return reduce(lambda x, y: x + y, [s.span.duration() for s in self.values])
+        return sum((s.span.duration() for s in self.values), dt.timedelta())
 
     def add(self, step_status: StepStatus):
+        self._positions().setdefault(step_status.step.name, len(self.values))
         self.values.append(step_status)
 
     def contains(self, status: ExecutionState) -> bool:
@@ -143,16 +217,13 @@ class Statuses(BaseModel):
         return self.all(names, ExecutionState.SUCCESS)
 
     def all(self, names: Set[str], expected_state: ExecutionState) -> bool:
-        for name in names:
-            if not self.get(name).state == expected_state:
-                return False
-        return True
+        return all(self.state(name) == expected_state for name in names)
 
     def get_failures(self) -> list[StepStatus]:
-        return [step for step in self.values if step.state == ExecutionState.FAILURE]
+        return [step for step in self.values if step.state.failed()]
 
     def has_failed(self) -> bool:
-        return self.contains(ExecutionState.FAILURE)
+        return any(step.state.failed() for step in self.values)
 
     def is_pushed(self) -> bool:
-        return self.get("Push").state == ExecutionState.SUCCESS
+        return self.state("Push") == ExecutionState.SUCCESS
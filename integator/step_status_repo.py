@@ -1,54 +1,175 @@
+import asyncio
 import logging
-import re
-
-import pydantic
+import shlex
+import threading
+from typing import Sequence
 
+from integator import status_encoding
 from integator.commit import Commit
+from integator.git import git_toplevel, read_ref
+from integator.git_backend import NOTES_REF, backend
+from integator.last_success import LastSuccessIndex
+from integator.metrics import count, span, timed
 from integator.settings import StepSpec
 from integator.shell import Shell
-from integator.step_status import Statuses
+from integator.status_cache import StatusCache
+from integator.status_events import EventKind, StatusEvent, publish
+from integator.step_status import ExecutionState, Statuses, StepStatus
 
 log = logging.getLogger(__name__)
 
+# Shared by all StepStatusRepo instances in the process, since the notes are too.
+_cache = StatusCache()
 
-class StepStatusRepo:
-    FORMAT_STR = '--pretty=format:"C|%h| T|%ar| A|%aN| N|%N%-C()|%-C()"'
+# Commits whose notes couldn't be decoded, e.g. because a newer integator wrote them. They are never
+# overwritten, so what they hold isn't lost.
+_undecodable: set[str] = set()
+
+# Steps run concurrently, so read-modify-write of a commit's statuses must not interleave.
+_update_lock = threading.Lock()
 
+
+class StepStatusRepo:
     @staticmethod
     def clear(commit: Commit, steps: list[StepSpec]):
         log.debug(f"Clearing notes for {commit.hash}")
 
-        statuses = StepStatusRepo.get(commit.hash)
+        with _update_lock:
+            statuses = StepStatusRepo.get(commit.hash)
 
-        for step in steps:
-            statuses.remove(step.name)
+            for step in steps:
+                statuses.remove(step.name)
 
-        # Persist the cleared statuses back to git notes
-        StepStatusRepo.update(commit.hash, statuses)
+            # Persist the cleared statuses back to git notes
+            StepStatusRepo.update(commit.hash, statuses)
 
     # refactor: instead of a hash, should we take a commit, to be even more type-safe?
     # OTOH, it is less flexible, and sets an artificially high requirement set.
     @staticmethod
     def get(hash: str) -> Statuses:
-        log.debug(f"Getting notes for {hash}")
+        return StepStatusRepo.get_many([hash])[hash]
+
+    @staticmethod
+    @timed("StepStatusRepo.get_many")
+    def get_many(hashes: Sequence[str]) -> dict[str, Statuses]:
+        """Get the statuses for all hashes with at most a single git invocation.
+
+        Statuses are served from the in-process cache while the notes ref hasn't moved.
+        """
+        unique = list(dict.fromkeys(hashes))
+        if not unique:
+            return {}
 
-        log_str = Shell().run_quietly(f"git log -1 {hash} {StepStatusRepo.FORMAT_STR}")
+        cached, missing, ref = _plan(unique)
+        notes = backend().notes(missing) if missing else {}
+        return _complete(unique, cached, notes, ref)
 
-        if len(log_str) > 1:
-            raise RuntimeError("More than one commit matches hash")
+    @staticmethod
+    async def async_get(hash: str) -> Statuses:
+        return (await StepStatusRepo.async_get_many([hash]))[hash]
 
-        notes = re.search(r"N\|(.*?)\|", log_str[0])
+    @staticmethod
+    @timed("StepStatusRepo.get_many")
+    async def async_get_many(hashes: Sequence[str]) -> dict[str, Statuses]:
+        """Like get_many, without blocking the event loop."""
+        unique = list(dict.fromkeys(hashes))
+        if not unique:
+            return {}
+
+        # Only spawns git if the notes have changed since the last sync.
+        cached, missing, ref = await asyncio.to_thread(_plan, unique)
+        notes = await backend().async_notes(missing) if missing else {}
+        return _complete(unique, cached, notes, ref)
 
-        if not notes:
-            raise RuntimeError("No values returned from git log")
+    @staticmethod
+    @timed("StepStatusRepo.update_step")
+    def update_step(hash: str, status: StepStatus):
+        """Record the status of one step, keeping the statuses of the other steps."""
+        with _update_lock:
+            statuses = StepStatusRepo.get(hash)
+            statuses.replace(status)
+            StepStatusRepo.update(hash, statuses)
+
+        publish(
+            StatusEvent(
+                kind=EventKind.STEP_STARTED
+                if status.state == ExecutionState.IN_PROGRESS
+                else EventKind.STEP_FINISHED,
+                hash=hash,
+                step=status.step.name,
+                state=status.state,
+            )
+        )
 
-        try:
-            return Statuses.from_str(notes.groups()[0])
-        except pydantic.ValidationError:
-            return Statuses()
+    @staticmethod
+    async def async_update_step(hash: str, status: StepStatus):
+        """Like update_step, without blocking the event loop."""
+        await asyncio.to_thread(StepStatusRepo.update_step, hash, status)
 
     @staticmethod
+    @timed("StepStatusRepo.update")
     def update(hash: str, statuses: Statuses):
+        if hash in _undecodable:
+            raise RuntimeError(
+                f"Could not decode the notes on {hash}, so not overwriting them. If they were written by a newer "
+                f"version of integator, upgrade it. Otherwise remove them with `git notes remove {hash}`."
+            )
         log.debug(f"Updating notes for {hash} with {statuses.names()}")
-        notes = statuses.model_dump_json()
-        Shell().run_quietly(f"git notes add -f -m '{notes}' {hash}")
+        notes = status_encoding.encode(statuses, git_toplevel())
+        Shell().run_quietly(f"git notes add -f -m {shlex.quote(notes)} {hash}")
+        LastSuccessIndex.for_repo().record(hash, statuses)
+
+
+def _plan(unique: list[str]) -> tuple[dict[str, Statuses], list[str], str | None]:
+    """The cached statuses, the hashes whose notes must be read, and the notes ref they are read at."""
+    ref = read_ref(NOTES_REF)
+    _cache.sync(ref, _changed_notes)
+    cached = _cache.get_many(unique)
+    count("status_cache_hits", len(cached))
+    missing = [hash for hash in unique if hash not in cached]
+    if missing:
+        log.debug(f"Getting notes for {missing}")
+    return cached, missing, ref
+
+
+def _complete(
+    unique: list[str],
+    cached: dict[str, Statuses],
+    notes: dict[str, str],
+    ref: str | None,
+) -> dict[str, Statuses]:
+    """The statuses of all hashes, caching those parsed from the notes that were read."""
+    fetched = _parse_all(notes) if notes else {}
+    _cache.put_many(fetched, ref)
+    results = cached | fetched
+    return {hash: results[hash] for hash in unique}
+
+
+def _parse_all(notes: dict[str, str]) -> dict[str, Statuses]:
+    with span("parse_notes"):
+        count("status_cache_misses", len(notes))
+        return {hash: _parse_notes(hash, value) for hash, value in notes.items()}
+
+
+def _parse_notes(hash: str, notes: str) -> Statuses:
+    _undecodable.discard(hash)
+    if not notes:
+        return Statuses()
+
+    try:
+        return status_encoding.decode(notes, git_toplevel())
+    except (ValueError, KeyError, TypeError) as e:
+        log.warning(f"Could not parse notes on {hash}, ignoring them: {e}")
+        _undecodable.add(hash)
+        return Statuses()
+
+
+def _changed_notes(old: str, new: str) -> list[str] | None:
+    """The full hashes of the commits whose notes changed between two values of the notes ref."""
+    try:
+        paths = Shell().run_quietly(f"git diff-tree -r --name-only {old} {new}")
+    except RuntimeError:
+        return None
+
+    # Notes are stored at paths like "ab/cdef..." once there are many of them.
+    return [path.replace("/", "") for path in paths]
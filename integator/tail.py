@@ -0,0 +1,110 @@
+import codecs
+import functools
+import mmap
+import os
+from pathlib import Path
+
+_BLOCK_BYTES = 64 * 1024
+
+
+def tail_lines(path: Path, n_lines: int, use_mmap: bool = False) -> list[str]:
+    """The last n_lines of the file, like `path.read_text().split("\\n")[-n_lines:]`.
+
+    Only reads the end of the file, backwards from its end. Results are cached until the size or
+    modification time of the file changes, so repeated calls on an unchanged log are free.
+    """
+    stat = path.stat()
+    return list(_tail_lines(path, n_lines, use_mmap, stat.st_size, stat.st_mtime_ns))
+
+
+@functools.lru_cache(maxsize=256)
+def _tail_lines(
+    path: Path, n_lines: int, use_mmap: bool, size: int, mtime_ns: int
+) -> tuple[str, ...]:
+    # size and mtime_ns are part of the cache key. Only the first `size` bytes are read, in case the file is
+    # being appended to.
+    with path.open("rb") as f:
+        if size == 0:
+            data = b""
+        elif use_mmap:
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                data = mm[_mmap_tail_start(mm, n_lines, size) : size]
+        else:
+            data = read_tail(f.fileno(), n_lines, size)
+
+    return tuple(data.decode(errors="replace").split("\n"))
+
+
+def _mmap_tail_start(mm: mmap.mmap, n_lines: int, size: int) -> int:
+    end = size
+    for _ in range(n_lines):
+        newline = mm.rfind(b"\n", 0, end)
+        if newline == -1:
+            return 0
+        end = newline
+    return end + 1
+
+
+def read_tail(
+    fd: int, n_lines: int, size: int, block_bytes: int = _BLOCK_BYTES
+) -> bytes:
+    """The bytes after the n_lines-th newline from the end, or all bytes if there are fewer newlines."""
+    data = b""
+    position = size
+    while position > 0:
+        read_from = max(position - block_bytes, 0)
+        data = os.pread(fd, position - read_from, read_from) + data
+        position = read_from
+
+        if data.count(b"\n") >= n_lines:
+            start = len(data)
+            for _ in range(n_lines):
+                start = data.rindex(b"\n", 0, start)
+            return data[start + 1 :]
+
+    return data
+
+
+class LogFollower:
+    """Reads what has been appended to a log since the last read, like `tail -f`.
+
+    Keeps the byte offset it has read up to, so each read only reads the new bytes.
+    """
+
+    def __init__(self, path: Path, n_lines: int) -> None:
+        """Start at the last n_lines of the log, or at its start if it doesn't exist yet."""
+        self.path = path
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            with path.open("rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                self.offset = size - len(read_tail(f.fileno(), n_lines, size))
+        except FileNotFoundError:
+            self.offset = 0
+
+    def read(self, max_bytes: int) -> str:
+        """The text appended since the last read.
+
+        At most the last max_bytes are read, so a producer which writes faster than the reader
+        reads is skipped ahead rather than read in full.
+        """
+        try:
+            with self.path.open("rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < self.offset:
+                    # Truncated, so start over
+                    self.offset = 0
+                    self._decoder.reset()
+
+                skipped = max(size - self.offset - max_bytes, 0)
+                if skipped:
+                    self.offset += skipped
+                    self._decoder.reset()
+
+                data = os.pread(f.fileno(), size - self.offset, self.offset)
+        except FileNotFoundError:
+            return ""
+
+        self.offset += len(data)
+        text = self._decoder.decode(data)
+        return f"\n[Skipped {skipped} bytes]\n{text}" if skipped else text
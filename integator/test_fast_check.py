@@ -0,0 +1,111 @@
+import datetime as dt
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from integator import fast_check, status_encoding
+from integator.shell import ExitCode
+from integator.step_status import ExecutionState, Span, Statuses, StepStatus, Task
+
+
+def test_constants_match():
+    assert fast_check.SUCCESS == ExecutionState.SUCCESS.value
+    assert fast_check.ERROR_EXIT_CODE == ExitCode.ERROR.value
+    assert fast_check.NOTE_VERSION == status_encoding.NOTE_VERSION
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(
+        "git init -q && git commit -q --allow-empty -m first", shell=True, check=True
+    )
+    Path("integator.toml").write_text(
+        '[[integator.steps]]\nname = "Lint"\ncmd = "ruff"\n\n'
+        '[[integator.steps]]\nname = "Test"\ncmd = "pytest"\n'
+    )
+    return tmp_path
+
+
+def _add_note(note: str):
+    subprocess.run(["git", "notes", "add", "-f", "-m", note], check=True)
+
+
+def _statuses(test_state: ExecutionState) -> Statuses:
+    span = Span(start=dt.datetime.now(), end=dt.datetime.now())
+    return Statuses(
+        values=[
+            StepStatus(
+                step=Task(name=name, cmd="cmd"), state=state, span=span, log=None
+            )
+            for name, state in [("Lint", ExecutionState.SUCCESS), ("Test", test_state)]
+        ]
+    )
+
+
+@pytest.mark.parametrize("compact", [True, False])
+def test_checks_note_of_latest_commit(repo: Path, compact: bool):
+    assert fast_check.fast_check(["check"]) == ExitCode.ERROR.value
+
+    for state, expected in [
+        (ExecutionState.FAILURE, ExitCode.ERROR),
+        (ExecutionState.SUCCESS, ExitCode.OK),
+    ]:
+        statuses = _statuses(state)
+        note = (
+            status_encoding.encode(statuses, repo)
+            if compact
+            else statuses.model_dump_json()
+        )
+        _add_note(note)
+        assert fast_check.fast_check(["check"]) == expected.value
+
+
+def test_one_step(repo: Path):
+    _add_note(_statuses(ExecutionState.FAILURE).model_dump_json())
+
+    assert fast_check.fast_check(["c", "--step", "Lint", "--quiet"]) == 0
+    assert fast_check.fast_check(["c", "--step=Test"]) == ExitCode.ERROR.value
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["log"],
+        ["check", "--help"],
+        ["check", "--template", "python"],
+        ["check", "--step", "Unknown"],
+        ["check", "--hash", "not-a-commit"],
+    ],
+)
+def test_falls_back_to_full_command(repo: Path, argv: list[str]):
+    assert fast_check.fast_check(argv) is None
+
+
+def test_falls_back_for_another_root_worktree_dir(
+    repo: Path, tmp_path_factory: pytest.TempPathFactory
+):
+    settings = Path("integator.toml").read_text()
+    _add_note(_statuses(ExecutionState.SUCCESS).model_dump_json())
+
+    Path("integator.toml").write_text(
+        f'[integator]\nroot_worktree_dir = "."\n\n{settings}'
+    )
+    assert fast_check.fast_check(["check"]) == 0
+
+    other = tmp_path_factory.mktemp("other")
+    Path("integator.toml").write_text(
+        f'[integator]\nroot_worktree_dir = "{other}"\n\n{settings}'
+    )
+    assert fast_check.fast_check(["check"]) is None
+
+
+def test_falls_back_without_commits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+    Path("integator.toml").write_text(
+        '[[integator.steps]]\nname = "Lint"\ncmd = "ruff"\n'
+    )
+
+    assert fast_check.fast_check(["check"]) is None
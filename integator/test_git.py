@@ -0,0 +1,66 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from integator.git import ChangeCount, Git, parse_shortstat
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        (
+            " 12 files changed, 345 insertions(+), 67 deletions(-)",
+            ChangeCount(12, 345, 67),
+        ),
+        (" 1 file changed, 1 insertion(+)", ChangeCount(1, 1, 0)),
+        (" 1 file changed, 10 deletions(-)", ChangeCount(1, 0, 10)),
+    ],
+)
+def test_parse_shortstat(line: str, expected: ChangeCount):
+    assert parse_shortstat(line) == expected
+
+
+def test_change_counts_of_many_commits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+    Path("a").write_text("".join(f"{i}\n" for i in range(25)))
+    subprocess.run("git add a && git commit -q -m a", shell=True, check=True)
+    subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", "empty"], check=True)
+
+    counts = Git(tmp_path).change_counts(["HEAD", "HEAD~1", "HEAD"])
+
+    assert counts == {"HEAD": ChangeCount(0, 0, 0), "HEAD~1": ChangeCount(1, 25, 0)}
+
+
+def test_change_counts_follow_refs_named_like_hashes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+    subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", "empty"], check=True)
+    subprocess.run(["git", "tag", "cafe"], check=True)
+    git = Git(tmp_path)
+    assert git.change_counts(["cafe"]) == {"cafe": ChangeCount(0, 0, 0)}
+
+    Path("a").write_text("a\n")
+    subprocess.run("git add a && git commit -q -m a", shell=True, check=True)
+    subprocess.run(["git", "tag", "-f", "cafe"], check=True, capture_output=True)
+
+    assert git.change_counts(["cafe"]) == {"cafe": ChangeCount(1, 1, 0)}
+
+
+def test_latest_commit_is_in_source_dir(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    source, other = tmp_path / "source", tmp_path / "other"
+    for repo in [source, other]:
+        subprocess.run(["git", "init", "-q", str(repo)], check=True)
+        subprocess.run(
+            ["git", "-C", str(repo), "commit", "-q", "--allow-empty", "-m", repo.name],
+            check=True,
+        )
+    monkeypatch.chdir(other)
+
+    expected = subprocess.check_output(["git", "-C", str(source), "rev-parse", "HEAD"])
+    assert Git(source)._latest_commit() == expected.decode().strip()  # type: ignore
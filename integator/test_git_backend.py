@@ -0,0 +1,90 @@
+import asyncio
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from integator.git_backend import CatFileBackend, ShellBackend
+
+N_COMMITS = 400
+
+
+def _fast_import(stream: list[str]) -> None:
+    subprocess.run(
+        ["git", "fast-import", "--quiet"], input="\n".join(stream).encode(), check=True
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Commits with notes, enough for git to store them at fanout paths like "ab/cdef..."."""
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+
+    stream: list[str] = []
+    for i in range(N_COMMITS):
+        # Out of order commit times, which the history walk has to sort
+        time = 1_700_000_000 + (i * 7919) % 1000 * 60
+        stream += [
+            "commit refs/heads/main",
+            f"mark :{i + 1}",
+            f"author Ann Example <ann@example.com> {time} +0100",
+            f"committer Ann Example <ann@example.com> {time} +0100",
+            "data <<EOF",
+            f"Commit {i}",
+            "EOF",
+            f"M 100644 inline file_{i % 10}.txt",
+            "data <<EOF",
+            f"{i}",
+            "EOF",
+        ]
+    stream += [
+        "commit refs/notes/commits",
+        "committer Ann Example <ann@example.com> 1700000000 +0000",
+        "data <<EOF",
+        "Notes",
+        "EOF",
+    ]
+    # Every tenth commit has no note
+    for i in (i for i in range(N_COMMITS) if i % 10):
+        stream += [
+            f"N inline :{i + 1}",
+            "data <<EOF",
+            f'{{"v":2,"s":[["{i}"]]}}',
+            "EOF",
+        ]
+    _fast_import([*stream, ""])
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+
+    fanout = subprocess.check_output(["git", "ls-tree", "refs/notes/commits"]).decode()
+    assert " tree " in fanout
+    return tmp_path
+
+
+def test_backends_agree(repo: Path):
+    shell = ShellBackend()
+    cat_file = CatFileBackend(repo)
+    try:
+        for rev in ["HEAD", "main~3"]:
+            assert cat_file.rev_parse(rev) == shell.rev_parse(rev)
+            assert cat_file.log(50, rev) == shell.log(50, rev)
+
+        revs = [commit.hash for commit in shell.log(20)] + ["HEAD"]
+        notes = shell.notes(revs)
+        assert cat_file.notes(revs) == notes
+        assert "" in notes.values() and len(set(notes.values())) > 10
+        assert asyncio.run(cat_file.async_notes(revs)) == asyncio.run(
+            shell.async_notes(revs)
+        )
+    finally:
+        cat_file.close()
+
+
+def test_cat_file_backend_restarts_its_process(repo: Path):
+    cat_file = CatFileBackend(repo)
+    try:
+        head = cat_file.rev_parse("HEAD")
+        cat_file._check._process.kill()  # type: ignore
+        assert cat_file.rev_parse("HEAD") == head
+    finally:
+        cat_file.close()
@@ -0,0 +1,55 @@
+import datetime as dt
+import multiprocessing
+from pathlib import Path
+
+from integator.last_success import LastSuccessIndex
+from integator.step_status import ExecutionState, Span, Statuses, StepStatus, Task
+
+
+def status(name: str, state: ExecutionState, start: dt.datetime) -> StepStatus:
+    return StepStatus(
+        step=Task(name=name, cmd="true"),
+        state=state,
+        span=Span(start=start, end=start + dt.timedelta(seconds=1)),
+        log=None,
+    )
+
+
+def test_keeps_the_latest_success(tmp_path: Path):
+    index = LastSuccessIndex(tmp_path / "last-success.json")
+    old = dt.datetime(2024, 12, 8, 17, 0)
+    new = old + dt.timedelta(hours=1)
+
+    index.record("bbb", Statuses(values=[status("Test", ExecutionState.SUCCESS, new)]))
+    index.record("aaa", Statuses(values=[status("Test", ExecutionState.SUCCESS, old)]))
+    index.record("ccc", Statuses(values=[status("Test", ExecutionState.FAILURE, new)]))
+
+    latest = index.get("Test")
+    assert latest is not None
+    assert (latest.hash, latest.start) == ("bbb", new)
+    assert index.get("Lint") is None
+
+
+def test_missing_index_is_empty(tmp_path: Path):
+    index = LastSuccessIndex(tmp_path / "last-success.json")
+
+    assert not index.exists()
+    assert index.get("Test") is None
+
+
+def _record_success(path: Path, name: str) -> None:
+    start = dt.datetime(2024, 12, 8, 17, 0)
+    LastSuccessIndex(path).record(
+        "aaa", Statuses(values=[status(name, ExecutionState.SUCCESS, start)])
+    )
+
+
+def test_processes_recording_at_once_keep_all_successes(tmp_path: Path):
+    path = tmp_path / "last-success.json"
+    names = [f"Step {i}" for i in range(8)]
+
+    with multiprocessing.Pool(len(names)) as pool:
+        pool.starmap(_record_success, [(path, name) for name in names * 5])
+
+    index = LastSuccessIndex(path)
+    assert [name for name in names if index.get(name) is None] == []
@@ -0,0 +1,56 @@
+import asyncio
+import json
+from pathlib import Path
+
+from integator import metrics
+from integator.shell import Shell
+
+
+def test_counters_are_attributed_to_open_spans(tmp_path: Path):
+    events = tmp_path / "events.jsonl"
+    metrics.configure_metrics(jsonl=events, prometheus=None)
+    try:
+        with metrics.span("test_outer"):
+            with metrics.span("test_inner", step="a"):
+                Shell().run_quietly("echo hello")
+    finally:
+        metrics.configure_metrics(jsonl=None, prometheus=None)
+
+    lines = [json.loads(line) for line in events.read_text().splitlines()]
+    inner = next(event for event in lines if event["span"] == "test_inner")
+    outer = next(event for event in lines if event["span"] == "test_outer")
+
+    assert inner["labels"] == {"step": "a"}
+    assert inner["parents"] == ["test_outer"]
+    assert inner["counters"] == {"subprocesses": 1, "output_bytes": len("hello\n")}
+    assert outer["counters"] == inner["counters"]
+
+
+def test_concurrent_tasks_have_separate_spans():
+    async def step(name: str):
+        with metrics.span("test_task", task=name):
+            await Shell().async_run_quietly(f"echo {name}")
+
+    async def main():
+        await asyncio.gather(step("one"), step("three"))
+
+    asyncio.run(main())
+
+    text = metrics.prometheus_text()
+    assert 'integator_span_calls_total{span="test_task",task="one"} 1' in text
+    assert 'integator_span_output_bytes_total{span="test_task",task="one"} 4' in text
+    assert 'integator_span_output_bytes_total{span="test_task",task="three"} 6' in text
+
+
+def test_export_writes_prometheus_textfile(tmp_path: Path):
+    textfile = tmp_path / "integator.prom"
+    metrics.configure_metrics(jsonl=None, prometheus=textfile)
+    try:
+        with metrics.span("test_export"):
+            pass
+        metrics.export()
+    finally:
+        metrics.configure_metrics(jsonl=None, prometheus=None)
+
+    assert "# TYPE integator_span_seconds_total counter" in textfile.read_text()
+    assert list(tmp_path.iterdir()) == [textfile]
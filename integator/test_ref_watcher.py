@@ -0,0 +1,104 @@
+import asyncio
+import subprocess
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from watchdog.events import (
+    FileClosedNoWriteEvent,
+    FileModifiedEvent,
+    FileOpenedEvent,
+    FileSystemEvent,
+)
+
+from integator.ref_watcher import RefWatcher, _RefChangeHandler  # type: ignore
+
+
+def _git(*args: str) -> None:
+    subprocess.run(["git", *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    _git("init", "-q")
+    _git("commit", "-q", "--allow-empty", "-m", "first")
+    return tmp_path
+
+
+@pytest.fixture
+def watcher(repo: Path) -> Iterator[RefWatcher]:
+    watcher = RefWatcher(repo)
+    assert watcher.start()
+    yield watcher
+    watcher.stop()
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        ["commit", "-q", "--allow-empty", "-m", "second"],
+        ["notes", "add", "-m", "note"],
+        ["pack-refs", "--all"],
+        ["checkout", "-q", "--detach"],
+    ],
+)
+def test_changes_wake_waiters(watcher: RefWatcher, change: list[str]):
+    _git(*change)
+    assert watcher.wait(timeout=5)
+
+
+def test_reading_refs_does_not_wake_waiters(watcher: RefWatcher):
+    _git("log", "-1")
+    _git("rev-parse", "HEAD")
+    assert not watcher.wait(timeout=0.5)
+
+
+def test_async_wait(watcher: RefWatcher):
+    async def wait_for_commit() -> bool:
+        commit = threading.Timer(
+            0.1, _git, ["commit", "-q", "--allow-empty", "-m", "second"]
+        )
+        commit.start()
+        try:
+            return await watcher.async_wait(timeout=5)
+        finally:
+            commit.join()
+
+    assert asyncio.run(wait_for_commit())
+
+
+@pytest.mark.parametrize(
+    ("event", "relevant"),
+    [
+        (FileModifiedEvent(".git/refs/heads/main"), True),
+        (FileModifiedEvent(".git/HEAD"), True),
+        (FileModifiedEvent(".git/refs/heads/main.lock"), False),
+        (FileModifiedEvent(".git/index"), False),
+        (FileOpenedEvent(".git/HEAD"), False),
+        (FileClosedNoWriteEvent(".git/refs/heads/main"), False),
+    ],
+)
+def test_handler_ignores_locks_and_reads(event: FileSystemEvent, relevant: bool):
+    changes: list[None] = []
+    handler = _RefChangeHandler(
+        Path(".git"), Path(".git"), [], lambda: changes.append(None)
+    )
+    handler.on_any_event(event)
+    assert bool(changes) == relevant
+
+
+def test_falls_back_to_polling(repo: Path, monkeypatch: pytest.MonkeyPatch):
+    watcher = RefWatcher(repo)
+
+    def schedule(*args: object, **kwargs: object) -> None:
+        raise OSError("inotify watch limit reached")
+
+    monkeypatch.setattr(watcher._observer, "schedule", schedule)  # type: ignore
+
+    assert not watcher.start()
+    # Waiting still works, it just isn't woken up
+    _git("commit", "-q", "--allow-empty", "-m", "second")
+    assert not watcher.wait(timeout=0.2)
+    watcher.stop()
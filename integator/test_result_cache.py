@@ -0,0 +1,55 @@
+import datetime as dt
+import logging
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from integator.result_cache import CachedResult, DirectoryCache, GitRemoteCache
+from integator.step_status import Span
+
+RESULT = CachedResult(
+    hash="a1b2c3d",
+    span=Span(
+        start=dt.datetime(2024, 12, 8, 17, 0), end=dt.datetime(2024, 12, 8, 17, 1)
+    ),
+    machine="ci",
+)
+
+
+def test_directory_cache(tmp_path: Path):
+    cache = DirectoryCache(tmp_path / "cache")
+    assert cache.lookup("abcdef") is None
+
+    cache.publish("abcdef", RESULT)
+    assert DirectoryCache(tmp_path / "cache").lookup("abcdef") == RESULT
+
+
+def test_git_remote_cache_is_shared_between_clones(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    remote = tmp_path / "results.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(remote)], check=True)
+    for clone in ["a", "b"]:
+        subprocess.run(["git", "init", "-q", str(tmp_path / clone)], check=True)
+
+    monkeypatch.chdir(tmp_path / "a")
+    GitRemoteCache(str(remote)).publish("abcdef", RESULT)
+
+    monkeypatch.chdir(tmp_path / "b")
+    cache = GitRemoteCache(str(remote))
+    assert cache.lookup("abcdef") == RESULT
+    with caplog.at_level(logging.DEBUG):
+        assert cache.lookup("012345") is None
+    # Misses are expected, so they aren't warned about
+    assert [r.levelno for r in caplog.records] == [logging.DEBUG]
+
+
+def test_unreachable_remote_is_a_miss(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    monkeypatch.chdir(tmp_path)
+
+    assert GitRemoteCache(str(tmp_path / "missing.git")).lookup("abcdef") is None
+    assert [r.levelno for r in caplog.records] == [logging.WARNING]
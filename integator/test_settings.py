@@ -0,0 +1,82 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from integator.settings import RootSettings, SettingsProvider, StepSpec
+
+STEPS = '[[integator.steps]]\nname = "{name}"\ncmd = "true"\n'
+
+
+def _write(path: Path, text: str, mtime_ns: int):
+    path.write_text(text)
+    # Explicit, since writes within the filesystem's timestamp resolution get the same mtime
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_reloads_only_when_file_changes(tmp_path: Path):
+    path = tmp_path / "integator.toml"
+    _write(path, STEPS.format(name="A"), 1_000_000_000)
+    provider = SettingsProvider(path)
+    changes: list[RootSettings] = []
+    provider.subscribe(changes.append)
+
+    first = provider.get()
+    assert provider.get() is first
+    assert changes == []
+
+    _write(path, STEPS.format(name="B"), 2_000_000_000)
+    second = provider.get()
+    assert second.step_names() == ["B"]
+    assert changes == [second]
+
+
+def test_keeps_settings_when_changes_are_invalid(tmp_path: Path):
+    path = tmp_path / "integator.toml"
+    _write(path, STEPS.format(name="A"), 1_000_000_000)
+    provider = SettingsProvider(path)
+    first = provider.get()
+
+    _write(path, "[[integator.steps]]\nname = ", 2_000_000_000)
+    assert provider.get() is first
+
+    with pytest.raises(ValueError):
+        SettingsProvider(path).get()
+
+
+def test_keeps_settings_while_file_is_missing(tmp_path: Path):
+    path = tmp_path / "integator.toml"
+    _write(path, STEPS.format(name="A"), 1_000_000_000)
+    provider = SettingsProvider(path)
+    first = provider.get()
+
+    # Editors save by writing a temporary file and renaming it over the original
+    path.unlink()
+    assert provider.get() is first
+
+    _write(path, STEPS.format(name="B"), 2_000_000_000)
+    assert provider.get().step_names() == ["B"]
+
+    with pytest.raises(FileNotFoundError):
+        SettingsProvider(tmp_path / "missing.toml").get()
+
+
+def test_shard_cmds_fill_in_placeholders():
+    step = StepSpec(
+        name="Test",
+        cmd="pytest --shard-id={shard_index} --num-shards={shard_count}",
+        shards=2,
+    )
+
+    assert step.shard_cmds() == [
+        "pytest --shard-id=0 --num-shards=2",
+        "pytest --shard-id=1 --num-shards=2",
+    ]
+    assert StepSpec(
+        name="Lint", cmd="echo {shard_index}/{shard_count}"
+    ).shard_cmds() == ["echo 0/1"]
+
+
+def test_shards_need_a_shard_index():
+    with pytest.raises(ValueError, match="shard_index"):
+        StepSpec(name="Test", cmd="pytest", shards=2)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from pathlib import Path
+
+from integator.shell import (
+    ExitCode,
+    OutputTail,
+    Shell,
+    Stream,
+    terminate_running_commands,
+)
+
+
+def test_output_tail_keeps_last_lines():
+    tail = OutputTail(max_bytes=8)
+    for i in range(100):
+        tail.append(f"line {i}\n".encode())
+    assert tail.text() == "line 99\n"
+
+
+def test_run_writes_full_output_to_file(tmp_path: Path):
+    log = tmp_path / "out.log"
+    result = Shell().run(
+        "seq 1 100000; exit 3", output_file=log, stream=Stream.NO, tail_bytes=16
+    )
+
+    assert result.exit == ExitCode.ERROR
+    assert result.output == "99999\n100000\n"
+    assert "\n100000\n" in log.read_text()
+
+
+def test_async_run_is_cancelled():
+    async def run_and_cancel() -> ExitCode:
+        cancel = asyncio.Event()
+        run = asyncio.ensure_future(
+            Shell().async_run("sleep 10", stream=Stream.NO, cancel=cancel)
+        )
+        await asyncio.sleep(0.2)
+        cancel.set()
+        result = await asyncio.wait_for(run, timeout=5)
+        return result.exit
+
+    assert asyncio.run(run_and_cancel()) == ExitCode.ERROR
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        # The third field is the state, where Z is a zombie, i.e. exited but not reaped yet
+        return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_timeout_kills_subprocesses(tmp_path: Path):
+    pid_file = tmp_path / "pid"
+    start = time.monotonic()
+    result = Shell().run(
+        f"sleep 30 & echo $! > {pid_file}; wait",
+        stream=Stream.NO,
+        timeout_seconds=0.3,
+    )
+
+    assert result.timed_out
+    assert result.exit == ExitCode.ERROR
+    assert time.monotonic() - start < 5
+    time.sleep(0.1)
+    assert not _is_running(int(pid_file.read_text()))
+
+
+def test_inactivity_timeout_is_reset_by_output(tmp_path: Path):
+    log = tmp_path / "out.log"
+    active = Shell().run(
+        "for i in 1 2 3 4 5; do echo $i; sleep 0.1; done",
+        stream=Stream.NO,
+        inactivity_timeout_seconds=0.4,
+    )
+    hung = Shell().run(
+        "echo start; sleep 30",
+        output_file=log,
+        stream=Stream.NO,
+        inactivity_timeout_seconds=0.4,
+    )
+
+    assert not active.timed_out and active.exit == ExitCode.OK
+    assert hung.timed_out
+    assert "without output" in log.read_text()
+
+
+def test_terminate_running_commands():
+    async def run_and_terminate() -> ExitCode:
+        run = asyncio.ensure_future(Shell().async_run("sleep 30", stream=Stream.NO))
+        await asyncio.sleep(0.2)
+        await asyncio.to_thread(terminate_running_commands)
+        result = await asyncio.wait_for(run, timeout=5)
+        return result.exit
+
+    assert asyncio.run(run_and_terminate()) == ExitCode.ERROR
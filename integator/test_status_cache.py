@@ -0,0 +1,30 @@
+from integator.status_cache import StatusCache
+from integator.test_task_status import dummy_status
+
+
+def test_cache_is_invalidated_for_changed_notes():
+    cache = StatusCache()
+    cache.sync("ref-1", lambda old, new: [])
+    cache.put_many({"aaaa": dummy_status(), "bbbb": dummy_status()}, "ref-1")
+
+    cache.sync("ref-2", lambda old, new: ["aaaa" + "0" * 36])
+    assert set(cache.get_many(["aaaa", "bbbb"])) == {"bbbb"}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = StatusCache(max_entries=2)
+    cache.sync("ref", lambda old, new: [])
+    cache.put_many({"aaaa": dummy_status(), "bbbb": dummy_status()}, "ref")
+    cache.get_many(["aaaa"])
+    cache.put_many({"cccc": dummy_status()}, "ref")
+
+    assert set(cache.get_many(["aaaa", "bbbb", "cccc"])) == {"aaaa", "cccc"}
+
+
+def test_cache_hands_out_copies():
+    cache = StatusCache()
+    cache.sync("ref", lambda old, new: [])
+    cache.put_many({"aaaa": dummy_status()}, "ref")
+
+    cache.get_many(["aaaa"])["aaaa"].values.clear()
+    assert len(cache.get_many(["aaaa"])["aaaa"].values) == 1
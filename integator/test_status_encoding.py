@@ -0,0 +1,78 @@
+import datetime as dt
+from pathlib import Path
+
+import pytest
+
+from integator import status_encoding
+from integator.step_status import (
+    ExecutionState,
+    ShardStatus,
+    Span,
+    Statuses,
+    StepStatus,
+    Task,
+)
+
+ROOT = Path("/repo")
+
+
+def statuses() -> Statuses:
+    start = dt.datetime(2024, 12, 8, 17, 7, 4, 123000)
+    return Statuses(
+        values=[
+            StepStatus(
+                step=Task(name="Test", cmd="pytest -k 'not slow'"),
+                state=ExecutionState.SUCCESS,
+                span=Span(start=start, end=start + dt.timedelta(seconds=5)),
+                log=ROOT / ".logs" / "test.log",
+                reused_from="abc1234",
+            ),
+            StepStatus(
+                step=Task(name="Lint", cmd="ruff check"),
+                state=ExecutionState.IN_PROGRESS,
+                span=Span(start=start, end=None),
+                log=None,
+            ),
+        ]
+    )
+
+
+def test_round_trip():
+    note = status_encoding.encode(statuses(), ROOT)
+
+    assert status_encoding.decode(note, ROOT) == statuses()
+    assert '".logs/test.log"' in note
+    assert len(note) < len(statuses().model_dump_json()) / 2
+
+
+def test_reads_json_notes():
+    note = statuses().model_dump_json()
+    assert status_encoding.decode(note, ROOT) == statuses()
+
+
+def test_rejects_newer_versions():
+    with pytest.raises(ValueError, match="Unsupported note version"):
+        status_encoding.decode('{"v":3,"s":[]}', ROOT)
+
+
+def test_round_trip_with_shards():
+    start = dt.datetime(2024, 12, 8, 17, 7, 4)
+    shards = [
+        ShardStatus(
+            state=ExecutionState.SUCCESS,
+            span=Span(start=start, end=start + dt.timedelta(seconds=3)),
+            log=ROOT / ".logs" / "test-0.log",
+        ),
+        ShardStatus(
+            state=ExecutionState.IN_PROGRESS,
+            span=Span(start=start, end=None),
+            log=ROOT / ".logs" / "test-1.log",
+        ),
+    ]
+    sharded = Statuses(
+        values=[StepStatus.from_shards(Task(name="Test", cmd="pytest"), shards)]
+    )
+
+    decoded = status_encoding.decode(status_encoding.encode(sharded, ROOT), ROOT)
+    assert decoded == sharded
+    assert decoded.values[0].shards == shards
@@ -0,0 +1,87 @@
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+
+from integator import status_events
+from integator.commands.tui import WatchDaemon
+from integator.status_events import EventKind, StatusEvent
+from integator.step_status import ExecutionState
+
+
+def test_events_are_received_in_order():
+    events, publisher = Pipe(duplex=False)
+    status_events.configure_events(publisher)
+    try:
+        assert status_events.receive(events) == []
+
+        started = StatusEvent(kind=EventKind.STEP_STARTED, hash="abc", step="Test")
+        finished = started.model_copy(
+            update={"kind": EventKind.STEP_FINISHED, "state": ExecutionState.SUCCESS}
+        )
+        status_events.publish(started)
+        status_events.publish(finished)
+
+        assert status_events.receive(events) == [started, finished]
+    finally:
+        status_events.configure_events(None)
+
+
+def test_stops_publishing_when_the_reader_is_gone():
+    events, publisher = Pipe(duplex=False)
+    status_events.configure_events(publisher)
+    events.close()
+
+    status_events.publish(StatusEvent(kind=EventKind.NEW_COMMIT, hash="abc"))
+    status_events.publish(StatusEvent(kind=EventKind.NEW_COMMIT, hash="def"))
+
+    assert status_events._connection is None  # pyright: ignore[reportPrivateUsage]
+
+
+def test_receive_reports_a_closed_publisher():
+    events, publisher = Pipe(duplex=False)
+    publisher.close()
+
+    assert status_events.receive(events) is None
+
+
+def _publish_once(events: Connection) -> None:
+    status_events.configure_events(events)
+    status_events.publish(StatusEvent(kind=EventKind.NEW_COMMIT, hash="abc"))
+
+
+def test_watch_daemon_events_end_when_it_exits():
+    daemon = WatchDaemon(callable=_publish_once)
+    daemon.process.join(timeout=5)
+    first = daemon.events
+
+    assert first.poll(timeout=5)
+    assert status_events.receive(first) is None
+    assert daemon.process.exitcode == 0
+
+    daemon.restart()
+    daemon.process.join(timeout=5)
+    assert daemon.events is not first
+    assert daemon.events.poll(timeout=5)
+
+
+def test_drops_events_while_the_reader_is_behind():
+    events, publisher = Pipe(duplex=False)
+    status_events.configure_events(publisher)
+    try:
+        # Far more than fit in a pipe
+        sent = [
+            StatusEvent(kind=EventKind.NEW_COMMIT, hash=f"{i:040x}")
+            for i in range(10_000)
+        ]
+        for event in sent:
+            status_events.publish(event)
+
+        received = status_events.receive(events)
+        assert received is not None
+        assert 0 < len(received) < len(sent)
+        assert received == sent[: len(received)]
+
+        # Publishing goes on once the reader catches up
+        status_events.publish(sent[0])
+        assert status_events.receive(events) == [sent[0]]
+    finally:
+        status_events.configure_events(None)
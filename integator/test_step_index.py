@@ -0,0 +1,61 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from integator.settings import StepSpec
+from integator.step_index import StepIndex, content_key
+
+
+def _commit(message: str, files: dict[str, str]) -> str:
+    for name, content in files.items():
+        Path(name).write_text(content)
+    subprocess.run(
+        f"git add -A && git commit -q --allow-empty -m '{message}'",
+        shell=True,
+        check=True,
+    )
+    return subprocess.check_output(["git", "rev-parse", "HEAD"]).decode().strip()
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+    return tmp_path
+
+
+def test_same_tree_has_same_key(repo: Path):
+    step = StepSpec(name="Test", cmd="pytest")
+    first = _commit("first", {"a.py": "1"})
+    amended = _commit("only the message changed", {})
+    changed = _commit("changed", {"a.py": "2"})
+
+    assert content_key(step, first) == content_key(step, amended)
+    assert content_key(step, first) != content_key(step, changed)
+    assert content_key(step, first) != content_key(
+        StepSpec(name="Test", cmd="pytest -x"), amended
+    )
+
+
+def test_inputs_ignore_other_files(repo: Path):
+    step = StepSpec(name="Test", cmd="pytest", inputs=["src/*"])
+    Path("src").mkdir()
+    first = _commit("first", {"src/a.py": "1", "README.md": "a"})
+    docs = _commit("docs", {"README.md": "b"})
+    code = _commit("code", {"src/a.py": "2"})
+
+    assert content_key(step, first) == content_key(step, docs)
+    assert content_key(step, first) != content_key(step, code)
+
+
+def test_record_and_lookup(repo: Path):
+    step = StepSpec(name="Test", cmd="pytest")
+    first = _commit("first", {"a.py": "1"})
+    amended = _commit("amended", {})
+
+    index = StepIndex(repo / "index.json")
+    assert index.lookup(step, amended) is None
+
+    index.record(step, first)
+    assert index.lookup(step, amended) == first
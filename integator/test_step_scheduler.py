@@ -0,0 +1,149 @@
+import asyncio
+
+from integator.settings import StepSpec
+from integator.shell import ExitCode, RunResult
+from integator.step_scheduler import BackgroundSteps, run_steps
+
+
+def test_steps_run_after_their_needs():
+    order: list[str] = []
+
+    async def run(step: StepSpec, cancel: asyncio.Event) -> RunResult:
+        order.append(step.name)
+        return RunResult(exit=ExitCode.OK, output=None)
+
+    steps = [
+        StepSpec(name="test", cmd="", needs=["build"]),
+        StepSpec(name="build", cmd=""),
+    ]
+    asyncio.run(run_steps(steps, run, max_parallel=2, fail_fast=False))
+    assert order == ["build", "test"]
+
+
+def test_failure_cancels_running_steps():
+    async def run(step: StepSpec, cancel: asyncio.Event) -> RunResult:
+        if step.name == "fails":
+            return RunResult(exit=ExitCode.ERROR, output=None)
+        # Runs until cancelled
+        await asyncio.wait_for(cancel.wait(), timeout=5)
+        return RunResult(exit=ExitCode.ERROR, output=None)
+
+    steps = [
+        StepSpec(name="slow", cmd=""),
+        StepSpec(name="fails", cmd=""),
+        StepSpec(name="after", cmd="", needs=["fails"]),
+    ]
+    results = asyncio.run(run_steps(steps, run, max_parallel=2, fail_fast=True))
+    assert set(results) == {"slow", "fails"}
+
+
+def test_steps_stream_concurrently():
+    async def run(step: StepSpec, cancel: asyncio.Event) -> RunResult:
+        await asyncio.sleep(0.3)
+        return RunResult(exit=ExitCode.OK, output=None)
+
+    steps = [StepSpec(name=str(i), cmd="") for i in range(4)]
+
+    async def timed() -> float:
+        start = asyncio.get_running_loop().time()
+        await run_steps(steps, run, max_parallel=4, fail_fast=False)
+        return asyncio.get_running_loop().time() - start
+
+    assert asyncio.run(timed()) < 0.6
+
+
+def test_superseded_steps_are_cancelled_unless_they_finish_anyway():
+    async def run(step: StepSpec, cancel: asyncio.Event) -> RunResult:
+        try:
+            await asyncio.wait_for(cancel.wait(), timeout=0.5)
+            return RunResult(exit=ExitCode.ERROR, output="cancelled")
+        except TimeoutError:
+            return RunResult(exit=ExitCode.OK, output="finished")
+
+    steps = [
+        StepSpec(name="test", cmd=""),
+        StepSpec(name="build", cmd="", cancel_when_superseded=False),
+        StepSpec(name="deploy", cmd="", needs=["build"]),
+    ]
+
+    async def supersede() -> tuple[dict[str, RunResult], list[RunResult], float]:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        superseded = asyncio.Event()
+        loop.call_later(0.1, superseded.set)
+        background = BackgroundSteps(max_commits=1)
+        results = await run_steps(
+            steps,
+            run,
+            max_parallel=2,
+            fail_fast=False,
+            superseded=superseded,
+            background=background,
+            commit="old",
+        )
+        returned_after = loop.time() - start
+        assert background.running("old", "build")
+        finished = await asyncio.gather(*background.tasks())
+        assert not background
+        return results, finished, returned_after
+
+    results, finished, returned_after = asyncio.run(supersede())
+    assert {name: result.output for name, result in results.items()} == {
+        "test": "cancelled"
+    }
+    # Without waiting for build, which finishes in the background
+    assert returned_after < 0.4
+    assert [result.output for result in finished] == ["finished"]
+
+
+def test_background_steps_count_toward_max_parallel_and_leave_a_worktree():
+    started: list[tuple[str, float]] = []
+
+    async def run(step: StepSpec, cancel: asyncio.Event) -> RunResult:
+        started.append((step.name, asyncio.get_running_loop().time()))
+        try:
+            await asyncio.wait_for(cancel.wait(), timeout=0.3)
+            return RunResult(exit=ExitCode.ERROR, output="cancelled")
+        except TimeoutError:
+            return RunResult(exit=ExitCode.OK, output="finished")
+
+    async def supersede(
+        commit: str, background: BackgroundSteps, max_parallel: int
+    ) -> dict[str, RunResult]:
+        superseded = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.1, superseded.set)
+        steps = [StepSpec(name=commit, cmd="", cancel_when_superseded=False)]
+        return await run_steps(
+            steps,
+            run,
+            max_parallel=max_parallel,
+            fail_fast=False,
+            superseded=superseded,
+            background=background,
+            commit=commit,
+        )
+
+    async def main() -> None:
+        background = BackgroundSteps(max_commits=1)
+        await supersede("a", background, max_parallel=1)
+        a = next(iter(background.tasks()))
+
+        # Until "a" is done, there is no room for "b"
+        steps = [StepSpec(name="b", cmd="")]
+        results = await run_steps(
+            steps, run, max_parallel=1, fail_fast=False, background=background
+        )
+        assert a.done() and results["b"].output == "finished"
+        assert started[-1][1] >= started[0][1] + 0.3
+
+        # Only one commit's steps run in the background, so "c" makes way for "d"
+        await supersede("c", background, max_parallel=2)
+        c = next(iter(background.tasks()))
+        await supersede("d", background, max_parallel=2)
+        assert (await c).output == "cancelled"
+        assert background.running("d", "d") and not background.running("c", "c")
+        assert [r.output for r in await asyncio.gather(*background.tasks())] == [
+            "finished"
+        ]
+
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+import datetime as dt
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from integator.step_status import ExecutionState, Span, StepStatus, Task
+from integator.step_status_repo import StepStatusRepo
+
+
+def _git(*args: str) -> str:
+    return subprocess.check_output(["git", *args]).decode().strip()
+
+
+@pytest.fixture
+def commit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    monkeypatch.chdir(tmp_path)
+    _git("init", "-q")
+    _git("commit", "-q", "--allow-empty", "-m", "0")
+    return _git("rev-parse", "--short", "HEAD")
+
+
+def test_does_not_overwrite_notes_it_cannot_decode(commit: str):
+    newer = '{"v":99,"s":[]}'
+    _git("notes", "add", "-m", newer, commit)
+    now = dt.datetime.now()
+    status = StepStatus(
+        step=Task(name="Test", cmd="true"),
+        state=ExecutionState.SUCCESS,
+        span=Span(start=now, end=now),
+        log=None,
+    )
+
+    assert StepStatusRepo.get(commit).values == []
+    with pytest.raises(RuntimeError, match="not overwriting"):
+        StepStatusRepo.update_step(commit, status)
+    assert _git("notes", "show", commit) == newer
+
+    _git("notes", "remove", commit)
+    StepStatusRepo.update_step(commit, status)
+    assert StepStatusRepo.get(commit).state("Test") == ExecutionState.SUCCESS
@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from integator.tail import LogFollower, read_tail, tail_lines
+
+CONTENTS = [
+    "",
+    "no newline",
+    "one\ntwo\nthree",
+    "trailing\nnewline\n",
+    "\n\n\n",
+    "\n".join(f"line {i}" for i in range(1000)),
+]
+
+
+@pytest.mark.parametrize("content", CONTENTS)
+@pytest.mark.parametrize("n_lines", [1, 10])
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_tail_lines_matches_split(
+    tmp_path: Path, content: str, n_lines: int, use_mmap: bool
+):
+    path = tmp_path / "log"
+    path.write_text(content)
+    assert tail_lines(path, n_lines, use_mmap) == content.split("\n")[-n_lines:]
+
+
+def test_read_tail_across_blocks(tmp_path: Path):
+    path = tmp_path / "log"
+    content = "\n".join(f"line {i}" for i in range(1000))
+    path.write_text(content)
+
+    with path.open("rb") as f:
+        tail = read_tail(f.fileno(), 10, os.path.getsize(path), block_bytes=7)
+    assert tail.decode().split("\n") == content.split("\n")[-10:]
+
+
+def test_tail_lines_sees_appended_lines(tmp_path: Path):
+    path = tmp_path / "log"
+    path.write_text("first\n")
+    assert tail_lines(path, 1) == [""]
+
+    with path.open("a") as f:
+        f.write("second")
+    assert tail_lines(path, 1) == ["second"]
+
+
+def test_follower_reads_only_appended_text(tmp_path: Path):
+    path = tmp_path / "log"
+    path.write_text("\n".join(f"line {i}" for i in range(100)) + "\n")
+    follower = LogFollower(path, n_lines=2)
+
+    assert follower.read(1024) == "line 99\n"
+    assert follower.read(1024) == ""
+
+    with path.open("ab") as f:
+        # "é" split across two writes
+        f.write(b"partial \xc3")
+    assert follower.read(1024) == "partial "
+    with path.open("ab") as f:
+        f.write(b"\xa9\n")
+    assert follower.read(1024) == "é\n"
+
+
+def test_follower_skips_ahead_of_fast_producers(tmp_path: Path):
+    path = tmp_path / "log"
+    follower = LogFollower(path, n_lines=10)
+    path.write_text("x" * 1000 + "end\n")
+
+    assert follower.read(4) == "\n[Skipped 1000 bytes]\nend\n"
+
+
+def test_follower_restarts_on_truncation(tmp_path: Path):
+    path = tmp_path / "log"
+    path.write_text("old contents\n")
+    follower = LogFollower(path, n_lines=10)
+    follower.read(1024)
+
+    path.write_text("new\n")
+    assert follower.read(1024) == "new\n"
@@ -3,6 +3,7 @@ from pathlib import Path
 
 from integator.step_status import (
     ExecutionState,
+    ShardStatus,
     Span,
     Statuses,
     StepStatus,
@@ -27,3 +28,63 @@ def test_init_stepstati():
     input = dummy_status().model_dump_json()
     val = Statuses().from_str(input)
     assert len(val.values) == 1
+
+
+def test_lookup_does_not_add_missing_steps():
+    statuses = dummy_status()
+
+    assert statuses.lookup("Missing") is None
+    assert statuses.state("Missing") == ExecutionState.UNKNOWN
+    assert statuses.get("Missing").state == ExecutionState.UNKNOWN
+    assert statuses.names() == {"Test 1"}
+
+
+def test_replace_keeps_position():
+    statuses = dummy_status()
+    second = (
+        dummy_status()
+        .values[0]
+        .model_copy(update={"step": Task(name="Test 2", cmd="echo")})
+    )
+    statuses.add(second)
+    statuses.replace(
+        dummy_status().values[0].model_copy(update={"state": ExecutionState.SUCCESS})
+    )
+
+    assert [status.step.name for status in statuses.values] == ["Test 1", "Test 2"]
+    assert statuses.state("Test 1") == ExecutionState.SUCCESS
+
+    statuses.remove("Test 1")
+    assert statuses.lookup("Test 2") == second
+    assert Statuses.from_str(statuses.model_dump_json()) == statuses
+
+
+def test_shards_combine_into_one_status():
+    start = dt.datetime(2024, 12, 8, 17, 0)
+
+    def shard(state: ExecutionState, seconds: int | None) -> ShardStatus:
+        end = start + dt.timedelta(seconds=seconds) if seconds is not None else None
+        return ShardStatus(
+            state=state, span=Span(start=start, end=end), log=Path(f"{state.name}.log")
+        )
+
+    task = Task(name="Test", cmd="pytest --shard-id={shard_index}")
+    failed = StepStatus.from_shards(
+        task,
+        [shard(ExecutionState.SUCCESS, 5), shard(ExecutionState.FAILURE, 3)],
+    )
+    assert failed.state == ExecutionState.FAILURE
+    assert failed.log == Path("FAILURE.log")
+    assert failed.span.duration() == dt.timedelta(seconds=5)
+
+    running = StepStatus.from_shards(
+        task,
+        [shard(ExecutionState.FAILURE, 3), shard(ExecutionState.IN_PROGRESS, None)],
+    )
+    assert running.state == ExecutionState.IN_PROGRESS
+    assert running.span.end is None
+
+    assert (
+        StepStatus.from_shards(task, [shard(ExecutionState.SUCCESS, 1)] * 2).state
+        == ExecutionState.SUCCESS
+    )
@@ -0,0 +1,158 @@
+import asyncio
+import datetime as dt
+import subprocess
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from integator import watch_impl as watch_impl_module
+from integator.git import Git
+from integator.last_success import LastSuccessIndex
+from integator.result_cache import CachedResult
+from integator.settings import IntegatorSettings, RootSettings, StepSpec
+from integator.shell import ExitCode, RunResult, Shell
+from integator.step_scheduler import BackgroundSteps
+from integator.step_status import ExecutionState, Span, StepStatus, Task
+from integator.step_status_repo import StepStatusRepo
+from integator.watch_impl import CommandRan, _seed_last_success, watch_impl  # type: ignore
+
+
+def _git(*args: str) -> str:
+    return subprocess.check_output(["git", *args]).decode().strip()
+
+
+@pytest.fixture
+def commits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    monkeypatch.chdir(repo)
+    # The worktree pool is in the temporary directory
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    _git("init", "-q")
+    hashes: list[str] = []
+    for i in range(2):
+        _git("commit", "-q", "--allow-empty", "-m", str(i))
+        hashes.append(_git("rev-parse", "--short", "HEAD"))
+    return hashes
+
+
+def _success(name: str, start: dt.datetime) -> StepStatus:
+    return StepStatus(
+        step=Task(name=name, cmd="true"),
+        state=ExecutionState.SUCCESS,
+        span=Span(start=start, end=start + dt.timedelta(seconds=1)),
+        log=None,
+    )
+
+
+class _RecordingCache:
+    def __init__(self) -> None:
+        self.lookups: list[str] = []
+
+    def lookup(self, key: str) -> CachedResult | None:
+        self.lookups.append(key)
+        return None
+
+    def publish(self, key: str, result: CachedResult) -> None:
+        pass
+
+
+def _settings(root: Path) -> RootSettings:
+    return RootSettings(
+        integator=IntegatorSettings(
+            steps=[StepSpec(name="Test", cmd="true", max_staleness_seconds=3600)],
+            root_worktree_dir=root,
+        )
+    )
+
+
+def _watch(root: Path) -> CommandRan:
+    return asyncio.run(
+        watch_impl(
+            Shell(), Git(root), StepStatusRepo(), quiet=True, settings=_settings(root)
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    ("since_success", "expected"),
+    [
+        (dt.timedelta(minutes=10), CommandRan.DEFERRED),
+        (dt.timedelta(hours=2), CommandRan.YES),
+    ],
+)
+def test_runs_steps_once_their_last_success_is_stale(
+    commits: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+    since_success: dt.timedelta,
+    expected: CommandRan,
+):
+    cache = _RecordingCache()
+    monkeypatch.setattr(watch_impl_module, "result_cache", lambda *_: cache)  # type: ignore
+    StepStatusRepo.update_step(
+        commits[0], _success("Test", dt.datetime.now() - since_success)
+    )
+
+    assert _watch(Path.cwd()) == expected
+
+    state = StepStatusRepo.get(commits[1]).state("Test")
+    if expected == CommandRan.DEFERRED:
+        assert state == ExecutionState.UNKNOWN
+        # Deferred steps are checked every loop, so they mustn't reach out to the shared cache
+        assert cache.lookups == []
+    else:
+        assert state == ExecutionState.SUCCESS
+        assert len(cache.lookups) == 1
+
+
+def test_seeds_last_success_from_recent_commits(tmp_path: Path, commits: list[str]):
+    old = dt.datetime(2024, 12, 8, 17, 0)
+    StepStatusRepo.update_step(commits[0], _success("Test", old))
+    StepStatusRepo.update_step(commits[1], _success("Lint", old))
+    index = LastSuccessIndex(tmp_path / "seeded.json")
+
+    asyncio.run(_seed_last_success(Git(Path.cwd()), StepStatusRepo(), index))
+
+    seeded = {name: index.get(name) for name in ["Test", "Lint"]}
+    assert {name: s and (s.hash, s.start) for name, s in seeded.items()} == {
+        "Test": (commits[0], old),
+        "Lint": (commits[1], old),
+    }
+
+
+def test_does_not_rerun_steps_still_running_in_the_background(commits: list[str]):
+    StepStatusRepo.update_step(
+        commits[1],
+        StepStatus(
+            step=Task(name="Test", cmd="true"),
+            state=ExecutionState.IN_PROGRESS,
+            span=Span(start=dt.datetime.now(), end=None),
+            log=None,
+        ),
+    )
+
+    async def main() -> CommandRan:
+        finish = asyncio.Event()
+
+        async def run() -> RunResult:
+            await finish.wait()
+            return RunResult(exit=ExitCode.OK, output=None)
+
+        background = BackgroundSteps(max_commits=1)
+        step = StepSpec(name="Test", cmd="true")
+        background.add(commits[1], step, asyncio.ensure_future(run()), finish)
+        try:
+            return await watch_impl(
+                Shell(),
+                Git(Path.cwd()),
+                StepStatusRepo(),
+                quiet=True,
+                settings=_settings(Path.cwd()),
+                background=background,
+            )
+        finally:
+            finish.set()
+
+    assert asyncio.run(main()) == CommandRan.DEFERRED
+    assert StepStatusRepo.get(commits[1]).state("Test") == ExecutionState.IN_PROGRESS
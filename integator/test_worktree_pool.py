@@ -0,0 +1,113 @@
+import asyncio
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from integator.commands.worktrees import prune
+from integator.git import Git, RootWorktree
+from integator.worktree_pool import WorktreePool, _Slot  # type: ignore
+
+
+def _git(*args: str) -> str:
+    return subprocess.check_output(["git", *args]).decode().strip()
+
+
+@pytest.fixture
+def commits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    monkeypatch.chdir(tmp_path)
+    _git("init", "-q")
+    hashes: list[str] = []
+    for i in range(3):
+        Path("a.txt").write_text(f"{i}\n" * 10_000)
+        _git("add", "a.txt")
+        _git("commit", "-q", "-m", str(i))
+        hashes.append(_git("rev-parse", "HEAD"))
+    return hashes
+
+
+def _pool(tmp_path: Path, size: int, disk_budget_bytes: int | None = None):
+    return WorktreePool(tmp_path, tmp_path / "pool", size, disk_budget_bytes)
+
+
+def test_steps_for_the_same_commit_share_a_worktree(tmp_path: Path, commits: list[str]):
+    pool = _pool(tmp_path, size=2)
+
+    async def checkout_twice() -> tuple[Path, Path, Path]:
+        async with pool.checkout(commits[0]) as first:
+            async with pool.checkout(commits[0]) as second:
+                pass
+        # Idle worktrees are reused for the commit they have checked out
+        async with pool.checkout(commits[0]) as again:
+            return first, second, again
+
+    first, second, again = asyncio.run(checkout_twice())
+    assert first == second == again
+    assert (first / "a.txt").read_text().startswith("0\n")
+
+
+def test_waits_when_all_worktrees_are_busy(tmp_path: Path, commits: list[str]):
+    pool = _pool(tmp_path, size=1)
+
+    async def checkout_while_busy() -> list[str]:
+        order: list[str] = []
+
+        async def step(hash: str, seconds: float):
+            async with pool.checkout(hash) as worktree:
+                order.append(f"start {(worktree / 'a.txt').read_text()[0]}")
+                await asyncio.sleep(seconds)
+                order.append(f"end {hash == commits[0]}")
+
+        first = asyncio.ensure_future(step(commits[0], 0.5))
+        await asyncio.sleep(0.2)
+        await asyncio.gather(first, step(commits[1], 0))
+        return order
+
+    assert asyncio.run(checkout_while_busy()) == [
+        "start 0",
+        "end True",
+        "start 1",
+        "end False",
+    ]
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path: Path, commits: list[str]):
+    pool = _pool(tmp_path, size=3)
+
+    async def checkout(hash: str) -> Path:
+        async with pool.checkout(hash) as worktree:
+            return worktree
+
+    oldest, newer = asyncio.run(checkout(commits[0])), asyncio.run(checkout(commits[1]))
+    used = newer.stat().st_mtime - 100
+    os.utime(oldest, (used, used))
+    # Room for two worktrees
+    pool.disk_budget_bytes = _Slot(oldest).disk_usage() + _Slot(newer).disk_usage()
+
+    newest = asyncio.run(checkout(commits[2]))
+    assert len({oldest, newer, newest}) == 3
+    assert [path.exists() for path in (oldest, newer, newest)] == [False, True, True]
+
+
+def test_prune_removes_temporary_worktrees(
+    tmp_path: Path, commits: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    temp_dir = tmp_path / "tmp"
+    temp_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_dir))
+    Path("integator.toml").write_text(
+        f'[integator]\nroot_worktree_dir = "{tmp_path}"\n'
+    )
+    _git("worktree", "add", "-q", "--detach", str(temp_dir / "integator-abcd"))
+    pool_dir = RootWorktree(Git(tmp_path)).pool_dir()
+    _git("worktree", "add", "-q", "--detach", str(pool_dir / "slot-0"))
+
+    prune(include_pool=False, template_name=None, debug=False, quiet=True)
+    assert not (temp_dir / "integator-abcd").exists()
+    assert (pool_dir / "slot-0").exists()
+
+    prune(include_pool=True, template_name=None, debug=False, quiet=True)
+    assert not pool_dir.exists()
+    assert len(_git("worktree", "list").splitlines()) == 1
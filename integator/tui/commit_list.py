@@ -1,8 +1,8 @@
+import asyncio
 import datetime as dt
 from dataclasses import dataclass
 
 import humanize
-from iterpy import Arr
 from textual import work
 from textual.app import ComposeResult
 from textual.reactive import reactive
@@ -11,16 +11,20 @@ from textual.widgets import DataTable
 from textual.widgets._data_table import RowKey
 
 from integator.commit import Commit
-from integator.git import Git
+from integator.git import ChangeCount, Git
 from integator.settings import RootSettings
 from integator.step_status import ExecutionState, Statuses
 from integator.step_status_repo import StepStatusRepo
 
+# Column keys, distinct from the steps' keys, which are prefixed, so any step name can be shown
+AGE_COLUMN = "age"
+CHURN_COLUMN = "churn"
+STEP_COLUMN_PREFIX = "step:"
+
 
 class CommitList(Widget):
     selected_hash: reactive[str] = reactive("")
     last_update: dt.datetime = dt.datetime.now()
-    rows: list[tuple[Commit, Statuses]] = []
 
     CSS = """
 .box {
@@ -28,11 +32,23 @@ class CommitList(Widget):
 }
 """
 
-    def __init__(self, settings: RootSettings, classes: str = "") -> None:
+    def __init__(
+        self, settings: RootSettings, poll_seconds: float, classes: str = ""
+    ) -> None:
         super().__init__(classes=classes)
         self.settings = settings
+        self.poll_seconds = poll_seconds
         self.git = Git(source_dir=self.settings.integator.root_worktree_dir)
-        self.columns = ["Age", *self.settings.step_names()]
+        self.columns = self._columns(settings)
+        self.change_counts: dict[str, ChangeCount] = {}
+        self.rows: list[tuple[Commit, Statuses]] = []
+
+    @staticmethod
+    def _columns(settings: RootSettings) -> list[tuple[str, str]]:
+        """The key and label of each column."""
+        steps = [(STEP_COLUMN_PREFIX + name, name) for name in settings.step_names()]
+        churn = [(CHURN_COLUMN, "Churn")] if settings.integator.show_churn else []
+        return [(AGE_COLUMN, "Age"), *steps, *churn]
 
     def compose(self) -> ComposeResult:
         table = DataTable(cursor_type="row")  # type: ignore
@@ -40,28 +56,37 @@ class CommitList(Widget):
 
     def on_mount(self) -> None:
         table: DataTable[ExecutionState] = self.query_one(DataTable)  # pyright: ignore[reportUnknownVariableType]
-        for column in self.columns:
-            table.add_column(column, key=column)
+        for key, label in self.columns:
+            table.add_column(label, key=key)
 
         commits = self.git.log.get(8)
-        pairs = [
-            (entry, StepStatusRepo().get(entry.hash)) for entry in reversed(commits)
-        ]
+        statuses = StepStatusRepo().get_many([entry.hash for entry in commits])
+        if self.settings.integator.show_churn:
+            self.change_counts = self.git.change_counts([c.hash for c in commits])
+        pairs = [(entry, statuses[entry.hash]) for entry in reversed(commits)]
         for pair in pairs:
             self._add_row(pair)
 
         self._update()
-        self.timer = self.set_interval(0.3, self._update)
+        self.timer = self.set_interval(self.poll_seconds, self._update)
         self.post_message(
             DataTable.RowHighlighted(
                 data_table=table, cursor_row=0, row_key=RowKey(commits[0].hash)
             )
         )
 
-    @work(exclusive=True, thread=True)
-    def _update(self) -> None:
-        commits = self.git.log.get(8)
-        self.rows = [(entry, StepStatusRepo().get(entry.hash)) for entry in commits]
+    @work(exclusive=True)
+    async def _update(self) -> None:
+        commits = await self.git.log.async_get(8)
+        statuses = await StepStatusRepo().async_get_many(
+            [entry.hash for entry in commits]
+        )
+        if self.settings.integator.show_churn:
+            # Cached by hash, so only spawns git for new commits
+            self.change_counts = await asyncio.to_thread(
+                self.git.change_counts, [entry.hash for entry in commits]
+            )
+        self.rows = [(entry, statuses[entry.hash]) for entry in commits]
 
         table: DataTable[ExecutionState] = self.query_one(DataTable)  # pyright: ignore[reportUnknownVariableType]
         row_keys = {v.key.value for v in table.rows.values()}
@@ -72,21 +97,49 @@ class CommitList(Widget):
                 continue
             self._update_row(row)
 
-        table.sort("Age", reverse=True)
+        table.sort(AGE_COLUMN, reverse=True)
+
+    def set_settings(self, settings: RootSettings) -> None:
+        """Show the steps of new settings."""
+        self.settings = settings
+        self.columns = self._columns(settings)
+
+        table: DataTable[ExecutionState] = self.query_one(DataTable)  # pyright: ignore[reportUnknownVariableType]
+        table.clear(columns=True)
+        for key, label in self.columns:
+            table.add_column(label, key=key)
+        self._update()
+
+    def poll_every(self, seconds: float) -> None:
+        self.timer.stop()
+        self.timer = self.set_interval(seconds, self._update)
+
+    def update_all(self) -> None:
+        self._update()
+
+    @work(group="commit")
+    async def update_commit(self, hash: str) -> None:
+        """Redraw the row of one commit, e.g. after one of its steps started or finished."""
+        commit = next((commit for commit, _ in self.rows if commit.hash == hash), None)
+        if commit is None:
+            self._update()
+            return
+
+        statuses = await StepStatusRepo.async_get(hash)
+        self.rows = [
+            (entry, statuses if entry.hash == hash else current)
+            for entry, current in self.rows
+        ]
+        self._update_row((commit, statuses))
 
     def _row_key(self, commit: Commit) -> str:
         return commit.hash
 
     def _add_row(self, pair: tuple[Commit, Statuses]) -> None:
-        table: DataTable[AgedTimestamp | ExecutionState] = self.query_one(DataTable)  # pyright: ignore[reportUnknownVariableType]
+        table: DataTable[Cell] = self.query_one(DataTable)  # pyright: ignore[reportUnknownVariableType]
 
-        statuses = pair[1]
-        values = [
-            AgedTimestamp(pair[0].timestamp),
-            *self._get_values_for_columns(statuses),
-        ]
         table.add_row(
-            *values,
+            *[self._cell(pair, key) for key, _ in self.columns],
             label=pair[0].hash,
             key=self._row_key(pair[0]),
         )
@@ -107,17 +160,17 @@ class CommitList(Widget):
         )
 
     def _update_row(self, row: tuple[Commit, Statuses]) -> None:
-        table: DataTable[AgedTimestamp | ExecutionState] = self.query_one(DataTable)  # pyright: ignore[reportUnknownVariableType]
-        for column_name in Arr(self.columns):
-            if column_name == "Age":
-                value = AgedTimestamp(row[0].timestamp)
-            else:
-                value = row[1].get(column_name).state
-
-            table.update_cell(self._row_key(row[0]), column_name, value)
-
-    def _get_values_for_columns(self, statuses: Statuses) -> list[ExecutionState]:
-        return [statuses.get(name).state for name in self.columns if name != "Age"]
+        table: DataTable[Cell] = self.query_one(DataTable)  # pyright: ignore[reportUnknownVariableType]
+        for key, _ in self.columns:
+            table.update_cell(self._row_key(row[0]), key, self._cell(row, key))
+
+    def _cell(self, row: tuple[Commit, Statuses], key: str) -> "Cell":
+        if key == AGE_COLUMN:
+            return AgedTimestamp(row[0].timestamp)
+        if key == CHURN_COLUMN:
+            counts = self.change_counts.get(row[0].hash)
+            return "" if counts is None else str(counts)
+        return row[1].state(key.removeprefix(STEP_COLUMN_PREFIX))
 
     def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
         key = event.row_key.value
@@ -139,3 +192,6 @@ class AgedTimestamp:
             if age > dt.timedelta(minutes=1)
             else "< 1 minute"
         )
+
+
+Cell = AgedTimestamp | ExecutionState | str
@@ -1,46 +1,118 @@
-from iterpy import Arr
 from textual import work
 from textual.app import ComposeResult
+from textual.containers import Vertical
 from textual.reactive import reactive
-from textual.widgets import Label
+from textual.widgets import Label, Log
 
 from integator.step_status import ExecutionState, Statuses, StepStatus
 from integator.step_status_repo import StepStatusRepo
+from integator.tail import LogFollower
 
+# How often the followed log is read, and at most how much of it per read. Output beyond that is
+# skipped, so a step which writes very fast doesn't lock up the UI.
+FOLLOW_SECONDS = 0.1
+FOLLOW_MAX_BYTES = 64 * 1024
+# Lines the followed log starts with, and keeps
+FOLLOW_START_LINES = 20
+FOLLOW_MAX_LINES = 2000
 
-class Details(Label):
-    """A screen to show the details of a ListItem."""
 
-    hash: reactive[str] = reactive("", recompose=True)
-    statuses: reactive[Statuses]
+class Details(Vertical):
+    """A screen to show the details of a ListItem.
 
-    def __init__(self, hash: str, classes: str) -> None:
+    Follows the log of the step in progress, or else of the first failure.
+    """
+
+    DEFAULT_CSS = """
+Details Log {
+    height: 1fr;
+    border: solid gray;
+}
+"""
+
+    hash: reactive[str] = reactive("")
+    statuses: reactive[Statuses] = reactive(Statuses)
+
+    def __init__(self, hash: str, poll_seconds: float, classes: str) -> None:
         super().__init__(classes=classes)
         self.hash = hash
-        self.statuses = Statuses()
+        self.poll_seconds = poll_seconds
+        self.follower: LogFollower | None = None
 
-    @work(thread=True, exclusive=True)
-    def _update(self) -> None:
-        self.statuses = StepStatusRepo.get(self.hash)
+    def compose(self) -> ComposeResult:
+        yield Label("No highlighted item")
+        yield Log(max_lines=FOLLOW_MAX_LINES)
 
-    @staticmethod
-    def _status_line(status: StepStatus) -> str:
-        base = f"{status.state} {status.step.name} ({status.span}): {status.log}"
-        if status.state != ExecutionState.FAILURE:
-            return base
-        return f"""{base}
+    def on_mount(self) -> None:
+        self.query_one(Log).display = False
+        self.reload()
+        self.timer = self.set_interval(self.poll_seconds, self.reload)
+        self.follow_timer = self.set_interval(FOLLOW_SECONDS, self._follow, pause=True)
 
-=== Log excerpt ===
-{status.tail(20)}
-"""
+    def watch_hash(self) -> None:
+        if self.is_mounted:
+            self.reload()
 
-    def compose(self) -> ComposeResult:
-        self._update()
-        self.set_timer(1 / 3, self.recompose)
-
-        if self.hash == "":
-            yield Label("No highlighted item")
-        else:
-            yield Label(
-                "\n".join(Arr(self.statuses.values).map(self._status_line)),
-            )
+    def poll_every(self, seconds: float) -> None:
+        self.timer.stop()
+        self.timer = self.set_interval(seconds, self.reload)
+
+    @work(exclusive=True)
+    async def reload(self) -> None:
+        self.statuses = (
+            await StepStatusRepo.async_get(self.hash) if self.hash else Statuses()
+        )
+
+    def watch_statuses(self, statuses: Statuses) -> None:
+        if not self.is_mounted:
+            return
+
+        self.query_one(Label).update(
+            "\n".join(self._status_line(status) for status in statuses.values)
+            if self.hash
+            else "No highlighted item"
+        )
+
+        followed = self._followed(statuses)
+        path = followed.log if followed is not None else None
+        if self.follower is not None and self.follower.path == path:
+            return
+
+        log = self.query_one(Log)
+        log.clear()
+        log.display = path is not None
+        if followed is None or path is None:
+            self.follower = None
+            self.follow_timer.pause()
+            return
+
+        log.border_title = f"{followed.step.name}: {path}"
+        self.follower = LogFollower(path, FOLLOW_START_LINES)
+        self._follow()
+        self.follow_timer.resume()
+
+    def _follow(self) -> None:
+        if self.follower is not None:
+            self.query_one(Log).write(self.follower.read(FOLLOW_MAX_BYTES))
+
+    @staticmethod
+    def _followed(statuses: Statuses) -> StepStatus | None:
+        with_logs = [status for status in statuses.values if status.log is not None]
+        for state in (
+            ExecutionState.IN_PROGRESS,
+            ExecutionState.FAILURE,
+            ExecutionState.TIMED_OUT,
+        ):
+            for status in with_logs:
+                if status.state == state:
+                    return status
+        return None
+
+    @staticmethod
+    def _status_line(status: StepStatus) -> str:
+        line = f"{status.state} {status.step.name} ({status.span}): {status.log}"
+        shards = [
+            f"  {shard.state} {index + 1}/{len(status.shards)} ({shard.span}): {shard.log}"
+            for index, shard in enumerate(status.shards)
+        ]
+        return "\n".join([line, *shards])
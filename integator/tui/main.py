@@ -1,13 +1,26 @@
+import asyncio
+from multiprocessing.connection import Connection
+from typing import ClassVar
+
 from textual.app import App, ComposeResult
+from textual.binding import BindingType
 from textual.reactive import reactive
 from textual.widgets import DataTable
 
 from integator.commands.tui import WatchDaemon
-from integator.settings import RootSettings
+from integator.settings import RootSettings, SettingsProvider
+from integator.status_events import EventKind, receive
 from integator.step_status_repo import StepStatusRepo
 from integator.tui.commit_list import CommitList
 from integator.tui.details import Details
 
+# Without a watch daemon publishing status events, e.g. if it has crashed, poll for changes.
+POLL_SECONDS = 2.0
+# With one, only poll for changes from elsewhere, e.g. `integator run`, and to update ages.
+SUBSCRIBED_POLL_SECONDS = 30.0
+# How often the settings file is checked for changes, which only stats it
+SETTINGS_POLL_SECONDS = 1.0
+
 
 class IntegatorTUI(App[None]):
     """A Textual app to manage stopwatches."""
@@ -31,7 +44,7 @@ Screen {
     details: Details
     watch_daemon: WatchDaemon
 
-    BINDINGS = [
+    BINDINGS: ClassVar[list[BindingType]] = [
         ("r", "reset_selected", "Reset statuses and restart watch"),
     ]
 
@@ -39,19 +52,63 @@ Screen {
         self,
         settings: RootSettings,
         watch_daemon: WatchDaemon,
+        settings_provider: SettingsProvider | None = None,
     ) -> None:
         super().__init__()
         self.settings = settings
         self.watch_daemon = watch_daemon
+        self.settings_provider = settings_provider
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
-        self.commit_list = CommitList(self.settings, classes="box")
+        self.commit_list = CommitList(
+            self.settings, poll_seconds=SUBSCRIBED_POLL_SECONDS, classes="box"
+        )
         yield self.commit_list
 
-        self.details = Details(self.commit_list.selected_hash, classes="box")
+        self.details = Details(
+            self.commit_list.selected_hash,
+            poll_seconds=SUBSCRIBED_POLL_SECONDS,
+            classes="box",
+        )
         yield self.details
 
+    def on_mount(self) -> None:
+        if self.settings_provider is not None:
+            # The watch daemon reloads the settings itself
+            self.settings_provider.subscribe(self._on_settings_changed)
+            self.set_interval(SETTINGS_POLL_SECONDS, self.settings_provider.get)
+
+        self._subscribe()
+
+    def _subscribe(self) -> None:
+        events = self.watch_daemon.events
+        asyncio.get_running_loop().add_reader(
+            events.fileno(), self._on_status_events, events
+        )
+
+    def _on_settings_changed(self, settings: RootSettings) -> None:
+        self.settings = settings
+        self.commit_list.set_settings(settings)
+
+    def _on_status_events(self, events: Connection) -> None:
+        received = receive(events)
+        if received is None:
+            # The daemon has exited, so poll instead
+            asyncio.get_running_loop().remove_reader(events.fileno())
+            self.commit_list.poll_every(POLL_SECONDS)
+            self.details.poll_every(POLL_SECONDS)
+            return
+
+        for event in received:
+            if event.kind == EventKind.NEW_COMMIT:
+                self.commit_list.update_all()
+            else:
+                self.commit_list.update_commit(event.hash)
+
+            if event.hash == self.details.hash:
+                self.details.reload()
+
     def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
         row_key = event.row_key.value
         if row_key is None:
@@ -77,5 +134,9 @@ Screen {
         except Exception:
             pass
 
-        # Restart the daemon
+        # Restart the daemon, which publishes its events on a new connection
+        asyncio.get_running_loop().remove_reader(self.watch_daemon.events.fileno())
         self.watch_daemon.restart()
+        self._subscribe()
+        self.commit_list.poll_every(SUBSCRIBED_POLL_SECONDS)
+        self.details.poll_every(SUBSCRIBED_POLL_SECONDS)
@@ -1,18 +1,21 @@
+import asyncio
 import datetime
 import enum
 import logging
 
-from iterpy import Arr
-
-from integator.commit import Commit
+from integator import step_index
 from integator.git import Git, RootWorktree
+from integator.last_success import LastSuccess, LastSuccessIndex
+from integator.metrics import timed
+from integator.result_cache import result_cache
 from integator.run_step import run_step
-from integator.settings import RootSettings
+from integator.settings import RootSettings, StepSpec
 from integator.shell import Shell
+from integator.step_index import StepIndex
+from integator.step_scheduler import BackgroundSteps, run_steps
 from integator.step_status import (
     ExecutionState,
     Span,
-    Statuses,
     StepStatus,
     Task,
 )
@@ -24,19 +27,24 @@ l = logging.getLogger(__name__)  # noqa: E741
 class CommandRan(enum.Enum):
     YES = enum.auto()
     NO = enum.auto()
+    # No command ran, but a step was only skipped because it ran recently. It must run once it is stale.
+    DEFERRED = enum.auto()
 
 
-def watch_impl(
+@timed("watch_impl")
+async def watch_impl(
     shell: Shell,
     root_git: Git,
     status_repo: StepStatusRepo,
     quiet: bool,
     settings: RootSettings,
+    superseded: asyncio.Event | None = None,
+    background: BackgroundSteps | None = None,
 ) -> CommandRan:
     # Starting setup
     l.debug("Updating")
-    latest = root_git.log.latest()
-    latest_statuses = status_repo.get(latest.hash)
+    latest = await root_git.log.async_latest()
+    latest_statuses = await status_repo.async_get(latest.hash)
     if settings.integator.fail_fast and latest_statuses.has_failed():
         l.info(f"Latest commit {latest.hash} failed")
         for failure in latest_statuses.get_failures():
@@ -44,51 +52,113 @@ def watch_impl(
         return CommandRan.NO
 
     command_ran = CommandRan.NO
-    # Run commands
+    to_run: list[StepSpec] = []
+    # Steps that other steps can consider done
+    satisfied: set[str] = set()
+    index = StepIndex.for_repo()
+    cache = result_cache(
+        settings.integator.result_cache, settings.integator.result_cache_backend
+    )
+    last_success = LastSuccessIndex.for_repo()
+    if not last_success.exists():
+        # Once per repository, for successes recorded before there was an index
+        await _seed_last_success(root_git, status_repo, last_success)
+
     for step in settings.integator.steps:
         log = logging.getLogger(f"{__name__}.{step.name}")
         log.debug(f"Processing {step.name}")
-        latest_cmd_status = latest_statuses.get(step.name).state
+        latest_cmd_status = latest_statuses.state(step.name)
         log.debug(f"Latest status: {latest_cmd_status}")
 
         match latest_cmd_status:
             case ExecutionState.SUCCESS:
                 log.info(f"{step.name} succeeded on the last run, continuing")
+                satisfied.add(step.name)
                 continue
             case ExecutionState.FAILURE:
                 log.info(f"{step.name} failed on the last run, continuing")
                 continue
+            case ExecutionState.TIMED_OUT:
+                log.info(f"{step.name} timed out on the last run, continuing")
+                continue
+            case ExecutionState.IN_PROGRESS if (
+                background is not None and background.running(latest.hash, step.name)
+            ):
+                # E.g. HEAD moved back to this commit. Steps needing it run once it is done.
+                log.info(f"{step.name} is still running in the background, continuing")
+                command_ran = CommandRan.DEFERRED
+                continue
             case ExecutionState.IN_PROGRESS:
                 log.info(f"{step.name} crashed while running, executing again")
+            case ExecutionState.CANCELLED:
+                log.info(f"{step.name} was cancelled, executing again")
             case ExecutionState.UNKNOWN:
                 log.info(f"{step.name} has not been run yet, executing")
 
-        commits = root_git.log.get(20)
-        if _is_stale(
-            [(commit, status_repo.get(commit.hash)) for commit in commits],
-            step.max_staleness_seconds,
-            step.name,
-        ):
-            result = run_step(
-                step,
-                latest,
-                RootWorktree(root_git),
-                status_repo,
-                settings.integator.log_dir,
-                quiet,
+        reused = await asyncio.to_thread(index.reusable, step, latest.hash)
+        if reused is not None:
+            log.info(
+                f"{step.name} succeeded on {reused.reused_from} with the same content, reusing it"
+            )
+            await status_repo.async_update_step(latest.hash, reused)
+            satisfied.add(step.name)
+            continue
+
+        if not _is_stale(last_success.get(step.name), step.max_staleness_seconds):
+            satisfied.add(step.name)
+            command_ran = CommandRan.DEFERRED
+            continue
+
+        # Only for steps that would run, since looking up a remote cache can fetch over the network
+        if cache is not None:
+            shared = await asyncio.to_thread(
+                step_index.cached, cache, step, latest.hash
             )
-            command_ran = CommandRan.YES
-            if settings.integator.fail_fast and result.failed():
-                break
+            if shared is not None:
+                log.info(
+                    f"{step.name} succeeded on {shared.reused_from} elsewhere with the same content, reusing it"
+                )
+                await status_repo.async_update_step(latest.hash, shared)
+                satisfied.add(step.name)
+                continue
+
+        to_run.append(step)
+
+    results = await run_steps(
+        to_run,
+        lambda step, cancel: run_step(
+            step,
+            latest,
+            RootWorktree(
+                root_git,
+                pool_size=settings.integator.worktree_pool_size,
+                disk_budget_mb=settings.integator.worktree_disk_budget_mb,
+            ),
+            status_repo,
+            settings.integator.log_dir,
+            quiet,
+            cancel,
+            cache,
+        ),
+        max_parallel=settings.integator.max_parallel,
+        fail_fast=settings.integator.fail_fast,
+        satisfied=satisfied,
+        superseded=superseded,
+        background=background,
+        commit=latest.hash,
+    )
+    if results:
+        command_ran = CommandRan.YES
 
-    latest = root_git.log.latest()
-    latest_statuses = status_repo.get(latest.hash)
+    latest = await root_git.log.async_latest()
+    latest_statuses = await status_repo.async_get(latest.hash)
 
     if latest_statuses.all(set(settings.step_names()), ExecutionState.SUCCESS):
         if settings.integator.push_on_success and not latest_statuses.is_pushed():
             l.debug("Pushing!")
-            root_git.push_head()
-            latest_statuses.replace(
+            await asyncio.to_thread(root_git.push_head)
+            await status_repo.async_update_step(
+                latest.hash,
                 StepStatus(
                     step=Task(name="Push", cmd="Push"),
                     state=ExecutionState.SUCCESS,
@@ -96,30 +166,27 @@ def watch_impl(
                         start=datetime.datetime.now(), end=datetime.datetime.now()
                     ),
                     log=None,
-                )
+                ),
             )
-            status_repo.update(latest.hash, latest_statuses)
 
     l.info("Finished watching")
 
     return command_ran
 
 
-def _is_stale(
-    entries: list[tuple[Commit, Statuses]],
-    max_staleness_seconds: int,
-    cmd_name: str,
-) -> bool:
-    successes = (
-        Arr(entries)
-        .map(lambda it: it[1].get(cmd_name))
-        .filter(lambda it: it.state == ExecutionState.SUCCESS)
-        .to_list()
-    )
+async def _seed_last_success(
+    root_git: Git, status_repo: StepStatusRepo, last_success: LastSuccessIndex
+) -> None:
+    commits = await root_git.log.async_get(20)
+    statuses = await status_repo.async_get_many([commit.hash for commit in commits])
+    for commit in commits:
+        await asyncio.to_thread(last_success.record, commit.hash, statuses[commit.hash])
+
 
+def _is_stale(last_success: LastSuccess | None, max_staleness_seconds: int) -> bool:
     time_since_success = (
-        datetime.datetime.now() - successes[0].span.start
-        if successes
+        datetime.datetime.now() - last_success.start
+        if last_success is not None
         else datetime.timedelta(days=30)
     )
 
@@ -0,0 +1,263 @@
+import asyncio
+import contextlib
+import fcntl
+import logging
+import os
+import pathlib
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import IO, AsyncGenerator
+
+from integator.metrics import span, timed
+from integator.shell import Shell
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Slot:
+    path: pathlib.Path
+    users: int = 0
+    # The commit the users want checked out. While moving, the worktree is being checked out to it.
+    target: str | None = None
+    moving: bool = False
+    # Held while the slot is in use, so other integator processes don't check out another commit in it.
+    lock: IO[bytes] | None = None
+
+    def head(self) -> str | None:
+        """The commit checked out in the worktree, read from its git directory without spawning git."""
+        try:
+            gitdir = (self.path / ".git").read_text().removeprefix("gitdir:").strip()
+            return (pathlib.Path(gitdir) / "HEAD").read_text().strip()
+        except OSError:
+            return None
+
+    def try_lock(self) -> bool:
+        lock = (self.path.parent / f"{self.path.name}.lock").open("wb")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return False
+        self.lock = lock
+        return True
+
+    def unlock(self) -> None:
+        if self.lock is not None:
+            self.lock.close()
+            self.lock = None
+
+    def last_used(self) -> float:
+        return self.path.stat().st_mtime if self.path.exists() else 0
+
+    def disk_usage(self) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                with contextlib.suppress(OSError):
+                    total += os.lstat(os.path.join(dirpath, filename)).st_blocks * 512
+        return total
+
+
+class WorktreePool:
+    """A fixed number of worktrees, which are moved between commits instead of created for each.
+
+    Moving a worktree with a detached checkout only rewrites the files that changed, and keeps
+    ignored files, like build artifacts and caches, warm. Steps for the same commit share a
+    worktree. When the worktrees use more than disk_budget_bytes, the least recently used idle
+    ones are removed.
+    """
+
+    def __init__(
+        self,
+        source_dir: pathlib.Path,
+        root: pathlib.Path,
+        size: int,
+        disk_budget_bytes: int | None,
+    ) -> None:
+        self.source_dir = source_dir
+        self.root = root
+        self.size = size
+        self.disk_budget_bytes = disk_budget_bytes
+        self._slots = [_Slot(root / f"slot-{i}") for i in range(size)]
+        self._condition = threading.Condition()
+
+    @contextlib.asynccontextmanager
+    async def checkout(self, hash: str) -> AsyncGenerator[pathlib.Path, None]:
+        """A worktree with hash checked out, for the duration of the context."""
+        # Waiting for a worktree, and moving it, blocks, so happens in a thread.
+        acquire = asyncio.ensure_future(asyncio.to_thread(self._acquire, hash))
+        try:
+            with span("worktree_checkout"):
+                slot = await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The thread keeps going, so release the worktree once it has been acquired.
+            acquire.add_done_callback(self._release_acquired)
+            raise
+
+        try:
+            yield slot.path
+        finally:
+            self._release(slot)
+
+    def _acquire(self, hash: str) -> _Slot:
+        """A slot with hash checked out.
+
+        Slots are reserved while holding the lock, but moved and evicted without it, so other steps
+        can claim and release slots in the meantime.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._condition:
+            while True:
+                claim = self._claim(hash)
+                if claim is None:
+                    log.debug(f"All worktrees are busy, waiting to check out {hash}")
+                    # Worktrees can also be released by other processes, which won't notify us.
+                    self._condition.wait(timeout=1)
+                    continue
+
+                slot, move = claim
+                if move:
+                    slot.moving = True
+                    break
+
+                # Shared with a step for the same commit, which may still be moving it
+                while slot.moving:
+                    self._condition.wait()
+                if slot.target == hash:
+                    return slot
+                # The move failed, so try again
+                self._release_locked(slot)
+
+        try:
+            self._move(slot, hash)
+            slot.path.touch()
+        except BaseException:
+            with self._condition:
+                slot.moving = False
+                slot.target = None
+                self._release_locked(slot)
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            slot.moving = False
+            self._condition.notify_all()
+
+        if self.disk_budget_bytes is not None:
+            self._evict(keep=slot)
+        return slot
+
+    def _claim(self, hash: str) -> tuple[_Slot, bool] | None:
+        """Reserve a slot for hash, and whether it has to be moved there. Called with the lock held."""
+        for slot in self._slots:
+            if slot.users > 0 and slot.target == hash:
+                slot.users += 1
+                return slot, False
+
+        idle = [slot for slot in self._slots if slot.users == 0 and slot.try_lock()]
+        if not idle:
+            return None
+
+        matching = [slot for slot in idle if _matches(slot.head(), hash)]
+        slot = (matching or sorted(idle, key=_Slot.last_used))[0]
+        for other in idle:
+            if other is not slot:
+                other.unlock()
+
+        slot.users += 1
+        slot.target = hash
+        if matching:
+            slot.path.touch()
+        return slot, not matching
+
+    def _release_acquired(self, acquire: "asyncio.Future[_Slot]") -> None:
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._release(acquire.result())
+
+    def _release(self, slot: _Slot) -> None:
+        with self._condition:
+            self._release_locked(slot)
+
+    def _release_locked(self, slot: _Slot) -> None:
+        slot.users -= 1
+        if slot.users == 0:
+            slot.unlock()
+            self._condition.notify_all()
+
+    @timed("worktree_move")
+    def _move(self, slot: _Slot, hash: str) -> None:
+        if slot.head() is not None:
+            log.info(f"Moving worktree {slot.path} to {hash}")
+            try:
+                Shell().run_quietly(
+                    f"git -C '{slot.path}' checkout -q -f --detach {hash}"
+                )
+                # Untracked files from the previous commit are removed, but ignored files are kept warm.
+                Shell().run_quietly(f"git -C '{slot.path}' clean -q -f -d")
+                return
+            except RuntimeError as e:
+                log.warning(f"Could not reuse worktree {slot.path}, recreating it: {e}")
+
+        self._remove(slot)
+        log.info(f"Creating worktree at {slot.path}")
+        Shell().run_quietly(
+            f"git -C '{self.source_dir}' worktree add -q -f --detach '{slot.path}' {hash}"
+        )
+
+    def _remove(self, slot: _Slot) -> None:
+        if slot.path.exists():
+            log.info(f"Removing worktree {slot.path}")
+            shutil.rmtree(slot.path, ignore_errors=True)
+        Shell().run_quietly(f"git -C '{self.source_dir}' worktree prune")
+
+    def _evict(self, keep: _Slot) -> None:
+        # Walks every file, so the usage is only approximate if slots move meanwhile
+        usage = {slot.path: slot.disk_usage() for slot in self._slots}
+        total = sum(usage.values())
+
+        for slot in sorted(self._slots, key=_Slot.last_used):
+            if total <= (self.disk_budget_bytes or 0):
+                return
+            if slot is keep or usage[slot.path] == 0:
+                continue
+            with self._condition:
+                if slot.users > 0 or not slot.try_lock():
+                    continue
+                # Reserved, so it isn't claimed while it is removed
+                slot.users += 1
+                slot.target = None
+
+            log.info(
+                f"Worktrees use {total // 2**20} MB, over budget, evicting {slot.path}"
+            )
+            try:
+                self._remove(slot)
+            finally:
+                self._release(slot)
+            total -= usage[slot.path]
+
+
+def _matches(head: str | None, hash: str) -> bool:
+    return head is not None and head.startswith(hash)
+
+
+_pools: dict[pathlib.Path, WorktreePool] = {}
+_pools_lock = threading.Lock()
+
+
+def worktree_pool(
+    source_dir: pathlib.Path,
+    root: pathlib.Path,
+    size: int,
+    disk_budget_bytes: int | None,
+) -> WorktreePool:
+    """The pool at root. Shared within the process, so steps running in parallel coordinate."""
+    with _pools_lock:
+        pool = _pools.get(root)
+        if pool is None or pool.size != size:
+            pool = WorktreePool(source_dir, root, size, disk_budget_bytes)
+            _pools[root] = pool
+        pool.disk_budget_bytes = disk_budget_bytes
+        return pool